@@ -1,36 +1,564 @@
-"""Alchemy API: balance (eth_getBalance), Prices API (ETH/USD by-symbol)."""
+"""
+Alchemy API: balance (eth_getBalance, single or JSON-RPC batch), chain head (eth_blockNumber),
+ERC-20 balanceOf/decimals through Multicall3 aggregate3, Prices API (ETH/USD by-symbol).
+ChainRegistry maps each chain_id to its own endpoint, batch limit and request budget; every
+endpoint sends through an rpc_transport.Transport (budgets, retries, circuit breaker, stats).
+AlchemyClient owns one pooled keep-alive HTTP session shared by all of them; create it once per run.
+"""
+import os
+import re
+from functools import lru_cache
+
 import requests
+from requests.adapters import HTTPAdapter
 from decimal import Decimal
+from eth_abi import decode as abi_decode, encode as abi_encode
+
+from price_cache import PriceCache, valid_price
+from rpc_transport import (
+    DEFAULT_BREAKER_COOLDOWN,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_MAX_RETRIES,
+    CircuitBreaker,
+    RpcError,
+    Transport,
+)
+
+# Alchemy accepts up to 1000 calls per batch; smaller batches keep responses fast.
+DEFAULT_BATCH_SIZE = 100
+# Multicall3 is deployed at the same address on mainnet, Sepolia, Base and most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# Sub-calls per aggregate3 eth_call (each balanceOf is a few thousand gas)
+DEFAULT_MULTICALL_SIZE = 500
+_AGGREGATE3 = bytes.fromhex("82ad56cb")
+_BALANCE_OF = bytes.fromhex("70a08231")
+_DECIMALS = bytes.fromhex("313ce567")
+# OP-stack chains charge an L1 data fee on top of gas; the GasPriceOracle predeploy quotes it
+OP_STACK_CHAINS = (10, 8453, 84532, 11155420)
+GAS_PRICE_ORACLE = "0x420000000000000000000000000000000000000F"
+_GET_L1_FEE = bytes.fromhex("49948e0e")
+# Keep-alive connections per host in the shared session (one per concurrent poller thread is plenty)
+DEFAULT_POOL_SIZE = 10
+PRICES_URL = "https://prices.g.alchemy.com/v1/tokens/by-symbol"
+# Symbols per by-symbol request (API limit 25)
+PRICES_BATCH = 25
 
 def _rpc_url(network: str, api_key: str) -> str:
+    # ALCHEMY_RPC_URL: any JSON-RPC endpoint (own node, local stub) instead of Alchemy
+    override = os.environ.get("ALCHEMY_RPC_URL", "")
+    if override:
+        return override
     base = "https://eth-mainnet.g.alchemy.com/v2"
     if network and network.lower() != "mainnet":
         base = f"https://eth-{network.lower()}.g.alchemy.com/v2"
     return f"{base}/{api_key}"
 
+@lru_cache(maxsize=None)
+def _shared_client(api_key: str, network: str):
+    # Module-level helpers reuse one pooled client per (key, network) instead of a connection per call
+    return AlchemyClient(api_key, network)
+
 def get_balance_wei(address: str, api_key: str, network: str = "mainnet") -> int:
-    url = _rpc_url(network, api_key)
-    r = requests.post(url, json={"jsonrpc": "2.0", "method": "eth_getBalance", "params": [address, "latest"], "id": 1}, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-    if "error" in data:
-        raise RuntimeError(data["error"])
-    return int(data.get("result", "0x0"), 16)
+    """Single eth_getBalance. Raises RpcError (a RuntimeError) on failure."""
+    return _shared_client(api_key, network).get_balance_wei(address)
+
+def _parse_block_number(data) -> int:
+    if not isinstance(data, dict) or "error" in data:
+        raise RpcError(data.get("error", data) if isinstance(data, dict) else data)
+    return int(data["result"], 16)
+
+def get_block_number(api_key: str, network: str = "mainnet") -> int:
+    """Current chain head (eth_blockNumber). Raises RpcError."""
+    return _shared_client(api_key, network).get_block_number()
+
+def _batch_results(count: int, data) -> list:
+    """Results of a batch with ids 0..count-1, in id order. Missing or failed items become RpcError."""
+    if not isinstance(data, list):
+        # Whole batch rejected (e.g. {"error": ...} for an oversized batch)
+        err = RpcError(data.get("error", data) if isinstance(data, dict) else data)
+        return [err] * count
+    by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+    out = []
+    for i in range(count):
+        item = by_id.get(i)
+        if item is None:
+            out.append(RpcError("missing batch response"))
+        elif "error" in item:
+            out.append(RpcError(item["error"]))
+        else:
+            out.append(item.get("result"))
+    return out
+
+def _map_batch_response(addresses, data) -> dict:
+    """Map an eth_getBalance batch response back to addresses: {address: wei or RpcError}."""
+    out = {}
+    for address, result in zip(addresses, _batch_results(len(addresses), data)):
+        if isinstance(result, RpcError):
+            out[address] = result
+            continue
+        try:
+            out[address] = int(result or "0x0", 16)
+        except (TypeError, ValueError):
+            out[address] = RpcError(f"bad result: {result!r}")
+    return out
+
+def _batch_payload(calls) -> list:
+    return [{"jsonrpc": "2.0", "method": m, "params": p, "id": i} for i, (m, p) in enumerate(calls)]
+
+def _balance_batch_payload(addresses) -> list:
+    return [
+        {"jsonrpc": "2.0", "method": "eth_getBalance", "params": [a, "latest"], "id": i}
+        for i, a in enumerate(addresses)
+    ]
+
+def _chunks(items, size):
+    size = max(1, int(size))
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_balances_wei(addresses, api_key: str, network: str = "mainnet", batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    eth_getBalance for many addresses, packed into JSON-RPC batch arrays of batch_size.
+    Returns {address: wei (int) or RpcError}; a failed batch maps its error onto each of its addresses.
+    """
+    shared = _shared_client(api_key, network).endpoint()
+    return ChainEndpoint(None, shared.url, batch_size, transport=shared.transport).get_balances_wei(addresses)
+
+
+def _aggregate3_call(multicall: str, calls) -> list:
+    """eth_call params for Multicall3.aggregate3 over [(target, calldata)], every call allowed to fail."""
+    data = _AGGREGATE3 + abi_encode(["(address,bool,bytes)[]"], [[(t.lower(), True, d) for t, d in calls]])
+    return [{"to": multicall, "data": "0x" + data.hex()}, "latest"]
+
+def _decode_aggregate3(result, count: int) -> list:
+    """aggregate3 return data -> [bytes or RpcError] per sub-call."""
+    if isinstance(result, RpcError):
+        return [result] * count
+    try:
+        (items,) = abi_decode(["(bool,bytes)[]"], bytes.fromhex(result[2:] if result.startswith("0x") else result))
+    except Exception as e:
+        return [RpcError(f"bad aggregate3 result: {e}")] * count
+    if len(items) != count:
+        return [RpcError("aggregate3 result count mismatch")] * count
+    return [data if ok else RpcError("call reverted") for ok, data in items]
+
+def _decode_uint(data):
+    if isinstance(data, RpcError):
+        return data
+    if len(data) < 32:
+        return RpcError("short return data")
+    return int.from_bytes(data[:32], "big")
+
+
+class ChainEndpoint:
+    """
+    One chain's JSON-RPC endpoint with its batch limit. All requests go through `transport`
+    (default: Transport(url, rate) with rate in requests/second, 0 = unlimited). op_stack: the chain
+    charges an L1 data fee (default: chain_id in OP_STACK_CHAINS).
+    """
+
+    def __init__(self, chain_id, url: str, batch_size: int = DEFAULT_BATCH_SIZE, rate: float = 0.0,
+                 multicall: str = MULTICALL3_ADDRESS, multicall_size: int = DEFAULT_MULTICALL_SIZE,
+                 transport: Transport = None, op_stack: bool = None):
+        self.chain_id = chain_id
+        self.op_stack = chain_id in OP_STACK_CHAINS if op_stack is None else bool(op_stack)
+        self.url = url
+        self.batch_size = max(1, int(batch_size))
+        self.transport = transport or Transport(url, rate)
+        self.multicall = multicall
+        self.multicall_size = max(1, int(multicall_size))
+        # ERC-20 decimals never change: cached for the life of the endpoint
+        self.decimals = {}
+
+    def batch(self, calls) -> list:
+        """
+        One JSON-RPC batch request for calls [(method, params), ...]. Returns results in call order;
+        failed items are RpcError. A failed request (after retries) raises RpcError.
+        """
+        return _batch_results(len(calls), self.transport.post(_batch_payload(calls)))
+
+    def get_block_number(self) -> int:
+        return _parse_block_number(self.transport.post({"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}))
+
+    def get_balances_wei(self, addresses) -> dict:
+        """
+        eth_getBalance for many addresses, packed into JSON-RPC batch arrays of batch_size.
+        Returns {address: wei (int) or RpcError}; a failed batch maps its error onto each of its addresses.
+        """
+        out = {}
+        for chunk in _chunks(list(dict.fromkeys(addresses)), self.batch_size):
+            try:
+                out.update(_map_batch_response(chunk, self.transport.post(_balance_batch_payload(chunk))))
+            except RpcError as e:
+                out.update({a: e for a in chunk})
+        return out
+
+    def multicall_payloads(self, calls) -> list:
+        """[(method, params)] eth_calls covering calls [(target, calldata)], multicall_size per aggregate3."""
+        return [("eth_call", _aggregate3_call(self.multicall, chunk)) for chunk in _chunks(calls, self.multicall_size)]
+
+    def decode_multicall(self, calls, results) -> list:
+        """Per-call return data (bytes or RpcError) from the eth_call results of multicall_payloads(calls)."""
+        out = []
+        for chunk, result in zip(_chunks(calls, self.multicall_size), results):
+            out.extend(_decode_aggregate3(result, len(chunk)))
+        return out
+
+    def multicall_batch(self, calls) -> list:
+        """Run calls [(target, calldata)]: aggregate3 eth_calls, batch_size of them per JSON-RPC request."""
+        payloads = self.multicall_payloads(calls)
+        results = []
+        for chunk in _chunks(payloads, self.batch_size):
+            try:
+                results.extend(self.batch(chunk))
+            except RpcError as e:
+                results.extend([e] * len(chunk))
+        return self.decode_multicall(calls, results)
+
+    def get_token_decimals(self, tokens) -> dict:
+        """{token: decimals or RpcError}; only tokens not cached yet cost a call."""
+        missing = [t for t in dict.fromkeys(tokens) if t not in self.decimals]
+        if missing:
+            for token, data in zip(missing, self.multicall_batch([(t, _DECIMALS) for t in missing])):
+                value = _decode_uint(data)
+                if not isinstance(value, RpcError):
+                    self.decimals[token] = value
+        return {t: self.decimals.get(t, RpcError(f"decimals() failed for {t}")) for t in tokens}
+
+    def token_balance_calls(self, pairs) -> list:
+        return [(token, _BALANCE_OF + abi_encode(["address"], [holder.lower()])) for token, holder in pairs]
+
+    def token_units(self, pairs, returned, decimals) -> dict:
+        """{(token, holder): balance in token units or RpcError} from balanceOf return data and {token: decimals}."""
+        out = {}
+        for (token, holder), data in zip(pairs, returned):
+            raw = _decode_uint(data)
+            if isinstance(decimals[token], RpcError):
+                out[(token, holder)] = decimals[token]
+            elif isinstance(raw, RpcError):
+                out[(token, holder)] = raw
+            else:
+                out[(token, holder)] = float(Decimal(raw) / Decimal(10 ** decimals[token]))
+        return out
+
+    def get_token_balances(self, pairs) -> dict:
+        """
+        ERC-20 balanceOf for [(token, holder)], hundreds per aggregate3 eth_call.
+        Returns {(token, holder): balance in token units (float) or RpcError}.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        decimals = self.get_token_decimals([token for token, _ in pairs])
+        return self.token_units(pairs, self.multicall_batch(self.token_balance_calls(pairs)), decimals)
+
+    def _call(self, method: str, params):
+        data = self.transport.post({"jsonrpc": "2.0", "method": method, "params": params, "id": 1})
+        if not isinstance(data, dict) or "error" in data:
+            raise RpcError(data.get("error", data) if isinstance(data, dict) else data)
+        return data.get("result")
+
+    def get_gas_price(self) -> int:
+        """eth_gasPrice in wei. Raises RpcError."""
+        return int(self._call("eth_gasPrice", []), 16)
+
+    def get_fee_data(self) -> dict:
+        """
+        {"gas_price", "base_fee", "priority_fee"} in wei from one batch (eth_gasPrice, latest block,
+        eth_maxPriorityFeePerGas); base_fee / priority_fee are None where the chain has no EIP-1559.
+        Raises RpcError when the gas price cannot be read.
+        """
+        gas_price, block, priority = self.batch([("eth_gasPrice", []), ("eth_getBlockByNumber", ["latest", False]),
+                                                 ("eth_maxPriorityFeePerGas", [])])
+        if isinstance(gas_price, RpcError):
+            raise gas_price
+        base_fee = block.get("baseFeePerGas") if isinstance(block, dict) else None
+        return {"gas_price": int(gas_price, 16), "base_fee": int(base_fee, 16) if base_fee else None,
+                "priority_fee": None if isinstance(priority, RpcError) or priority is None else int(priority, 16)}
+
+    def get_l1_fee(self, raw_tx: bytes) -> int:
+        """OP-stack L1 data fee in wei for a signed tx (GasPriceOracle.getL1Fee). Raises RpcError."""
+        data = "0x" + (_GET_L1_FEE + abi_encode(["bytes"], [raw_tx])).hex()
+        result = self._call("eth_call", [{"to": GAS_PRICE_ORACLE, "data": data}, "latest"])
+        try:
+            fee = _decode_uint(bytes.fromhex(result[2:]))
+        except (TypeError, ValueError):
+            fee = RpcError(f"bad getL1Fee result: {result!r}")
+        if isinstance(fee, RpcError):
+            raise fee
+        return fee
+
+    def get_transaction_counts(self, addresses, block: str = "pending") -> dict:
+        """Next nonce (eth_getTransactionCount at block) per address: {address: int or RpcError}."""
+        out = {}
+        for chunk in _chunks(list(dict.fromkeys(addresses)), self.batch_size):
+            try:
+                results = self.batch([("eth_getTransactionCount", [a, block]) for a in chunk])
+            except RpcError as e:
+                results = [e] * len(chunk)
+            for address, result in zip(chunk, results):
+                try:
+                    out[address] = result if isinstance(result, RpcError) else int(result, 16)
+                except (TypeError, ValueError):
+                    out[address] = RpcError(f"bad result: {result!r}")
+        return out
+
+    def send_raw_transaction(self, raw: str) -> str:
+        """eth_sendRawTransaction; returns the tx hash. Raises RpcError (node rejection or transport failure)."""
+        return self._call("eth_sendRawTransaction", [raw])
+
+    def send_raw_transactions(self, raws) -> list:
+        """
+        eth_sendRawTransaction for many signed txs, batch_size per JSON-RPC batch, in the given order.
+        Returns tx hash or RpcError per tx; a failed batch maps its error onto each of its txs.
+        """
+        out = []
+        for chunk in _chunks(list(raws), self.batch_size):
+            try:
+                out.extend(self.batch([("eth_sendRawTransaction", [raw]) for raw in chunk]))
+            except RpcError as e:
+                out.extend([e] * len(chunk))
+        return out
+
+    def get_transactions(self, hashes) -> dict:
+        """eth_getTransactionByHash per hash, batched: {hash: tx dict (pending or mined), None (unknown) or RpcError}."""
+        out = {}
+        for chunk in _chunks(list(dict.fromkeys(hashes)), self.batch_size):
+            try:
+                results = self.batch([("eth_getTransactionByHash", [h]) for h in chunk])
+            except RpcError as e:
+                results = [e] * len(chunk)
+            out.update(zip(chunk, results))
+        return out
+
+    def get_transaction_receipts(self, hashes) -> dict:
+        """eth_getTransactionReceipt per hash, batched: {hash: receipt dict, None (not mined) or RpcError}."""
+        out = {}
+        for chunk in _chunks(list(dict.fromkeys(hashes)), self.batch_size):
+            try:
+                results = self.batch([("eth_getTransactionReceipt", [h]) for h in chunk])
+            except RpcError as e:
+                results = [e] * len(chunk)
+            out.update(zip(chunk, results))
+        return out
+
+
+# Alchemy subdomain per chain_id
+ALCHEMY_NETWORKS = {
+    1: "eth-mainnet",
+    11155111: "eth-sepolia",
+    8453: "base-mainnet",
+    84532: "base-sepolia",
+}
+
+class ChainRegistry:
+    """
+    chain_id -> ChainEndpoint. `default` only serves calls without a chain_id: a row of a chain with no
+    endpoint of its own fails instead of being read (or paid) on another network.
+    """
+
+    def __init__(self, endpoints=(), default: ChainEndpoint = None):
+        self._endpoints = {e.chain_id: e for e in endpoints}
+        self.default = default
+
+    def __bool__(self) -> bool:
+        return bool(self._endpoints) or self.default is not None
+
+    def __iter__(self):
+        return iter(self._endpoints.values())
+
+    def get(self, chain_id) -> ChainEndpoint:
+        """Endpoint of chain_id (default when None). Raises RpcError for a chain without an endpoint."""
+        endpoint = self.default if chain_id is None else self._endpoints.get(int(chain_id))
+        if endpoint is None:
+            raise RpcError(f"no RPC endpoint configured for chain {chain_id}")
+        return endpoint
+
+    def stats(self) -> dict:
+        """{chain_id or "default": transport stats} for every endpoint that sent something."""
+        endpoints = list(self._endpoints.values()) + ([self.default] if self.default is not None else [])
+        return {
+            e.chain_id if e.chain_id is not None else "default": dict(e.transport.stats)
+            for e in endpoints if e.transport.stats["requests"] or e.transport.stats["short_circuited"]
+        }
+
+    @classmethod
+    def from_env(cls, api_key: str, network: str = "mainnet", environ=None, session=None):
+        """
+        Known chains (ALCHEMY_NETWORKS) use Alchemy with api_key; CHAIN_<id>_RPC_URL adds or overrides a
+        chain, CHAIN_<id>_BATCH_SIZE / _RATE / _CU_RATE tune it (defaults ALCHEMY_BATCH_SIZE / ALCHEMY_RATE /
+        ALCHEMY_CU_RATE), CHAIN_<id>_MULTICALL sets a non-canonical Multicall3 address, CHAIN_<id>_OP_STACK=1|0
+        marks a chain as charging (or not) an OP-stack L1 data fee.
+        ALCHEMY_RPC_URL replaces the Alchemy URL for every chain. ALCHEMY_NETWORK is the default for calls
+        without a chain_id; other chain_ids have no endpoint.
+        RPC_MAX_RETRIES, RPC_BREAKER_THRESHOLD and RPC_BREAKER_COOLDOWN apply to every endpoint.
+        session: HTTP session shared by every endpoint's transport (see AlchemyClient).
+        """
+        environ = os.environ if environ is None else environ
+        batch_size = int(environ.get("ALCHEMY_BATCH_SIZE") or DEFAULT_BATCH_SIZE)
+        rate = float(environ.get("ALCHEMY_RATE") or 0)
+        cu_rate = float(environ.get("ALCHEMY_CU_RATE") or 0)
+        max_retries = int(environ.get("RPC_MAX_RETRIES") or DEFAULT_MAX_RETRIES)
+        threshold = int(environ.get("RPC_BREAKER_THRESHOLD") or DEFAULT_BREAKER_THRESHOLD)
+        cooldown = float(environ.get("RPC_BREAKER_COOLDOWN") or DEFAULT_BREAKER_COOLDOWN)
+
+        def endpoint(chain_id, url):
+            prefix = f"CHAIN_{chain_id}_"
+            transport = Transport(
+                url,
+                rate=float(environ.get(prefix + "RATE") or rate),
+                cu_rate=float(environ.get(prefix + "CU_RATE") or cu_rate),
+                max_retries=max_retries,
+                breaker=CircuitBreaker(threshold, cooldown),
+                session=session,
+            )
+            return ChainEndpoint(
+                chain_id, url,
+                int(environ.get(prefix + "BATCH_SIZE") or batch_size),
+                multicall=environ.get(prefix + "MULTICALL") or MULTICALL3_ADDRESS,
+                transport=transport,
+                op_stack=None if not environ.get(prefix + "OP_STACK") else environ[prefix + "OP_STACK"] == "1",
+            )
+
+        override = environ.get("ALCHEMY_RPC_URL", "")
+        urls = {}
+        if api_key or override:
+            for chain_id, subdomain in ALCHEMY_NETWORKS.items():
+                urls[chain_id] = override or f"https://{subdomain}.g.alchemy.com/v2/{api_key}"
+        for name, value in environ.items():
+            m = re.match(r"^CHAIN_(\d+)_RPC_URL$", name)
+            if m and value:
+                urls[int(m.group(1))] = value
+        endpoints = [endpoint(chain_id, url) for chain_id, url in sorted(urls.items())]
+        default = endpoint(None, override or _rpc_url(network, api_key)) if api_key or override else None
+        return cls(endpoints, default)
+
+def make_session(pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True, http2: bool = False):
+    """
+    Pooled HTTP session: up to pool_size keep-alive connections per host, no transport-level retries
+    (Transport retries itself). http2=True returns an httpx.Client speaking HTTP/2 instead.
+    """
+    pool_size = max(1, int(pool_size))
+    if http2:
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("pip install httpx[http2] for ALCHEMY_HTTP2=1")
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size if keep_alive else 0)
+        return httpx.Client(http2=True, limits=limits)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+class AlchemyClient:
+    """
+    Long-lived Alchemy client: one pooled session (TCP/TLS handshakes paid once per host, not per call)
+    behind every chain endpoint and the Prices API.
+
+    client = AlchemyClient.from_env(api_key, network)
+    client.get_balances_wei(addresses, chain_id); client.get_eth_usd_price(); client.close()
+
+    chain_id None uses the ALCHEMY_NETWORK endpoint. Methods raise / return RpcError like ChainEndpoint.
+    """
+
+    def __init__(self, api_key: str, network: str = "mainnet", pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True, http2: bool = False, timeout: float = 10, environ=None):
+        self.api_key = api_key
+        self.network = network
+        self.timeout = timeout
+        self.session = make_session(pool_size, keep_alive, http2)
+        self.registry = ChainRegistry.from_env(api_key, network, environ, session=self.session)
+        # In-memory by default; the cron swaps in a DB-backed cache (prices table)
+        self.prices = PriceCache(self.get_usd_prices)
+
+    @classmethod
+    def from_env(cls, api_key: str, network: str = "mainnet", environ=None):
+        """ALCHEMY_POOL_SIZE (default 10), ALCHEMY_KEEP_ALIVE (default 1), ALCHEMY_HTTP2 (needs httpx[http2])."""
+        environ = os.environ if environ is None else environ
+        return cls(
+            api_key, network,
+            pool_size=int(environ.get("ALCHEMY_POOL_SIZE") or DEFAULT_POOL_SIZE),
+            keep_alive=environ.get("ALCHEMY_KEEP_ALIVE", "1") != "0",
+            http2=environ.get("ALCHEMY_HTTP2", "") == "1",
+            environ=environ,
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.registry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def endpoint(self, chain_id=None) -> ChainEndpoint:
+        return self.registry.get(chain_id)
+
+    def get_balance_wei(self, address: str, chain_id=None) -> int:
+        """Single eth_getBalance. Raises RpcError (a RuntimeError) on failure."""
+        wei = self.endpoint(chain_id).get_balances_wei([address])[address]
+        if isinstance(wei, RpcError):
+            raise wei
+        return wei
+
+    def get_balances_wei(self, addresses, chain_id=None) -> dict:
+        return self.endpoint(chain_id).get_balances_wei(addresses)
+
+    def get_block_number(self, chain_id=None) -> int:
+        return self.endpoint(chain_id).get_block_number()
+
+    def get_token_balances(self, pairs, chain_id=None) -> dict:
+        return self.endpoint(chain_id).get_token_balances(pairs)
+
+    def get_usd_prices(self, symbols) -> dict:
+        """
+        USD prices for many symbols, PRICES_BATCH per by-symbol request: {symbol: price}. Symbols without
+        a usable (positive) price are left out. Raises RpcError when a request fails.
+        """
+        out = {}
+        for chunk in _chunks(list(dict.fromkeys(symbols)), PRICES_BATCH):
+            try:
+                r = self.session.get(PRICES_URL, params={"symbols": chunk},
+                                     headers={"Authorization": f"Bearer {self.api_key}"}, timeout=self.timeout)
+                if r.status_code != 200:
+                    raise RpcError(f"Prices API HTTP {r.status_code}")
+                data = r.json()
+            except RpcError:
+                raise
+            except Exception as e:
+                raise RpcError(f"Prices API: {e}")
+            entries = (data.get("data") or []) if isinstance(data, dict) else []
+            for entry in entries:
+                if not isinstance(entry, dict) or entry.get("error"):
+                    continue
+                for quote in entry.get("prices") or []:
+                    if str(quote.get("currency", "")).upper() == "USD":
+                        price = valid_price(quote.get("value", quote.get("price")))
+                        if price is not None:
+                            out[entry.get("symbol")] = price
+        return out
+
+    def get_eth_usd_price(self) -> float:
+        """ETH/USD through self.prices (TTL, stale-while-revalidate). Raises RpcError when no good quote exists."""
+        price = self.prices.get("ETH")
+        if price is None:
+            raise RpcError("no ETH/USD price available")
+        return price
+
+    def stats(self) -> dict:
+        return self.registry.stats()
+
 
 def wei_to_eth(wei: int) -> float:
     return float(Decimal(wei) / Decimal(10**18))
 
 def get_eth_usd_price(api_key: str) -> float:
-    url = "https://prices.g.alchemy.com/v1/tokens/by-symbol?symbols=ETH"
-    r = requests.get(url, headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
-    if r.status_code != 200:
-        return 0.0
-    data = r.json()
-    try:
-        prices = data.get("data", [{}])[0].get("prices", [])
-        for p in prices:
-            if p.get("currency") == "USD":
-                return float(p.get("price", 0))
-    except (IndexError, KeyError, TypeError):
-        pass
-    return 0.0
+    """ETH/USD from the Prices API (shared pooled client, cached). Raises RpcError when no good quote exists."""
+    return _shared_client(api_key, "mainnet").get_eth_usd_price()
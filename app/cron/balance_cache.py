@@ -0,0 +1,99 @@
+"""
+Persistent balance cache (balance_cache table) keyed by (chain_id, address).
+An entry is reused while it is younger than max_age seconds, or when it was read at (or after)
+the current chain head, since nothing can have changed on chain since then. Errors are never cached.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from bulk import ChunkedWriter
+
+# Addresses per IN (...) lookup
+_LOOKUP_CHUNK = 500
+
+def _now() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+class BalanceCache:
+    """
+    cache = BalanceCache(conn, max_age=60)
+    wei = cache.get_balances_wei(addresses, chain_id, fetch_wei, get_head)
+
+    fetch_wei(addresses, chain_id) -> {address: wei or Exception}; get_head(chain_id) -> block number.
+    hits / misses count addresses served from the cache / sent to fetch_wei.
+    Safe to share between the per-chain polling threads: DB access is serialized by a lock.
+    """
+
+    def __init__(self, conn, max_age: float = 0):
+        self._conn = conn
+        self._max_age = timedelta(seconds=max(0.0, float(max_age)))
+        self._known = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, chain_id, addresses, head=None):
+        """Split addresses into ({address: cached wei}, [addresses to fetch])."""
+        with self._lock:
+            return self._lookup(chain_id, list(dict.fromkeys(addresses)), head)
+
+    def _lookup(self, chain_id, addresses, head):
+        cutoff = (_now() - self._max_age).strftime("%Y-%m-%d %H:%M:%S")
+        cur = self._conn.cursor()
+        hits = {}
+        for start in range(0, len(addresses), _LOOKUP_CHUNK):
+            chunk = addresses[start:start + _LOOKUP_CHUNK]
+            cur.execute(
+                f"""SELECT address, balance_wei, block_number, checked_at FROM balance_cache
+                    WHERE chain_id = ? AND address IN ({", ".join("?" * len(chunk))})""",
+                (chain_id, *chunk),
+            )
+            for address, balance_wei, block_number, checked_at in cur.fetchall():
+                self._known.add((chain_id, address))
+                at_head = head is not None and block_number is not None and int(block_number) >= head
+                if at_head or (self._max_age and checked_at >= cutoff):
+                    hits[address] = int(balance_wei)
+        misses = [a for a in addresses if a not in hits]
+        self.hits += len(hits)
+        self.misses += len(misses)
+        return hits, misses
+
+    def store(self, chain_id, balances, head=None) -> None:
+        """Persist successful {address: wei} results read at chain head `head` (commits)."""
+        with self._lock:
+            self._store(chain_id, balances, head)
+
+    def _store(self, chain_id, balances, head) -> None:
+        now = _now().strftime("%Y-%m-%d %H:%M:%S")
+        with ChunkedWriter(self._conn, "balance_cache") as writer:
+            for address, wei in balances.items():
+                if isinstance(wei, Exception):
+                    continue
+                if (chain_id, address) in self._known:
+                    writer.add((
+                        """UPDATE balance_cache SET balance_wei = ?, block_number = ?, checked_at = ?
+                           WHERE chain_id = ? AND address = ?""",
+                        (str(wei), head, now, chain_id, address),
+                    ))
+                else:
+                    writer.add((
+                        """INSERT INTO balance_cache (chain_id, address, balance_wei, block_number, checked_at)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        (chain_id, address, str(wei), head, now),
+                    ))
+                    self._known.add((chain_id, address))
+
+    def get_balances_wei(self, addresses, chain_id, fetch_wei, get_head=None) -> dict:
+        """Cached balances plus fetch_wei() for the rest. A failing get_head only disables the head check."""
+        head = None
+        if get_head is not None:
+            try:
+                head = int(get_head(chain_id))
+            except Exception as e:
+                print(f"balance cache: head lookup failed for chain {chain_id}: {e}")
+        out, misses = self.lookup(chain_id, addresses, head)
+        if misses:
+            fetched = fetch_wei(misses, chain_id)
+            self.store(chain_id, fetched, head)
+            out.update(fetched)
+        return out
@@ -0,0 +1,58 @@
+"""
+The app's real schema for the benchmark and the cron tests, created by the PHP code that owns it.
+
+SQLite: the script dump_schema.php prints (Schema::run() then Views::run() on an in-memory database,
+read back from sqlite_master). With php on PATH it is generated on the spot; without php the committed
+copy schema.sqlite.sql is used, so regenerate that after changing Schema.php or Views.php:
+    php cron/bench/dump_schema.php > cron/bench/schema.sqlite.sql
+MariaDB: php public/schema.php, the app's own migration, against the database from .env (needs php).
+
+Run from app folder: python cron/bench/app_schema.py path/to/new.sqlite
+"""
+import shutil
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import Connection
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent.parent
+DUMP_SCRIPT = BENCH_DIR / "dump_schema.php"
+SQLITE_DUMP = BENCH_DIR / "schema.sqlite.sql"
+
+
+def sqlite_schema() -> str:
+    """The SQLite schema script: fresh from dump_schema.php when php is available, else the committed dump."""
+    php = shutil.which("php")
+    if php is None:
+        return SQLITE_DUMP.read_text(encoding="utf-8")
+    return subprocess.run([php, str(DUMP_SCRIPT)], check=True, capture_output=True, text=True).stdout
+
+def apply_schema(conn) -> None:
+    """Create the app's tables and views on conn (db.Connection). MariaDB needs php; raises RuntimeError without it."""
+    if conn.dialect == "sqlite":
+        conn.raw.executescript(sqlite_schema())
+        return
+    php = shutil.which("php")
+    if php is None:
+        raise RuntimeError("the MariaDB schema is created by public/schema.php: put php on PATH")
+    # Same .env database conn points at
+    subprocess.run([php, str(APP_DIR / "public" / "schema.php")], cwd=APP_DIR, check=True, capture_output=True)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__.strip().splitlines()[-1])
+    conn = Connection(sqlite3.connect(sys.argv[1]), "sqlite")
+    try:
+        apply_schema(conn)
+        print(f"schema applied to {sys.argv[1]} ({'php' if shutil.which('php') else SQLITE_DUMP.name})")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
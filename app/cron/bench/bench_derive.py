@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-address Account.from_mnemonic (derive_escrow_address) vs cached HDDeriver.
+Also checks both paths give identical addresses.
+
+Run from app folder: python cron/bench/bench_derive.py [--count 2000] [--reference-count 100]
+"""
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from escrow import HDDeriver, derive_deposit_address, derive_escrow_address
+
+# Public test mnemonic (never fund it)
+TEST_MNEMONIC = "test test test test test test test test test test test junk"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="addresses for the cached path")
+    parser.add_argument("--reference-count", type=int, default=100, help="addresses for the from_mnemonic path")
+    args = parser.parse_args()
+
+    uuids = [uuid.uuid4().hex for _ in range(max(args.count, args.reference_count))]
+
+    t0 = time.perf_counter()
+    reference = [(derive_escrow_address(TEST_MNEMONIC, u), derive_deposit_address(TEST_MNEMONIC, u))
+                 for u in uuids[:args.reference_count]]
+    ref_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    deriver = HDDeriver(TEST_MNEMONIC)
+    init_secs = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cached = [(deriver.escrow_address(u), deriver.deposit_address(u)) for u in uuids[:args.count]]
+    cached_secs = time.perf_counter() - t0
+
+    if cached[:args.reference_count] != reference:
+        print("MISMATCH: cached derivation differs from Account.from_mnemonic", file=sys.stderr)
+        sys.exit(1)
+
+    ref_per = ref_secs / (2 * args.reference_count) * 1000
+    cached_per = cached_secs / (2 * args.count) * 1000
+    print(f"from_mnemonic: {2 * args.reference_count} addresses in {ref_secs:.3f}s ({ref_per:.3f} ms/address)")
+    print(f"HDDeriver:     {2 * args.count} addresses in {cached_secs:.3f}s ({cached_per:.3f} ms/address), init {init_secs * 1000:.1f} ms")
+    print(f"speedup:       {ref_per / cached_per:.1f}x (addresses identical)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call requests.post (new TCP connection every call) vs AlchemyClient's pooled keep-alive
+session, against the local JSON-RPC stub. Reports mean / p50 / p99 latency per eth_blockNumber call,
+sequentially and from --threads concurrent pollers. Over TLS (real Alchemy) the handshake saved per call is larger.
+
+Run from app folder: python cron/bench/bench_http.py [--calls 500] [--threads 4] [--latency 0.0]
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from alchemy_client import AlchemyClient, ChainEndpoint
+from stub_rpc import StubChain, start
+
+def _timed(call, calls: int, threads: int) -> list:
+    def one(_):
+        t0 = time.perf_counter()
+        call()
+        return time.perf_counter() - t0
+    if threads <= 1:
+        return [one(i) for i in range(calls)]
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(one, range(calls)))
+
+def _report(label: str, samples: list, wall: float) -> float:
+    ms = sorted(s * 1000 for s in samples)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{label:<28} mean {statistics.mean(ms):7.3f} ms  p50 {statistics.median(ms):7.3f} ms  "
+          f"p99 {p99:7.3f} ms  ({len(ms) / wall:8.1f} calls/s)")
+    return statistics.mean(ms)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500, help="eth_blockNumber calls per run")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent callers for the threaded runs")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub server latency per request (seconds)")
+    args = parser.parse_args()
+
+    chain = StubChain()
+    chain.latency = args.latency
+    server, url = start(chain)
+    before = ChainEndpoint(None, url)
+    after = AlchemyClient("", environ={"ALCHEMY_RPC_URL": url, "ALCHEMY_POOL_SIZE": str(max(1, args.threads))})
+    try:
+        for threads in (1, args.threads):
+            suffix = "sequential" if threads == 1 else f"{threads} threads"
+            results = []
+            for label, call in (("per-call requests.post", before.get_block_number),
+                                ("AlchemyClient (pooled)", after.get_block_number)):
+                call()  # warm-up (pool: opens the connection)
+                t0 = time.perf_counter()
+                samples = _timed(call, args.calls, threads)
+                results.append(_report(f"{label}, {suffix}", samples, time.perf_counter() - t0))
+            print(f"{'speedup':<28} {results[0] / results[1]:.2f}x mean latency\n")
+    finally:
+        after.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
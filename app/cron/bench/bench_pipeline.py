@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark: every tasks.py run_* function on a synthetic marketplace at several scales.
+The DB gets the real schema (app_schema.py: the SQLite dump of Schema.php + Views.php, or public/schema.php
+on MariaDB), then per scale a seeded
+dataset: evm_transactions with a status history (PENDING / COMPLETED / RELEASED / FAILED, a slice
+stale enough for fail_old_pending and a slice with no escrow address yet for fill_escrow), deposits
+(some without an address) and pending withdraw intents. Balances come from the local JSON-RPC stub
+(stub_rpc.py) with --latency per request; a third of the pending escrows and half the deposits are
+funded. Each repeat starts from the same seeded state and runs the tasks in cron order.
+Reports per task: rows processed, min / median / max wall time over the repeats (a handful of runs
+says nothing about tail percentiles), rows/s at the median, RPC calls and DB statements (metrics.py
+counters). --json writes the same numbers for before/after diffs.
+
+Run from app folder: python cron/bench/bench_pipeline.py [--scales 1000,10000,100000] [--repeat 5]
+    [--latency 0.0] [--json out.json] [--mysql]
+--mysql seeds the DB_DRIVER=mariadb database from .env / the environment instead of SQLite (schema by
+php public/schema.php, so php must be on PATH): use a scratch database, its marketplace tables are
+emptied before every repeat.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from alchemy_client import AlchemyClient, wei_to_eth
+from app_schema import apply_schema
+from current_status import refresh_current_statuses
+from db import Connection, _sqlite_connect, get_connection
+from escrow import HDDeriver
+from metrics import RunMetrics
+from price_cache import PriceCache
+from stub_rpc import StubChain, start
+from tasks import (
+    run_fail_old_pending,
+    run_fill_deposit_address,
+    run_fill_escrow,
+    run_process_withdraw_intents,
+    run_refresh_prices,
+    run_update_deposit_balances,
+    run_update_pending,
+)
+
+APP_DIR = str(Path(__file__).resolve().parent.parent.parent)
+# Public test mnemonic (never fund it)
+TEST_MNEMONIC = "test test test test test test test test test test test junk"
+CHAIN_ID = 1
+# Tables the seed fills or the tasks write; emptied before each MariaDB repeat
+SEEDED_TABLES = (
+    "deposit_withdraw_intents", "deposit_history", "deposits", "current_transaction_statuses",
+    "transaction_statuses", "evm_transactions", "transactions", "packages", "items", "stores",
+    "users", "accepted_tokens", "config", "cron_state", "prices", "cron_runs",
+)
+# Share of seeded transactions per current status; the rest of PENDING is recent
+STATUS_MIX = (("PENDING", 0.3), ("COMPLETED", 0.2), ("RELEASED", 0.4), ("FAILED", 0.1))
+
+def _address(rng) -> str:
+    return "0x" + rng.getrandbits(160).to_bytes(20, "big").hex()
+
+def _ts(t: datetime) -> str:
+    return t.strftime("%Y-%m-%d %H:%M:%S")
+
+def seed(conn, scale: int, unfilled: float, seed_value: int = 1) -> dict:
+    """
+    Insert `scale` EVM transactions (+ history), scale/10 deposits and scale/100 withdraw intents.
+    Returns {address: wei} to fund on the stub chain. Deterministic for a given seed_value.
+    """
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    stamp = _ts(now)
+    cur = conn.cursor()
+    buyers = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(max(10, scale // 20))]
+    stores = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(max(5, scale // 200))]
+    cur.executemany("INSERT INTO users (uuid, username, passphrase_hash, role, created_at) VALUES (?, ?, 'x', 'user', ?)",
+                    [(u, f"buyer{i}", stamp) for i, u in enumerate(buyers)])
+    cur.executemany("INSERT INTO stores (uuid, storename, created_at, withdraw_address) VALUES (?, ?, ?, ?)",
+                    [(s, f"store{i}", stamp, _address(rng)) for i, s in enumerate(stores)])
+    cur.executemany("INSERT INTO items (uuid, name, store_uuid, created_at) VALUES (?, 'item', ?, ?)",
+                    [(s, s, stamp) for s in stores])
+    cur.executemany("INSERT INTO packages (uuid, item_uuid, store_uuid, created_at) VALUES (?, ?, ?, ?)",
+                    [(s, s, s, stamp) for s in stores])
+    cur.execute("INSERT INTO accepted_tokens (chain_id, symbol, contract_address, created_at) VALUES (?, 'ETH', NULL, ?)",
+                (CHAIN_ID, stamp))
+    cur.execute("INSERT INTO config (`key`, value) VALUES ('pending_duration', '24h')")
+
+    funded = {}
+    transactions, evm, statuses = [], [], []
+    for i in range(scale):
+        tx_uuid = uuid.UUID(int=rng.getrandbits(128)).hex
+        store = rng.choice(stores)
+        amount = round(rng.uniform(0.01, 2.0), 6)
+        transactions.append((tx_uuid, "evm", store, store, rng.choice(buyers), stamp))
+        if rng.random() < unfilled:
+            # No escrow address yet: run_fill_escrow derives it and writes the first PENDING
+            evm.append((tx_uuid, None, amount, CHAIN_ID, "ETH", stamp))
+            continue
+        address = _address(rng)
+        evm.append((tx_uuid, address, amount, CHAIN_ID, "ETH", stamp))
+        roll, status = rng.random(), "PENDING"
+        for status, share in STATUS_MIX:
+            roll -= share
+            if roll < 0:
+                break
+        # Open escrows are young; one in ten PENDING is past pending_duration
+        age = timedelta(hours=rng.uniform(25, 72) if status == "PENDING" and rng.random() < 0.1 else rng.uniform(0, 20))
+        if status != "PENDING":
+            age = timedelta(days=rng.uniform(1, 30))
+        created = now - age
+        history = ["PENDING"] + {"PENDING": [], "COMPLETED": ["COMPLETED"], "RELEASED": ["COMPLETED", "RELEASED"],
+                                 "FAILED": ["FAILED"]}[status]
+        for step, name in enumerate(history):
+            t = _ts(created + timedelta(minutes=10 * step))
+            statuses.append((tx_uuid, t, amount if name != "PENDING" else 0, name, "seed", t))
+        if status == "PENDING" and rng.random() < 1 / 3:
+            funded[address] = int(amount * 10 ** 18)
+    cur.executemany("""INSERT INTO transactions (uuid, type, package_uuid, store_uuid, buyer_uuid, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""", transactions)
+    cur.executemany("""INSERT INTO evm_transactions (uuid, escrow_address, amount, chain_id, currency, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""", evm)
+    cur.executemany("""INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""", statuses)
+
+    deposits, intents = [], []
+    for i in range(max(10, scale // 10)):
+        deposit_uuid = uuid.UUID(int=rng.getrandbits(128)).hex
+        address = None if rng.random() < unfilled else _address(rng)
+        deposits.append((deposit_uuid, rng.choice(stores), "USD", "ETH", address, 0, 0, 0, stamp))
+        if address is not None and rng.random() < 0.5:
+            funded[address] = rng.randrange(10 ** 15, 10 ** 18)
+        if address is not None and i % 10 == 0:
+            intents.append((deposit_uuid, _address(rng), stamp, buyers[0], "pending", stamp))
+    cur.executemany("""INSERT INTO deposits (uuid, store_uuid, currency, crypto, address, crypto_value, fiat_value,
+                       currency_rate, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", deposits)
+    cur.executemany("""INSERT INTO deposit_withdraw_intents (deposit_uuid, to_address, requested_at,
+                       requested_by_user_uuid, status, created_at) VALUES (?, ?, ?, ?, ?, ?)""", intents)
+    conn.commit()
+    # Steady state: the cron has already materialized current statuses once
+    refresh_current_statuses(conn)
+    return funded
+
+def _empty(conn) -> None:
+    for table in SEEDED_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+
+def _mysql_connection() -> Connection:
+    conn = get_connection(APP_DIR)
+    if conn.dialect != "mysql":
+        # The seeded tables are emptied: never point this at the app's own SQLite store
+        conn.close()
+        sys.exit("--mysql needs DB_DRIVER=mariadb (a scratch database)")
+    return conn
+
+def run_scale(scale: int, args, deriver, client, chain) -> dict:
+    """Seed once (SQLite: into a template file copied per repeat), run the tasks `repeat` times."""
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    template = os.path.join(workdir, "template.sqlite")
+    t0 = time.perf_counter()
+    if args.mysql:
+        conn = _mysql_connection()
+        apply_schema(conn)
+        _empty(conn)
+    else:
+        conn = Connection(sqlite3.connect(template), "sqlite")
+        apply_schema(conn)
+    funded = seed(conn, scale, args.unfilled)
+    conn.close()
+    seed_secs = time.perf_counter() - t0
+
+    def get_balances_eth(addresses, chain_id):
+        return {a: v if isinstance(v, Exception) else wei_to_eth(v)
+                for a, v in client.get_balances_wei(addresses, chain_id).items()}
+
+    prices = PriceCache(lambda symbols: {s: 3000.0 for s in symbols}, ttl=0)
+    runs = []
+    try:
+        for repeat in range(args.repeat):
+            if args.mysql:
+                conn = _mysql_connection()
+                if repeat:
+                    _empty(conn)
+                    seed(conn, scale, args.unfilled)
+            else:
+                path = os.path.join(workdir, f"run{repeat}.sqlite")
+                shutil.copy(template, path)
+                # Same pragmas as the cron's own SQLite connection
+                conn = Connection(_sqlite_connect(path), "sqlite")
+            chain.balances = {a.lower(): wei for a, wei in funded.items()}
+            metrics = RunMetrics(conn, client.registry, store=False)
+            timed = metrics.timed
+            metrics.start()
+            timed(run_refresh_prices)(conn, prices)
+            timed(run_fill_escrow)(conn, deriver.escrow_chunks, args.write_chunk)
+            timed(run_update_pending)(conn, get_balances_eth, 0.05, args.write_chunk)
+            timed(run_fail_old_pending)(conn, lambda key, default="": "24h" if key == "pending_duration" else default,
+                                        args.write_chunk)
+            timed(run_fill_deposit_address)(conn, deriver.deposit_chunks, args.write_chunk)
+            timed(run_update_deposit_balances)(conn, get_balances_eth, args.write_chunk)
+            timed(run_process_withdraw_intents)(conn, args.write_chunk)
+            runs.append(metrics.finish("ok"))
+            conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"scale": scale, "seed_seconds": round(seed_secs, 3), "tasks": _summarize(runs)}
+
+def _summarize(runs) -> list:
+    out = []
+    for name in [t["task"] for t in runs[0]["tasks"]]:
+        records = [t for run in runs for t in run["tasks"] if t["task"] == name]
+        seconds = [t["seconds"] for t in records]
+        median = statistics.median(seconds)
+        rows = records[0]["rows"] or 0
+        out.append({
+            "task": name, "rows": rows, "min_ms": round(min(seconds) * 1000, 3),
+            "median_ms": round(median * 1000, 3), "max_ms": round(max(seconds) * 1000, 3),
+            "rows_per_second": round(rows / median, 1) if median > 0 else None,
+            "rpc_calls": records[0]["rpc_calls"], "rpc_requests": records[0]["rpc_requests"],
+            "db_statements": records[0]["db_statements"],
+        })
+    return out
+
+def _report(result: dict) -> None:
+    print(f"\nscale {result['scale']} (seeded in {result['seed_seconds']:.1f}s)")
+    print(f"{'task':<26}{'rows':>9}{'min ms':>11}{'median ms':>11}{'max ms':>11}{'rows/s':>12}{'RPC calls':>11}"
+          f"{'requests':>10}{'DB stmts':>10}")
+    for t in result["tasks"]:
+        rate = "-" if t["rows_per_second"] is None else f"{t['rows_per_second']:.0f}"
+        print(f"{t['task']:<26}{t['rows']:>9}{t['min_ms']:>11.2f}{t['median_ms']:>11.2f}{t['max_ms']:>11.2f}{rate:>12}"
+              f"{t['rpc_calls']:>11}{t['rpc_requests']:>10}{t['db_statements']:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated transaction counts")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scale (min/median/max are over these)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub server latency per request (seconds)")
+    parser.add_argument("--unfilled", type=float, default=0.01, help="share of rows seeded without an address")
+    parser.add_argument("--write-chunk", type=int, default=500, help="ChunkedWriter chunk size (CRON_WRITE_CHUNK)")
+    parser.add_argument("--batch-size", type=int, default=100, help="eth_getBalance calls per JSON-RPC batch")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--mysql", action="store_true", help="use the MariaDB database from .env instead of SQLite")
+    args = parser.parse_args()
+    args.repeat = max(1, args.repeat)
+    if args.mysql and shutil.which("php") is None:
+        sys.exit("--mysql creates the schema with php public/schema.php: put php on PATH")
+
+    chain = StubChain()
+    chain.latency = args.latency
+    server, url = start(chain)
+    client = AlchemyClient("", environ={"ALCHEMY_RPC_URL": url, "ALCHEMY_BATCH_SIZE": str(args.batch_size)})
+    deriver = HDDeriver(TEST_MNEMONIC)
+    results = []
+    try:
+        for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+            results.append(run_scale(scale, args, deriver, client, chain))
+            _report(results[-1])
+    finally:
+        client.close()
+        server.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency, "repeat": args.repeat, "batch_size": args.batch_size,
+                       "write_chunk": args.write_chunk, "db": "mysql" if args.mysql else "sqlite",
+                       "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
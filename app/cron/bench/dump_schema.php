@@ -0,0 +1,24 @@
+<?php
+
+declare(strict_types=1);
+
+/**
+ * Print the app's SQLite schema as an SQL script: Schema::run() then Views::run() on an in-memory
+ * database, read back from sqlite_master in creation order. app_schema.py runs this when php is
+ * available; the committed output (schema.sqlite.sql) is used when it is not.
+ * Run from app folder: php cron/bench/dump_schema.php > cron/bench/schema.sqlite.sql
+ */
+$inc = dirname(__DIR__, 2) . DIRECTORY_SEPARATOR . 'public' . DIRECTORY_SEPARATOR . 'includes' . DIRECTORY_SEPARATOR;
+require $inc . 'Schema.php';
+require $inc . 'Views.php';
+
+$pdo = new PDO('sqlite::memory:');
+$pdo->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
+(new Schema($pdo, true))->run();
+(new Views($pdo, true))->run();
+
+echo "-- Generated by cron/bench/dump_schema.php from public/includes/Schema.php and Views.php; do not edit.\n";
+$rows = $pdo->query("SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY rowid");
+foreach ($rows as $row) {
+    echo $row['sql'], ";\n";
+}
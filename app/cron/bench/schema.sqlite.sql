@@ -0,0 +1,515 @@
+-- Generated by cron/bench/dump_schema.php from public/includes/Schema.php and Views.php; do not edit.
+CREATE TABLE users (
+    uuid TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    passphrase_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    inviter_uuid TEXT,
+    refund_address_evm TEXT,
+    resolver_evm_address TEXT,
+    banned INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT
+);
+CREATE TABLE stores (
+    uuid TEXT PRIMARY KEY,
+    storename TEXT NOT NULL UNIQUE CHECK (LENGTH(storename) >= 1 AND LENGTH(storename) <= 16),
+    description TEXT,
+    vendorship_agreed_at TEXT,
+    is_gold INTEGER NOT NULL DEFAULT 0,
+    is_silver INTEGER NOT NULL DEFAULT 0,
+    is_bronze INTEGER NOT NULL DEFAULT 0,
+    is_free INTEGER NOT NULL DEFAULT 1,
+    is_suspended INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT
+, withdraw_address TEXT);
+CREATE TABLE store_users (
+    store_uuid TEXT NOT NULL,
+    user_uuid TEXT NOT NULL,
+    role TEXT NOT NULL,
+    PRIMARY KEY (store_uuid, user_uuid, role),
+    FOREIGN KEY (store_uuid) REFERENCES stores(uuid),
+    FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+);
+CREATE TABLE item_categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name_en TEXT NOT NULL,
+            parent_id INTEGER,
+            FOREIGN KEY (parent_id) REFERENCES item_categories(id)
+        );
+CREATE TABLE items (
+    uuid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    store_uuid TEXT NOT NULL,
+    category_id INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT,
+    FOREIGN KEY (store_uuid) REFERENCES stores(uuid),
+    FOREIGN KEY (category_id) REFERENCES item_categories(id)
+);
+CREATE TABLE packages (
+    uuid TEXT PRIMARY KEY,
+    item_uuid TEXT NOT NULL,
+    store_uuid TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    type TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT,
+    FOREIGN KEY (item_uuid) REFERENCES items(uuid),
+    FOREIGN KEY (store_uuid) REFERENCES stores(uuid)
+);
+CREATE TABLE package_prices (
+    uuid TEXT PRIMARY KEY,
+    package_uuid TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    price_usd REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (package_uuid) REFERENCES packages(uuid)
+);
+CREATE TABLE payment_receipts (
+    uuid TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    serialized_data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE transactions (
+    uuid TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    description TEXT,
+    package_uuid TEXT NOT NULL,
+    store_uuid TEXT NOT NULL,
+    buyer_uuid TEXT NOT NULL,
+    dispute_uuid TEXT,
+    refund_address TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT, buyer_confirmed_at TEXT,
+    FOREIGN KEY (package_uuid) REFERENCES packages(uuid),
+    FOREIGN KEY (store_uuid) REFERENCES stores(uuid),
+    FOREIGN KEY (buyer_uuid) REFERENCES users(uuid)
+);
+CREATE TABLE evm_transactions (
+    uuid TEXT PRIMARY KEY,
+    escrow_address TEXT,
+    amount REAL NOT NULL,
+    chain_id INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    FOREIGN KEY (uuid) REFERENCES transactions(uuid)
+);
+CREATE TABLE transaction_statuses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_uuid TEXT NOT NULL,
+            time TEXT NOT NULL,
+            amount REAL NOT NULL,
+            status TEXT NOT NULL,
+            comment TEXT,
+            user_uuid TEXT,
+            payment_receipt_uuid TEXT,
+            created_at TEXT,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid),
+            FOREIGN KEY (payment_receipt_uuid) REFERENCES payment_receipts(uuid)
+        );
+CREATE TABLE current_transaction_statuses (
+    transaction_uuid TEXT PRIMARY KEY,
+    status_id INTEGER NOT NULL,
+    time TEXT NOT NULL,
+    amount REAL NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid)
+);
+CREATE INDEX idx_current_tx_statuses_status ON current_transaction_statuses(status);
+CREATE TABLE shipping_statuses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_uuid TEXT NOT NULL,
+            time TEXT NOT NULL,
+            status TEXT NOT NULL,
+            comment TEXT,
+            user_uuid TEXT,
+            created_at TEXT,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid)
+        );
+CREATE TABLE referral_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_uuid TEXT NOT NULL,
+            user_uuid TEXT NOT NULL,
+            referral_percent REAL NOT NULL,
+            referral_payment_eth REAL NOT NULL DEFAULT 0,
+            referral_payment_usd REAL NOT NULL DEFAULT 0,
+            is_buyer_referral INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid),
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE TABLE deposits (
+    uuid TEXT PRIMARY KEY,
+    store_uuid TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    crypto TEXT NOT NULL,
+    address TEXT,
+    crypto_value REAL NOT NULL,
+    fiat_value REAL NOT NULL,
+    currency_rate REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT,
+    FOREIGN KEY (store_uuid) REFERENCES stores(uuid)
+);
+CREATE TABLE deposit_history (
+            uuid TEXT PRIMARY KEY,
+            deposit_uuid TEXT NOT NULL,
+            action TEXT NOT NULL,
+            value REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (deposit_uuid) REFERENCES deposits(uuid)
+        );
+CREATE TABLE disputes (
+    uuid TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    resolver_user_uuid TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    deleted_at TEXT, transaction_uuid TEXT,
+    FOREIGN KEY (resolver_user_uuid) REFERENCES users(uuid)
+);
+CREATE TABLE dispute_claims (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dispute_uuid TEXT NOT NULL,
+            claim TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT, user_uuid TEXT,
+            FOREIGN KEY (dispute_uuid) REFERENCES disputes(uuid)
+        );
+CREATE TABLE transaction_intents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_uuid TEXT NOT NULL,
+            action TEXT NOT NULL,
+            params TEXT,
+            requested_at TEXT NOT NULL,
+            requested_by_user_uuid TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT, claimed_by TEXT, lease_until TEXT, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, signed_txs TEXT, processed_at TEXT, next_attempt_at TEXT,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid)
+        );
+CREATE TABLE password_reset_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_uuid TEXT NOT NULL,
+            token TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE UNIQUE INDEX idx_password_reset_tokens_token ON password_reset_tokens(token);
+CREATE INDEX idx_password_reset_tokens_user ON password_reset_tokens(user_uuid);
+CREATE TABLE recovery_rate_limit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip_hash TEXT NOT NULL,
+            requested_at TEXT NOT NULL
+        );
+CREATE INDEX idx_recovery_rate_limit_ip ON recovery_rate_limit(ip_hash);
+CREATE INDEX idx_recovery_rate_limit_at ON recovery_rate_limit(requested_at);
+CREATE TABLE login_rate_limit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip_hash TEXT NOT NULL,
+            attempted_at TEXT NOT NULL
+        );
+CREATE INDEX idx_login_rate_limit_ip ON login_rate_limit(ip_hash);
+CREATE INDEX idx_login_rate_limit_at ON login_rate_limit(attempted_at);
+CREATE TABLE registration_rate_limit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+CREATE INDEX idx_registration_rate_limit_ip ON registration_rate_limit(ip_hash);
+CREATE INDEX idx_registration_rate_limit_at ON registration_rate_limit(created_at);
+CREATE TABLE invite_codes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT NOT NULL,
+            created_by_user_uuid TEXT,
+            used_by_user_uuid TEXT,
+            used_at TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (created_by_user_uuid) REFERENCES users(uuid),
+            FOREIGN KEY (used_by_user_uuid) REFERENCES users(uuid)
+        );
+CREATE UNIQUE INDEX idx_invite_codes_code ON invite_codes(code);
+CREATE TABLE reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_uuid TEXT NOT NULL UNIQUE,
+            store_uuid TEXT NOT NULL,
+            rater_user_uuid TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            comment TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid),
+            FOREIGN KEY (store_uuid) REFERENCES stores(uuid),
+            FOREIGN KEY (rater_user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_reviews_store ON reviews(store_uuid);
+CREATE TABLE store_warnings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            store_uuid TEXT NOT NULL,
+            author_user_uuid TEXT NOT NULL,
+            message TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            resolved_at TEXT,
+            acked_at TEXT,
+            FOREIGN KEY (store_uuid) REFERENCES stores(uuid),
+            FOREIGN KEY (author_user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_store_warnings_store ON store_warnings(store_uuid);
+CREATE TABLE support_tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_uuid TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_support_tickets_user ON support_tickets(user_uuid);
+CREATE TABLE support_ticket_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER NOT NULL,
+            user_uuid TEXT NOT NULL,
+            body TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (ticket_id) REFERENCES support_tickets(id),
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_support_ticket_messages_ticket ON support_ticket_messages(ticket_id, created_at);
+CREATE TABLE private_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user_uuid TEXT NOT NULL,
+            to_user_uuid TEXT NOT NULL,
+            body TEXT NOT NULL,
+            read_at TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (from_user_uuid) REFERENCES users(uuid),
+            FOREIGN KEY (to_user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_private_messages_from ON private_messages(from_user_uuid, created_at);
+CREATE INDEX idx_private_messages_to ON private_messages(to_user_uuid, created_at);
+CREATE TABLE deposit_withdraw_intents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            deposit_uuid TEXT NOT NULL,
+            to_address TEXT NOT NULL,
+            requested_at TEXT NOT NULL,
+            requested_by_user_uuid TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL, claimed_by TEXT, lease_until TEXT, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, signed_txs TEXT, processed_at TEXT, next_attempt_at TEXT,
+            FOREIGN KEY (deposit_uuid) REFERENCES deposits(uuid),
+            FOREIGN KEY (requested_by_user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_deposit_withdraw_intents_deposit ON deposit_withdraw_intents(deposit_uuid);
+CREATE INDEX idx_deposit_withdraw_intents_status ON deposit_withdraw_intents(status);
+CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            actor_user_uuid TEXT NOT NULL,
+            action_type TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id TEXT NOT NULL,
+            metadata TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (actor_user_uuid) REFERENCES users(uuid)
+        );
+CREATE INDEX idx_audit_log_actor ON audit_log(actor_user_uuid);
+CREATE INDEX idx_audit_log_target ON audit_log(target_type, target_id);
+CREATE TABLE config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE api_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_uuid TEXT NOT NULL,
+            name TEXT,
+            api_key TEXT NOT NULL,
+            key_prefix TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            last_used_at TEXT,
+            expires_at TEXT,
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE TABLE api_key_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            api_key_id INTEGER NOT NULL,
+            requested_at TEXT NOT NULL,
+            FOREIGN KEY (api_key_id) REFERENCES api_keys(id)
+        );
+CREATE TABLE agent_identities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_id TEXT NOT NULL,
+            agent_name TEXT,
+            provider TEXT NOT NULL,
+            user_uuid TEXT NOT NULL,
+            first_verified_at TEXT NOT NULL,
+            last_verified_at TEXT NOT NULL,
+            FOREIGN KEY (user_uuid) REFERENCES users(uuid)
+        );
+CREATE UNIQUE INDEX idx_agent_identities_agent_id ON agent_identities(agent_id);
+CREATE INDEX idx_agent_identities_user ON agent_identities(user_uuid);
+CREATE TABLE agent_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_id TEXT NOT NULL,
+            requested_at TEXT NOT NULL
+        );
+CREATE INDEX idx_agent_requests_agent ON agent_requests(agent_id);
+CREATE INDEX idx_agent_requests_at ON agent_requests(requested_at);
+CREATE TABLE hooks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_name TEXT NOT NULL,
+            webhook_url TEXT,
+            enabled INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        );
+CREATE INDEX idx_hooks_event ON hooks(event_name);
+CREATE TABLE hook_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hook_id INTEGER,
+            event_name TEXT NOT NULL,
+            payload TEXT,
+            fired_at TEXT NOT NULL,
+            FOREIGN KEY (hook_id) REFERENCES hooks(id)
+        );
+CREATE INDEX idx_hook_events_event ON hook_events(event_name);
+CREATE INDEX idx_hook_events_hook ON hook_events(hook_id);
+CREATE TABLE accepted_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chain_id INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            contract_address TEXT,
+            created_at TEXT NOT NULL , UNIQUE(chain_id, contract_address)
+        );
+CREATE TABLE cron_state (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+CREATE TABLE balance_cache (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    balance_wei TEXT NOT NULL,
+    block_number INTEGER,
+    checked_at TEXT NOT NULL,
+    PRIMARY KEY (chain_id, address)
+);
+CREATE TABLE prices (
+    symbol TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    price TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (symbol, currency)
+);
+CREATE TABLE payout_txs (
+    tx_hash TEXT PRIMARY KEY,
+    chain_id INTEGER NOT NULL,
+    from_address TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    to_address TEXT NOT NULL,
+    value TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    block_number INTEGER,
+    sent_at TEXT NOT NULL,
+    confirmed_at TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX idx_payout_txs_status ON payout_txs(status);
+CREATE INDEX idx_payout_txs_source ON payout_txs(source, source_id);
+CREATE TABLE escrow_sweeps (
+    transaction_uuid TEXT PRIMARY KEY,
+    chain_id INTEGER NOT NULL,
+    escrow_address TEXT NOT NULL,
+    owed_wei TEXT NOT NULL DEFAULT '0',
+    status TEXT NOT NULL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    signed_txs TEXT,
+    swept_wei TEXT NOT NULL DEFAULT '0',
+    checked_at TEXT,
+    next_check_at TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX idx_escrow_sweeps_next_check ON escrow_sweeps(next_check_at);
+CREATE TABLE cron_runs (
+    uuid TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    status TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX idx_cron_runs_started ON cron_runs(started_at);
+CREATE VIEW v_transaction_statuses AS
+SELECT
+    ts.transaction_uuid,
+    ts.max_timestamp,
+    ts.min_timestamp,
+    ts1.amount AS min_amount,
+    ts2.amount AS max_amount,
+    ts1.status AS min_status,
+    ts2.status AS max_status
+FROM (
+    SELECT transaction_uuid, MAX(time) AS max_timestamp, MIN(time) AS min_timestamp
+    FROM transaction_statuses
+    GROUP BY transaction_uuid
+) ts
+JOIN transaction_statuses ts1 ON ts1.transaction_uuid = ts.transaction_uuid AND ts1.time = ts.min_timestamp
+JOIN transaction_statuses ts2 ON ts2.transaction_uuid = ts.transaction_uuid AND ts2.time = ts.max_timestamp;
+CREATE VIEW v_shipping_statuses AS
+SELECT ss.transaction_uuid, ss.time AS max_timestamp, ss.status AS max_status
+FROM shipping_statuses ss
+INNER JOIN (
+    SELECT transaction_uuid, MAX(time) AS max_timestamp
+    FROM shipping_statuses
+    GROUP BY transaction_uuid
+) m ON ss.transaction_uuid = m.transaction_uuid AND ss.time = m.max_timestamp;
+CREATE VIEW v_current_transaction_statuses AS
+SELECT
+    t.uuid,
+    t.description,
+    t.type,
+    t.package_uuid,
+    t.store_uuid,
+    t.buyer_uuid,
+    t.dispute_uuid,
+    vts.max_status AS current_status,
+    vts.max_amount AS current_amount,
+    vts.max_timestamp AS updated_at,
+    vts.min_timestamp AS created_at,
+    COALESCE(vss.max_status, 'DISPATCH PENDING') AS current_shipping_status,
+    0 AS number_of_messages,
+    s.storename AS storename,
+    u2.username AS buyer_username
+FROM transactions t
+INNER JOIN v_transaction_statuses vts ON t.uuid = vts.transaction_uuid
+INNER JOIN stores s ON s.uuid = t.store_uuid
+INNER JOIN users u2 ON u2.uuid = t.buyer_uuid
+LEFT JOIN v_shipping_statuses vss ON t.uuid = vss.transaction_uuid;
+CREATE VIEW v_current_evm_transaction_statuses AS
+SELECT vcts.*, e.amount AS required_amount, e.escrow_address, e.chain_id, e.currency
+FROM v_current_transaction_statuses vcts
+JOIN evm_transactions e ON vcts.uuid = e.uuid
+WHERE vcts.type = 'evm';
+CREATE VIEW v_current_cumulative_transaction_statuses AS
+SELECT uuid, type, description, current_amount, current_status, current_shipping_status,
+       number_of_messages, required_amount, escrow_address, chain_id, currency,
+       buyer_username, storename, dispute_uuid, package_uuid, store_uuid, buyer_uuid,
+       updated_at, created_at
+FROM v_current_evm_transaction_statuses;
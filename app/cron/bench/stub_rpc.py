@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local JSON-RPC stub for dry runs and benchmarks: an in-memory chain answering eth_blockNumber,
+eth_getBlockByNumber, eth_getBalance, Multicall3 aggregate3 eth_calls of ERC-20 balanceOf/decimals,
+eth_gasPrice, eth_maxPriorityFeePerGas, eth_getTransactionCount, eth_sendRawTransaction of signed
+legacy or EIP-1559 ETH transfers (each mined in its own block), eth_getTransactionByHash and
+eth_getTransactionReceipt (single calls or batches), with optional per-request latency. With l1_fee
+set it behaves like an OP-stack chain: every tx pays that L1 data fee, quoted by the GasPriceOracle.
+stub_transfer(to, value_hex) mines a block holding one transfer, so the cron can be exercised
+end to end against it (ALCHEMY_RPC_URL=http://127.0.0.1:8545/).
+
+Run from app folder: python cron/bench/stub_rpc.py [--port 8545] [--latency 0.05] [--block-time 12]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import keccak
+
+MULTICALL3_ADDRESS = "0xca11bde05977b3631167028862be2a173976ca11"
+GAS_PRICE_ORACLE = "0x420000000000000000000000000000000000000f"
+
+class StubChain:
+    """Blocks are lists of {"from", "to", "value"} txs; balances are credited when a transfer is mined."""
+
+    def __init__(self, head: int = 1000):
+        self.lock = threading.Lock()
+        self.head = head
+        self.blocks = {}
+        self.balances = {}
+        # ERC-20 state: {token: decimals}, {(token, holder): raw balance}; addresses lowercase
+        self.tokens = {}
+        self.token_balances = {}
+        self.calls = {}
+        self.requests = 0
+        self.latency = 0.0
+        self.gas_price = 10 ** 9
+        # EIP-1559 fees (base_fee None: a legacy-only chain) and the OP-stack L1 data fee per tx
+        self.base_fee = 9 * 10 ** 8
+        self.priority_fee = 10 ** 8
+        self.l1_fee = 0
+        # Confirmed nonce per sender; {tx hash: tx} for every accepted eth_sendRawTransaction and its block
+        self.nonces = {}
+        self.sent = {}
+        self.receipts = {}
+
+    def mine(self, txs=()) -> int:
+        with self.lock:
+            self.head += 1
+            self.blocks[self.head] = list(txs)
+            for tx in txs:
+                to = tx["to"].lower()
+                self.balances[to] = self.balances.get(to, 0) + int(tx["value"], 16)
+            return self.head
+
+    def _decode(self, raw: bytes):
+        """(nonce, max fee per gas, tip per gas or None, gas, to, value) of a legacy or type-2 tx."""
+        if raw[0] == 2:
+            _, nonce, tip, max_fee, gas, to, value = rlp.decode(raw[1:])[:7]
+        else:
+            nonce, max_fee, gas, to, value = rlp.decode(raw)[:5]
+            tip = None
+        nonce, max_fee, gas, value = (int.from_bytes(x, "big") for x in (nonce, max_fee, gas, value))
+        return nonce, max_fee, None if tip is None else int.from_bytes(tip, "big"), gas, to, value
+
+    def transfer(self, to: str, wei: int) -> int:
+        return self.mine([{"from": "0x" + "11" * 20, "to": to, "value": hex(wei)}])
+
+    def send_raw(self, raw_hex: str) -> str:
+        """
+        Apply a signed transfer: nonce must be next, maxFeePerGas (or gasPrice) at least the base fee, and
+        the balance must cover value + gas * maxFeePerGas + l1_fee; gas is charged at base fee + tip.
+        """
+        raw = bytes.fromhex(raw_hex[2:] if raw_hex.startswith("0x") else raw_hex)
+        tx_hash = "0x" + keccak(raw).hex()
+        nonce, max_fee, tip, gas, to, value = self._decode(raw)
+        sender = Account.recover_transaction(raw).lower()
+        with self.lock:
+            if tx_hash in self.sent:
+                raise ValueError("already known")
+            if nonce != self.nonces.get(sender, 0):
+                raise ValueError("nonce too low" if nonce < self.nonces.get(sender, 0) else "nonce gap")
+            base_fee = self.base_fee or 0
+            if max_fee < base_fee:
+                raise ValueError("max fee per gas less than block base fee")
+            if self.balances.get(sender, 0) < value + gas * max_fee + self.l1_fee:
+                raise ValueError("insufficient funds for gas * price + value")
+            price = max_fee if tip is None else min(max_fee, base_fee + tip)
+            self.balances[sender] -= value + gas * price + self.l1_fee
+            self.nonces[sender] = nonce + 1
+            tx = {"from": sender, "to": "0x" + to.hex(), "value": hex(value), "hash": tx_hash, "nonce": hex(nonce)}
+            self.sent[tx_hash] = tx
+        self.receipts[tx_hash] = self.mine([tx])
+        return tx_hash
+
+    def _token_call(self, target: str, data: bytes):
+        target = target.lower()
+        if target not in self.tokens:
+            return False, b""
+        if data[:4] == bytes.fromhex("313ce567"):
+            return True, encode(["uint8"], [self.tokens[target]])
+        if data[:4] == bytes.fromhex("70a08231"):
+            (holder,) = decode(["address"], data[4:])
+            return True, encode(["uint256"], [self.token_balances.get((target, holder.lower()), 0)])
+        return False, b""
+
+    def eth_call(self, tx: dict) -> str:
+        if tx.get("to", "").lower() == GAS_PRICE_ORACLE and tx["data"].startswith("0x49948e0e"):
+            return "0x" + encode(["uint256"], [self.l1_fee]).hex()
+        if tx.get("to", "").lower() != MULTICALL3_ADDRESS or not tx["data"].startswith("0x82ad56cb"):
+            raise ValueError("only Multicall3.aggregate3 is supported")
+        (calls,) = decode(["(address,bool,bytes)[]"], bytes.fromhex(tx["data"][10:]))
+        return "0x" + encode(["(bool,bytes)[]"], [[self._token_call(t, d) for t, _, d in calls]]).hex()
+
+    def call(self, method: str, params):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBalance":
+            return hex(self.balances.get(params[0].lower(), 0))
+        if method == "eth_getBlockByNumber":
+            number = self.head if params[0] == "latest" else int(params[0], 16)
+            if number > self.head:
+                return None
+            block = {"number": hex(number), "transactions": self.blocks.get(number, [])}
+            if self.base_fee is not None:
+                block["baseFeePerGas"] = hex(self.base_fee)
+            return block
+        if method == "eth_call":
+            return self.eth_call(params[0])
+        if method == "eth_gasPrice":
+            return hex(self.gas_price)
+        if method == "eth_maxPriorityFeePerGas":
+            if self.base_fee is None:
+                raise KeyError(method)
+            return hex(self.priority_fee)
+        if method == "eth_getTransactionCount":
+            return hex(self.nonces.get(params[0].lower(), 0))
+        if method == "eth_sendRawTransaction":
+            return self.send_raw(params[0])
+        if method == "eth_getTransactionByHash":
+            tx = self.sent.get(params[0])
+            block = self.receipts.get(params[0])
+            return None if tx is None else dict(tx, blockNumber=None if block is None else hex(block))
+        if method == "eth_getTransactionReceipt":
+            block = self.receipts.get(params[0])
+            return None if block is None else {"transactionHash": params[0], "blockNumber": hex(block), "status": "0x1"}
+        if method == "stub_transfer":
+            return hex(self.transfer(params[0], int(params[1], 16)))
+        raise KeyError(method)
+
+    def handle(self, request: dict) -> dict:
+        try:
+            result = self.call(request.get("method"), request.get("params") or [])
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+        except (KeyError, IndexError) as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": f"unsupported: {e}"}}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": str(e)}}
+
+
+def _handler(chain: StubChain):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without TCP_NODELAY keep-alive clients stall on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            chain.requests += 1
+            if chain.latency:
+                time.sleep(chain.latency)
+            out = [chain.handle(c) for c in body] if isinstance(body, list) else chain.handle(body)
+            data = json.dumps(out).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start(chain: StubChain, port: int = 0):
+    """Serve chain on a background thread. Returns (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(chain))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every HTTP request")
+    parser.add_argument("--block-time", type=float, default=0.0, help="mine an empty block every N seconds (0: only on stub_transfer)")
+    args = parser.parse_args()
+    chain = StubChain()
+    chain.latency = args.latency
+    server, url = start(chain, args.port)
+    print(f"Stub JSON-RPC at {url} (head {chain.head})", flush=True)
+    try:
+        while True:
+            time.sleep(args.block_time or 3600)
+            if args.block_time:
+                chain.mine()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
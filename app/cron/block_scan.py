@@ -0,0 +1,113 @@
+"""
+Block-scan deposit detection (CRON_DETECTOR=blocks). Instead of eth_getBalance for every open
+escrow/deposit address each tick, follow new blocks with batched eth_getBlockByNumber, match
+value transfers (tx.to) against the in-memory set of watched addresses, and re-read balances only
+for addresses that received something. RPC cost scales with chain activity, not open orders.
+
+The last processed block is checkpointed per chain in cron_state ("block_scan.<chain_id>.last_block").
+The first run has no checkpoint, so it reads every watched balance once and starts from the head.
+Only top-level native transactions are seen: value sent to a watched address by a contract
+(internal transfer) is not. To catch those, every watched balance is read again once every
+full_poll_seconds per chain (last full read in "block_scan.<chain_id>.full_poll_at"), while the
+blocks in between are still scanned. ERC-20 escrows/deposits are not visible as tx.to, so they are
+read every tick with one Multicall3 round trip per chain.
+"""
+import time
+
+from alchemy_client import RpcError, _chunks
+from bulk import DEFAULT_WRITE_CHUNK
+from cron_state import get_state, set_state
+from tasks import (
+    _group_by_chain,
+    apply_deposit_balances,
+    apply_pending_balances,
+    fetch_balances_by_chain,
+    select_deposit_addresses,
+    select_pending_escrows,
+)
+
+CHECKPOINT = "block_scan.{}.last_block"
+FULL_POLL = "block_scan.{}.full_poll_at"
+# Blocks processed per tick at most (a lagging scanner catches up over several ticks)
+DEFAULT_MAX_BLOCKS = 200
+# Full blocks per JSON-RPC batch; full blocks are large, so keep this well below the balance batch size
+DEFAULT_BLOCK_BATCH = 20
+# Every watched balance is re-read this often (seconds; 0 = never) for contract-internal transfers
+DEFAULT_FULL_POLL_SECONDS = 3600
+
+def scan_blocks(endpoint, start: int, end: int, watched, batch_size: int = DEFAULT_BLOCK_BATCH) -> set:
+    """
+    Blocks start..end (inclusive) via eth_getBlockByNumber(n, true). Returns the watched addresses
+    (lowercase) that received a non-zero value transfer. Raises RpcError if any block is unavailable,
+    so the caller never checkpoints past a gap. endpoint: alchemy_client.ChainEndpoint.
+    """
+    touched = set()
+    for chunk in _chunks(list(range(start, end + 1)), batch_size):
+        blocks = endpoint.batch([("eth_getBlockByNumber", [hex(n), True]) for n in chunk])
+        for number, block in zip(chunk, blocks):
+            if isinstance(block, RpcError):
+                raise block
+            if not isinstance(block, dict):
+                raise RpcError(f"block {number} not available")
+            for tx in block.get("transactions") or ():
+                to = (tx.get("to") or "").lower()
+                if to in watched and int(tx.get("value") or "0x0", 16) > 0:
+                    touched.add(to)
+    return touched
+
+def run_block_scan(conn, registry, get_balances_eth, tolerance=0.05, chunk_size=DEFAULT_WRITE_CHUNK,
+                   confirmations=0, max_blocks=DEFAULT_MAX_BLOCKS, block_batch=DEFAULT_BLOCK_BATCH,
+                   get_token_balances=None, full_poll_seconds=DEFAULT_FULL_POLL_SECONDS) -> dict:
+    """
+    Replaces run_update_pending + run_update_deposit_balances. registry: alchemy_client.ChainRegistry.
+    Blocks up to head - confirmations are scanned. The checkpoint only advances when every touched
+    balance was read, so a failed read is retried by rescanning the same range next tick. When a
+    chain's last full read is full_poll_seconds old (0: never), every watched balance is read.
+    Returns {chain_id: (first_block, last_block, touched_addresses)} for the blocks processed.
+    """
+    pending = select_pending_escrows(conn)
+    deposits = select_deposit_addresses(conn)
+    pending_by_chain = _group_by_chain(pending)
+    deposits_by_chain = _group_by_chain(deposits)
+    summary = {}
+    for chain_id in sorted(set(pending_by_chain) | set(deposits_by_chain)):
+        chain_pending = pending_by_chain.get(chain_id, [])
+        chain_deposits = deposits_by_chain.get(chain_id, [])
+        key = CHECKPOINT.format(chain_id)
+        poll_key = FULL_POLL.format(chain_id)
+        now = int(time.time())
+        full_poll = full_poll_seconds > 0 and int(get_state(conn, poll_key, 0)) <= now - full_poll_seconds
+        try:
+            endpoint = registry.get(chain_id)
+            end = endpoint.get_block_number() - max(0, int(confirmations))
+            last = get_state(conn, key)
+            if last is None:
+                start = end
+                touched = None
+                full_poll = True
+            else:
+                start = int(last) + 1
+                # No new block yet: nothing to scan, but token rows are still read below
+                end = max(start - 1, min(end, start + max(1, int(max_blocks)) - 1))
+                watched = {row[1].lower() for row in chain_pending + chain_deposits if row[-2] is None}
+                touched = scan_blocks(endpoint, start, end, watched, block_batch) if watched and end >= start else set()
+        except (RpcError, ValueError) as e:
+            # One chain failing does not hold up the others; it resumes from its checkpoint next tick
+            print(f"block scan: chain {chain_id} failed: {e}")
+            continue
+        if touched is not None and not full_poll:
+            chain_pending = [r for r in chain_pending if r[-2] is not None or r[1].lower() in touched]
+            chain_deposits = [r for r in chain_deposits if r[-2] is not None or r[1].lower() in touched]
+        balances = fetch_balances_by_chain(chain_pending + chain_deposits, get_balances_eth, get_token_balances)
+        apply_pending_balances(conn, chain_pending, balances, tolerance, chunk_size)
+        apply_deposit_balances(conn, chain_deposits, balances, chunk_size)
+        # Token rows are re-read every tick anyway; only native misses hold the checkpoint back
+        if any(v is None or isinstance(v, Exception) for v in
+               (balances.get((chain_id, r[1], None)) for r in chain_pending + chain_deposits if r[-2] is None)):
+            continue
+        set_state(conn, key, end)
+        if full_poll:
+            set_state(conn, poll_key, now)
+        conn.commit()
+        summary[chain_id] = (start, end, len(chain_pending) + len(chain_deposits))
+    return summary
@@ -0,0 +1,73 @@
+"""
+Chunked bulk writes for cron tasks. Statements are buffered and flushed as one executemany per
+SQL text; each flush is its own transaction and also records progress in cron_state
+("progress.<task>" = units written this run), so a large run keeps what it finished if it dies
+part-way and the next run picks up the rest. Units whose rows depend on each other (foreign keys,
+bookkeeping that must land together) use ordered=True: one transaction per unit, in add order.
+"""
+from cron_state import set_state
+
+DEFAULT_WRITE_CHUNK = 500
+
+class ChunkedWriter:
+    """
+    with ChunkedWriter(conn, "fill_escrow") as w:
+        w.add((update_sql, params), (insert_sql, params))   # one unit; never split across chunks
+
+    A chunk is chunk_size units. Within a chunk statements are grouped by SQL text (in order of
+    first use), so only buffer writes that do not depend on each other's order. With ordered=True
+    every unit is its own chunk and its statements run one by one in the order given. Leaving the
+    block normally flushes the remainder; an exception discards (rolls back) the unflushed part.
+    """
+
+    def __init__(self, conn, task: str, chunk_size: int = DEFAULT_WRITE_CHUNK, ordered: bool = False):
+        self._conn = conn
+        self._task = task
+        self._ordered = ordered
+        self._chunk_size = 1 if ordered else max(1, int(chunk_size))
+        self._pending = []
+        self._units = 0
+        self.written = 0
+        self.chunks = 0
+
+    def add(self, *statements) -> None:
+        self._pending.extend(statements)
+        self._units += 1
+        if self._units >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        cur = self._conn.cursor()
+        try:
+            if self._ordered:
+                for sql, params in self._pending:
+                    cur.execute(sql, params)
+            else:
+                grouped = {}
+                for sql, params in self._pending:
+                    grouped.setdefault(sql, []).append(params)
+                for sql, rows in grouped.items():
+                    cur.executemany(sql, rows)
+            set_state(self._conn, f"progress.{self._task}", self.written + self._units)
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        self.written += self._units
+        self.chunks += 1
+        self._pending = []
+        self._units = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._pending = []
+            self._units = 0
+            self._conn.rollback()
+        return False
@@ -3,18 +3,68 @@
 Cron entrypoint. Run on schedule (e.g. every 1-5 min).
 1) Fill escrow addresses; 2) Update PENDING (poll balance -> COMPLETED);
 3) Fail old PENDING; 4) (Release/freeze/reconcile/deposits - full in Phase 6.)
+--async (or CRON_ASYNC=1): asyncio engine, balance stages fetched concurrently (cron_async.py).
+CRON_DETECTOR=blocks: detect payments by scanning new blocks for transfers to watched
+addresses (block_scan.py) instead of polling every open address's balance.
+--daemon (or CRON_DAEMON=1): stay resident and run the pipeline every CRON_INTERVAL seconds,
+keeping imports, .env, the DB connection and the HD deriver warm; SIGTERM/SIGINT stop cleanly.
+Every task is timed and counted (metrics.py); each run is stored in cron_runs and, with
+CRON_METRICS_FILE set, written as a Prometheus textfile.
 """
+import argparse
+import signal
 import sys
+import threading
+import time
+import traceback
 from pathlib import Path
 
 # baseDir = app/ (parent of cron/); .env and db/ are in app/
 BASE_DIR = str(Path(__file__).resolve().parent.parent)
 
+DEFAULT_INTERVAL = 120
+
+def run_daemon(run_cycle, interval: float, on_error=None) -> int:
+    """
+    Call run_cycle() every `interval` seconds (measured start to start) until SIGTERM/SIGINT.
+    A failing cycle is logged, on_error() is called (e.g. rollback) and the loop continues.
+    The signal only sets a flag, so the cycle in progress always finishes. Returns cycles run.
+    """
+    stop = threading.Event()
+
+    def _stop(signum, frame):
+        print(f"Received signal {signum}; stopping after current cycle.", flush=True)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    cycle = 0
+    while not stop.is_set():
+        cycle += 1
+        started = time.monotonic()
+        status = "ok"
+        try:
+            run_cycle()
+        except Exception:
+            status = "error"
+            traceback.print_exc()
+            if on_error is not None:
+                on_error()
+        elapsed = time.monotonic() - started
+        print(f"Cron cycle {cycle} {status} in {elapsed:.2f}s", flush=True)
+        stop.wait(max(0.0, interval - elapsed))
+    return cycle
+
 def main():
+    parser = argparse.ArgumentParser(description="Marketplace EVM cron")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="asyncio engine with concurrent chain I/O")
+    parser.add_argument("--daemon", action="store_true", help="stay resident and run every --interval seconds")
+    parser.add_argument("--interval", type=float, default=None, help=f"daemon cycle interval in seconds (default CRON_INTERVAL or {DEFAULT_INTERVAL})")
+    args = parser.parse_args()
     sys.path.insert(0, str(Path(__file__).resolve().parent))
     from cron_env import load_dotenv, get_required, get
     from db import get_connection
-    from escrow import derive_escrow_address, derive_deposit_address
+    from escrow import DEFAULT_CHUNK_SIZE, DEPOSIT_BRANCH, ESCROW_BRANCH, HDDeriver, ParallelDeriver
     from tasks import (
         run_fill_escrow,
         run_update_pending,
@@ -22,39 +72,242 @@ def main():
         run_fill_deposit_address,
         run_update_deposit_balances,
         run_process_withdraw_intents,
+        run_refresh_prices,
     )
-    from alchemy_client import get_balance_wei, wei_to_eth
+    from alchemy_client import AlchemyClient, wei_to_eth
+    from balance_cache import BalanceCache
+    from price_cache import DEFAULT_MAX_STALE, DEFAULT_TTL, PriceCache
+    from bulk import DEFAULT_WRITE_CHUNK
+    from metrics import DEFAULT_RETENTION_DAYS, RunMetrics
 
     load_dotenv(BASE_DIR)
+    # Seed stretch + parent node derivation happen once here (and once per worker), not per address
     mnemonic = get_required("MNEMONIC")
+    derive_workers = int(get("CRON_DERIVE_WORKERS", "0"))
+    derive_chunk = int(get("CRON_DERIVE_CHUNK", str(DEFAULT_CHUNK_SIZE)))
+    if derive_workers > 1:
+        deriver = ParallelDeriver(mnemonic, derive_workers, chunk_size=derive_chunk)
+    else:
+        deriver = HDDeriver(mnemonic, chunk_size=derive_chunk)
     api_key = get("ALCHEMY_API_KEY", "")
     network = get("ALCHEMY_NETWORK", "mainnet")
+    write_chunk = int(get("CRON_WRITE_CHUNK", str(DEFAULT_WRITE_CHUNK)))
+    balance_max_age = float(get("CRON_BALANCE_MAX_AGE", "0"))
+    # One pooled keep-alive session for the whole run (every daemon cycle); its registry maps
+    # chain_id -> endpoint / batch size / request budget (CHAIN_<id>_* overrides, see alchemy_client)
+    client = AlchemyClient.from_env(api_key, network)
+    registry = client.registry
+    chain_enabled = bool(client)
+    detector = get("CRON_DETECTOR", "balance").lower()
 
     conn = get_connection(BASE_DIR)
-    conn.row_factory = None
     cur = conn.cursor()
 
     def config_get(key, default=""):
-        cur.execute("SELECT value FROM config WHERE key = ?", (key,))
+        # `key` is reserved in MySQL; backticks are accepted by SQLite too
+        cur.execute("SELECT value FROM config WHERE `key` = ?", (key,))
         row = cur.fetchone()
         return row[0] if row else default
 
-    def get_balance_eth(address, chain_id):
-        if not api_key:
-            return 0.0
-        wei = get_balance_wei(address, api_key, network)
-        return wei_to_eth(wei)
-
-    run_fill_escrow(conn, mnemonic, derive_escrow_address)
-    if api_key:
-        run_update_pending(conn, get_balance_eth, tolerance=0.05)
-        run_fail_old_pending(conn, config_get)
-    run_fill_deposit_address(conn, mnemonic, derive_deposit_address)
-    if api_key:
-        run_update_deposit_balances(conn, get_balance_eth)
-    run_process_withdraw_intents(conn)
-    conn.close()
-    print("Cron run done.")
+    # Last good USD quotes (prices table, read by PHP): served from memory, refreshed in the background
+    prices_enabled = bool(api_key) and get("CRON_PRICES", "1") != "0"
+    client.prices = PriceCache(
+        client.get_usd_prices, conn if prices_enabled else None,
+        ttl=float(get("CRON_PRICE_TTL", str(DEFAULT_TTL))),
+        max_stale=float(get("CRON_PRICE_MAX_STALE", str(DEFAULT_MAX_STALE))),
+    )
+    price_symbols = [s.strip() for s in get("CRON_PRICE_SYMBOLS", "ETH").split(",") if s.strip()]
+
+    # Skips eth_getBalance for addresses read at the current head or within CRON_BALANCE_MAX_AGE
+    cache = None if get("CRON_BALANCE_CACHE", "1") == "0" else BalanceCache(conn, balance_max_age)
+
+    # Per-task wall time, rows, RPC calls/errors, cache hits and DB statements for every run
+    metrics = RunMetrics(
+        conn, registry, [cache, client.prices], path=get("CRON_METRICS_FILE", "") or None,
+        store=get("CRON_METRICS", "1") != "0",
+        retention_days=float(get("CRON_METRICS_RETENTION", str(DEFAULT_RETENTION_DAYS))),
+    )
+    timed = metrics.timed
+    run_fill_escrow = timed(run_fill_escrow)
+    run_update_pending = timed(run_update_pending)
+    run_fail_old_pending = timed(run_fail_old_pending)
+    run_fill_deposit_address = timed(run_fill_deposit_address)
+    run_update_deposit_balances = timed(run_update_deposit_balances)
+    run_process_withdraw_intents = timed(run_process_withdraw_intents)
+    run_refresh_prices = timed(run_refresh_prices)
+
+    def fetch_wei(addresses, chain_id):
+        return client.get_balances_wei(addresses, chain_id)
+
+    def get_balances_eth(addresses, chain_id, use_cache=True):
+        if not chain_enabled:
+            return {}
+        if cache is not None and use_cache:
+            wei = cache.get_balances_wei(addresses, chain_id, fetch_wei, client.get_block_number)
+        else:
+            wei = fetch_wei(addresses, chain_id)
+        return {a: v if isinstance(v, Exception) else wei_to_eth(v) for a, v in wei.items()}
+
+    def get_token_balances(pairs, chain_id):
+        # ERC-20 escrows/deposits: [(contract, holder)] -> one Multicall3 round trip per chain
+        return client.get_token_balances(pairs, chain_id)
+
+    # Payouts move real funds: off unless PAYOUTS_ENABLED=1. Without it withdraw intents only get the
+    # bookkeeping of tasks.run_process_withdraw_intents; with it payouts.py sends them
+    payouts_enabled = chain_enabled and get("PAYOUTS_ENABLED", "") == "1"
+    stub_withdrawals = not payouts_enabled
+
+    runner = None
+    use_async = args.use_async or get("CRON_ASYNC", "") == "1"
+    if use_async and detector == "blocks":
+        print("CRON_DETECTOR=blocks runs on the sync engine; ignoring --async.")
+        use_async = False
+    if use_async:
+        from cron_async import DEFAULT_CONCURRENCY, AsyncRunner
+        concurrency = int(get("CRON_RPC_CONCURRENCY", str(DEFAULT_CONCURRENCY)))
+        runner = AsyncRunner(conn, deriver, config_get, registry, concurrency, write_chunk, cache, stub_withdrawals, metrics)
+        run_pipeline = runner.run_cycle
+    elif detector == "blocks":
+        from block_scan import DEFAULT_BLOCK_BATCH, DEFAULT_FULL_POLL_SECONDS, DEFAULT_MAX_BLOCKS, run_block_scan
+        confirmations = int(get("CRON_SCAN_CONFIRMATIONS", "0"))
+        max_blocks = int(get("CRON_SCAN_MAX_BLOCKS", str(DEFAULT_MAX_BLOCKS)))
+        block_batch = int(get("CRON_SCAN_BLOCK_BATCH", str(DEFAULT_BLOCK_BATCH)))
+        # Full balance read for transfers made by contracts, which the block scan does not see
+        full_poll_seconds = float(get("CRON_SCAN_FULL_POLL", str(DEFAULT_FULL_POLL_SECONDS)))
+        # rows: addresses re-read across the chains scanned
+        run_block_scan = timed(run_block_scan, rows=lambda summary: sum(s[2] for s in summary.values()))
+
+        def run_pipeline():
+            run_fill_escrow(conn, deriver.escrow_chunks, write_chunk)
+            run_fill_deposit_address(conn, deriver.deposit_chunks, write_chunk)
+            if chain_enabled:
+                # Touched addresses are re-read uncached: their balance changed after the cached head
+                run_block_scan(
+                    conn, registry,
+                    lambda addresses, chain_id: get_balances_eth(addresses, chain_id, use_cache=False),
+                    tolerance=0.05, chunk_size=write_chunk, confirmations=confirmations,
+                    max_blocks=max_blocks, block_batch=block_batch, get_token_balances=get_token_balances,
+                    full_poll_seconds=full_poll_seconds,
+                )
+                run_fail_old_pending(conn, config_get, write_chunk)
+            if stub_withdrawals:
+                run_process_withdraw_intents(conn, write_chunk)
+    else:
+        def run_pipeline():
+            run_fill_escrow(conn, deriver.escrow_chunks, write_chunk)
+            if chain_enabled:
+                run_update_pending(conn, get_balances_eth, 0.05, write_chunk, get_token_balances)
+                run_fail_old_pending(conn, config_get, write_chunk)
+            run_fill_deposit_address(conn, deriver.deposit_chunks, write_chunk)
+            if chain_enabled:
+                run_update_deposit_balances(conn, get_balances_eth, write_chunk, get_token_balances)
+            if stub_withdrawals:
+                run_process_withdraw_intents(conn, write_chunk)
+
+    signer = None
+    if payouts_enabled:
+        from payouts import (
+            DEFAULT_BATCH_SIZE, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, DEFAULT_WORKERS,
+            commission_wallets, run_process_transaction_intents, run_process_withdraw_payouts,
+        )
+        from tx_sender import (
+            DEFAULT_CONFIRMATIONS, DEFAULT_GAS_TTL, DEFAULT_REBROADCAST_SECONDS, DEFAULT_SIGN_MIN_BATCH,
+            DEFAULT_SIGN_PROCESSES, GasPriceCache, NonceManager, Signer, run_track_payout_txs,
+        )
+        run_process_transaction_intents = timed(run_process_transaction_intents)
+        run_process_withdraw_payouts = timed(run_process_withdraw_payouts)
+        run_track_payout_txs = timed(run_track_payout_txs)
+        # Kept for the whole run: nonces are counted locally (re-read every cycle), gas price reused, the
+        # signing pool stays up
+        signer = Signer(int(get("CRON_SIGN_PROCESSES", str(DEFAULT_SIGN_PROCESSES))),
+                        int(get("CRON_SIGN_MIN_BATCH", str(DEFAULT_SIGN_MIN_BATCH))))
+        sender_options = dict(
+            chunk_size=write_chunk,
+            batch_size=int(get("CRON_PAYOUT_BATCH", str(DEFAULT_BATCH_SIZE))),
+            workers=int(get("CRON_PAYOUT_WORKERS", str(DEFAULT_WORKERS))),
+            lease_seconds=float(get("CRON_PAYOUT_LEASE", str(DEFAULT_LEASE_SECONDS))),
+            max_attempts=int(get("CRON_PAYOUT_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS))),
+            nonces=NonceManager(),
+            gas_prices=GasPriceCache(float(get("CRON_GAS_PRICE_TTL", str(DEFAULT_GAS_TTL)))),
+            signer=signer,
+        )
+        metrics.caches.append(sender_options["gas_prices"])
+        wallets = commission_wallets()
+        # CRON_SWEEP=1: releases leave the commission on the escrow; sweep.py collects it when worth the gas
+        sweep_enabled = get("CRON_SWEEP", "") == "1"
+        if sweep_enabled:
+            from sweep import DEFAULT_MIN_RATIO, DEFAULT_RECHECK_SECONDS, DEFAULT_SWEEP_BATCH, run_sweep_escrows
+            run_sweep_escrows = timed(run_sweep_escrows)
+            sweep_options = dict(
+                min_ratio=float(get("CRON_SWEEP_MIN_RATIO", str(DEFAULT_MIN_RATIO))),
+                recheck_seconds=float(get("CRON_SWEEP_RECHECK", str(DEFAULT_RECHECK_SECONDS))),
+                batch_size=int(get("CRON_SWEEP_BATCH", str(DEFAULT_SWEEP_BATCH))),
+                **{k: v for k, v in sender_options.items() if k not in ("batch_size", "lease_seconds")},
+            )
+        confirmations = int(get("CRON_PAYOUT_CONFIRMATIONS", str(DEFAULT_CONFIRMATIONS)))
+        rebroadcast_after = float(get("CRON_PAYOUT_REBROADCAST", str(DEFAULT_REBROADCAST_SECONDS)))
+
+        def escrow_key(transaction_uuid):
+            return deriver.private_key(ESCROW_BRANCH, transaction_uuid)
+
+        def deposit_key(deposit_uuid):
+            return deriver.private_key(DEPOSIT_BRANCH, deposit_uuid)
+
+        def run_payouts():
+            # Local nonces only within a cycle: anything sent from these addresses elsewhere is picked up
+            sender_options["nonces"].clear()
+            run_process_transaction_intents(
+                conn, registry, escrow_key, config_get, wallets,
+                lambda: client.prices.get("ETH") if prices_enabled else None, **sender_options,
+                defer_commission=sweep_enabled,
+            )
+            run_process_withdraw_payouts(conn, registry, deposit_key, **sender_options)
+            if sweep_enabled:
+                run_sweep_escrows(conn, registry, escrow_key, config_get, wallets, **sweep_options)
+            # A tx stuck past rebroadcast_after is replaced with higher fees, signed with its source's key
+            run_track_payout_txs(conn, registry, confirmations, rebroadcast_after, write_chunk,
+                                 private_keys={"transaction_intent": escrow_key, "escrow_sweep": escrow_key,
+                                               "deposit_withdraw_intent": deposit_key},
+                                 gas_prices=sender_options["gas_prices"])
+
+    def run_cycle():
+        metrics.start()
+        try:
+            if prices_enabled:
+                run_refresh_prices(conn, client.prices, price_symbols)
+            run_pipeline()
+            if payouts_enabled:
+                run_payouts()
+        except Exception:
+            metrics.finish("error")
+            raise
+        return metrics.finish("ok")
+
+    try:
+        if args.daemon or get("CRON_DAEMON", "") == "1":
+            interval = args.interval if args.interval is not None else float(get("CRON_INTERVAL", str(DEFAULT_INTERVAL)))
+            print(f"Cron daemon started (interval {interval:g}s).", flush=True)
+            cycles = run_daemon(run_cycle, interval, on_error=conn.rollback)
+            print(f"Cron daemon stopped after {cycles} cycles.")
+        else:
+            record = run_cycle()
+            for line in metrics.summary(record):
+                print(line)
+            if cache is not None and chain_enabled and detector != "blocks":
+                print(f"Balance cache: {cache.hits} hits, {cache.misses} misses.")
+            for chain, st in client.stats().items():
+                print(f"RPC chain {chain}: {st['requests']} requests ({st['compute_units']} CU), "
+                      f"{st['throttled']} throttled, {st['retries']} retries, {st['failures']} failed, "
+                      f"{st['breaker_opens']} breaker opens, {st['short_circuited']} short-circuited.")
+            print(f"Cron run done in {record['seconds']:.2f}s.")
+    finally:
+        if runner is not None:
+            runner.close()
+        if signer is not None:
+            signer.close()
+        client.prices.close()
+        client.close()
+        conn.close()
 
 if __name__ == "__main__":
     main()
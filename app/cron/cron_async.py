@@ -0,0 +1,225 @@
+"""
+Asyncio cron mode (cron.py --async). Chain I/O goes through one pooled aiohttp session with a
+per-chain semaphore-bounded number of in-flight requests; independent stages (pending-escrow
+polling, deposit-balance refresh) fetch concurrently. DB reads/writes stay on the event-loop
+thread, so there is a single serialized writer exactly as in the sync pipeline.
+"""
+import asyncio
+from contextlib import nullcontext
+
+from alchemy_client import (
+    _DECIMALS,
+    RpcError,
+    _balance_batch_payload,
+    _batch_results,
+    _chunks,
+    _decode_uint,
+    _map_batch_response,
+    _parse_block_number,
+    wei_to_eth,
+)
+from bulk import DEFAULT_WRITE_CHUNK
+from tasks import (
+    _group_by_chain,
+    apply_deposit_balances,
+    apply_pending_balances,
+    run_fail_old_pending,
+    run_fill_deposit_address,
+    run_fill_escrow,
+    run_process_withdraw_intents,
+    select_deposit_addresses,
+    select_pending_escrows,
+)
+
+DEFAULT_CONCURRENCY = 8
+
+class AsyncAlchemyClient:
+    """
+    Batched eth_getBalance over a shared connection pool. Endpoints, batch sizes and request budgets
+    come from a ChainRegistry; each chain has its own cap of `concurrency` in-flight requests, so a
+    slow or busy chain never holds slots another chain needs.
+    """
+
+    def __init__(self, registry, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = 10):
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("pip install aiohttp for --async")
+        self._aiohttp = aiohttp
+        self._registry = registry
+        self._concurrency = max(1, int(concurrency))
+        self._timeout = timeout
+        self._semaphores = {}
+        self._session = None
+
+    async def __aenter__(self):
+        aiohttp = self._aiohttp
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0, limit_per_host=self._concurrency),
+            timeout=aiohttp.ClientTimeout(total=self._timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def _post(self, endpoint, payload):
+        semaphore = self._semaphores.get(endpoint.chain_id)
+        if semaphore is None:
+            semaphore = self._semaphores[endpoint.chain_id] = asyncio.Semaphore(self._concurrency)
+        async with semaphore:
+            # Budget, retries/backoff and the circuit breaker are shared with sync callers
+            return await endpoint.transport.post_async(self._session, payload)
+
+    async def _post_batch(self, endpoint, chunk) -> dict:
+        try:
+            return _map_batch_response(chunk, await self._post(endpoint, _balance_batch_payload(chunk)))
+        except RpcError as e:
+            return {a: e for a in chunk}
+
+    async def get_balances_wei(self, addresses, chain_id) -> dict:
+        """Same contract as ChainEndpoint.get_balances_wei; batches run concurrently."""
+        addresses = list(dict.fromkeys(addresses))
+        try:
+            endpoint = self._registry.get(chain_id)
+        except RpcError as e:
+            return {a: e for a in addresses}
+        chunks = list(_chunks(addresses, endpoint.batch_size))
+        out = {}
+        for result in await asyncio.gather(*(self._post_batch(endpoint, c) for c in chunks)):
+            out.update(result)
+        return out
+
+    async def get_block_number(self, chain_id) -> int:
+        endpoint = self._registry.get(chain_id)
+        payload = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+        return _parse_block_number(await self._post(endpoint, payload))
+
+    async def _multicall(self, endpoint, calls) -> list:
+        """Async ChainEndpoint.multicall_batch: the aggregate3 eth_call batches go out concurrently."""
+        async def send(chunk):
+            body = [{"jsonrpc": "2.0", "method": m, "params": p, "id": i} for i, (m, p) in enumerate(chunk)]
+            try:
+                return _batch_results(len(chunk), await self._post(endpoint, body))
+            except RpcError as e:
+                return [e] * len(chunk)
+
+        results = []
+        for result in await asyncio.gather(*(send(c) for c in _chunks(endpoint.multicall_payloads(calls), endpoint.batch_size))):
+            results.extend(result)
+        return endpoint.decode_multicall(calls, results)
+
+    async def get_token_balances(self, pairs, chain_id) -> dict:
+        """Same contract as ChainEndpoint.get_token_balances; uncached decimals ride in the same multicall."""
+        pairs = list(dict.fromkeys(pairs))
+        try:
+            endpoint = self._registry.get(chain_id)
+        except RpcError as e:
+            return {p: e for p in pairs}
+        missing = [t for t in dict.fromkeys(t for t, _ in pairs) if t not in endpoint.decimals]
+        returned = await self._multicall(endpoint, [(t, _DECIMALS) for t in missing] + endpoint.token_balance_calls(pairs))
+        for token, data in zip(missing, returned):
+            value = _decode_uint(data)
+            if not isinstance(value, RpcError):
+                endpoint.decimals[token] = value
+        decimals = {t: endpoint.decimals.get(t, RpcError(f"decimals() failed for {t}")) for t, _ in pairs}
+        return endpoint.token_units(pairs, returned[len(missing):], decimals)
+
+    async def get_balances_eth(self, addresses, chain_id, cache=None) -> dict:
+        """cache: optional balance_cache.BalanceCache; only its misses are fetched."""
+        if cache is None:
+            wei = await self.get_balances_wei(addresses, chain_id)
+        else:
+            try:
+                head = await self.get_block_number(chain_id)
+            except (KeyError, ValueError, RpcError) as e:
+                print(f"balance cache: head lookup failed for chain {chain_id}: {e}")
+                head = None
+            wei, misses = cache.lookup(chain_id, addresses, head)
+            if misses:
+                fetched = await self.get_balances_wei(misses, chain_id)
+                cache.store(chain_id, fetched, head)
+                wei.update(fetched)
+        return {a: v if isinstance(v, Exception) else wei_to_eth(v) for a, v in wei.items()}
+
+    async def _chain_balances(self, chain_id, rows, cache) -> dict:
+        native = [row[1] for row in rows if row[-2] is None]
+        pairs = [(row[-2], row[1]) for row in rows if row[-2] is not None]
+        native_result, token_result = await asyncio.gather(
+            self.get_balances_eth(native, chain_id, cache) if native else asyncio.sleep(0, {}),
+            self.get_token_balances(pairs, chain_id) if pairs else asyncio.sleep(0, {}),
+        )
+        out = {(chain_id, a, None): v for a, v in native_result.items()}
+        out.update({(chain_id, holder, token): v for (token, holder), v in token_result.items()})
+        return out
+
+    async def balances_by_chain(self, rows, cache=None) -> dict:
+        """Async counterpart of tasks.fetch_balances_by_chain: all chains, native and token batches in flight together."""
+        balances = {}
+        for result in await asyncio.gather(
+            *(self._chain_balances(chain_id, chain_rows, cache) for chain_id, chain_rows in _group_by_chain(rows).items())
+        ):
+            balances.update(result)
+        return balances
+
+
+async def run_pipeline_async(conn, deriver, config_get, client=None, tolerance=0.05, chunk_size=DEFAULT_WRITE_CHUNK,
+                             cache=None, stub_withdrawals=True, metrics=None):
+    """
+    Same steps as the sync pipeline in cron.py, with the two balance stages fetched concurrently.
+    client: an entered AsyncAlchemyClient, or None to skip chain polling (no endpoints configured).
+    cache: optional BalanceCache shared by both balance stages.
+    stub_withdrawals: False when payouts.py sends withdraw intents (PAYOUTS_ENABLED).
+    metrics: optional metrics.RunMetrics; the concurrent fetch is recorded as task "fetch_balances".
+    """
+    timed = metrics.timed if metrics is not None else (lambda fn, name=None: fn)
+    task = metrics.task if metrics is not None else (lambda name: nullcontext({}))
+    timed(run_fill_escrow)(conn, deriver.escrow_chunks, chunk_size)
+    timed(run_fill_deposit_address)(conn, deriver.deposit_chunks, chunk_size)
+    if client is not None:
+        pending = select_pending_escrows(conn)
+        deposits = select_deposit_addresses(conn)
+        with task("fetch_balances") as record:
+            pending_balances, deposit_balances = await asyncio.gather(
+                client.balances_by_chain(pending, cache),
+                client.balances_by_chain(deposits, cache),
+            )
+            record["rows"] = len(pending) + len(deposits)
+        timed(apply_pending_balances, "update_pending")(conn, pending, pending_balances, tolerance, chunk_size)
+        timed(run_fail_old_pending)(conn, config_get, chunk_size)
+        timed(apply_deposit_balances, "update_deposit_balances")(conn, deposits, deposit_balances, chunk_size)
+    if stub_withdrawals:
+        timed(run_process_withdraw_intents)(conn, chunk_size)
+
+
+class AsyncRunner:
+    """
+    Owns one event loop and one open AsyncAlchemyClient for the life of the process, so daemon
+    cycles reuse the connection pool. run_cycle() is a plain blocking call.
+    """
+
+    def __init__(self, conn, deriver, config_get, registry, concurrency=DEFAULT_CONCURRENCY,
+                 chunk_size=DEFAULT_WRITE_CHUNK, cache=None, stub_withdrawals=True, metrics=None):
+        self._conn = conn
+        self._metrics = metrics
+        self._stub_withdrawals = stub_withdrawals
+        self._cache = cache
+        self._chunk_size = chunk_size
+        self._deriver = deriver
+        self._config_get = config_get
+        self._loop = asyncio.new_event_loop()
+        self._client = AsyncAlchemyClient(registry, concurrency) if registry else None
+        if self._client is not None:
+            self._loop.run_until_complete(self._client.__aenter__())
+
+    def run_cycle(self) -> None:
+        self._loop.run_until_complete(
+            run_pipeline_async(self._conn, self._deriver, self._config_get, self._client,
+                               chunk_size=self._chunk_size, cache=self._cache, stub_withdrawals=self._stub_withdrawals,
+                               metrics=self._metrics)
+        )
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._loop.run_until_complete(self._client.__aexit__(None, None, None))
+        self._loop.close()
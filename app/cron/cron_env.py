@@ -1,7 +1,18 @@
 """
-Load .env. Python uses: MNEMONIC, ALCHEMY_API_KEY, ALCHEMY_NETWORK,
-COMMISSION_WALLET_MAINNET, COMMISSION_WALLET_SEPOLIA, COMMISSION_WALLET_BASE,
-and DB_DRIVER, DB_DSN, DB_USER, DB_PASSWORD for DB access.
+Load .env. Python uses: MNEMONIC, ALCHEMY_API_KEY, ALCHEMY_NETWORK, ALCHEMY_BATCH_SIZE, ALCHEMY_RATE,
+ALCHEMY_CU_RATE, ALCHEMY_RPC_URL, ALCHEMY_POOL_SIZE, ALCHEMY_KEEP_ALIVE, ALCHEMY_HTTP2,
+CHAIN_<chain_id>_RPC_URL / _BATCH_SIZE / _RATE / _CU_RATE / _MULTICALL (see alchemy_client.ChainRegistry),
+RPC_MAX_RETRIES, RPC_BREAKER_THRESHOLD, RPC_BREAKER_COOLDOWN,
+COMMISSION_WALLET_MAINNET, COMMISSION_WALLET_SEPOLIA, COMMISSION_WALLET_BASE, COMMISSION_WALLET_BASE_SEPOLIA,
+COMMISSION_WALLET_<chain_id>, PAYOUTS_ENABLED,
+CRON_* tuning (CRON_DERIVE_WORKERS, CRON_DERIVE_CHUNK, CRON_WRITE_CHUNK, CRON_ASYNC, CRON_RPC_CONCURRENCY,
+CRON_DAEMON, CRON_INTERVAL, CRON_BALANCE_CACHE, CRON_BALANCE_MAX_AGE, CRON_DETECTOR,
+CRON_SCAN_CONFIRMATIONS, CRON_SCAN_MAX_BLOCKS, CRON_SCAN_BLOCK_BATCH, CRON_PRICES,
+CRON_PRICE_SYMBOLS, CRON_PRICE_TTL, CRON_PRICE_MAX_STALE, CRON_PAYOUT_BATCH, CRON_PAYOUT_WORKERS,
+CRON_PAYOUT_LEASE, CRON_PAYOUT_MAX_ATTEMPTS, CRON_GAS_PRICE_TTL, CRON_SIGN_PROCESSES, CRON_SIGN_MIN_BATCH,
+CRON_PAYOUT_CONFIRMATIONS, CRON_PAYOUT_REBROADCAST, CRON_SWEEP, CRON_SWEEP_BATCH, CRON_SWEEP_MIN_RATIO,
+CRON_SWEEP_RECHECK, CRON_METRICS, CRON_METRICS_FILE, CRON_METRICS_RETENTION), and DB_DRIVER, DB_DSN,
+DB_USER, DB_PASSWORD, DB_POOL_SIZE, DB_SQLITE_JOURNAL_MODE for DB access.
 """
 import os
 from pathlib import Path
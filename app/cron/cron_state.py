@@ -0,0 +1,19 @@
+"""
+cron_state table: small name -> value store for cron bookkeeping (watermarks, checkpoints).
+Portable upsert (UPDATE, then INSERT when no row matched) so it runs on SQLite and MariaDB.
+"""
+from datetime import datetime
+
+def get_state(conn, name: str, default=None):
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM cron_state WHERE name = ?", (name,))
+    row = cur.fetchone()
+    return row[0] if row else default
+
+def set_state(conn, name: str, value) -> None:
+    """Write name = value (caller commits)."""
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    cur.execute("UPDATE cron_state SET value = ?, updated_at = ? WHERE name = ?", (str(value), now, name))
+    if cur.rowcount == 0:
+        cur.execute("INSERT INTO cron_state (name, value, updated_at) VALUES (?, ?, ?)", (name, str(value), now))
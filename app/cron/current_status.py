@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Materialized current status per transaction (current_transaction_statuses).
+
+transaction_statuses is append-only, so instead of re-aggregating the whole history through
+v_current_evm_transaction_statuses every tick, refresh_current_statuses() folds in only rows with
+id above a watermark kept in cron_state. Ids are handed out at INSERT but commit in any order (PHP
+requests write statuses concurrently with the cron), so the last rescan ids below the watermark are
+folded again each run: folding is idempotent, and a row that became visible late is not skipped.
+"Current" is the row with the latest time (ties: highest id), created_at is the earliest time,
+matching v_transaction_statuses max/min.
+
+Consistency check against the views: python cron/current_status.py --check [--repair]
+"""
+from cron_state import get_state, set_state
+
+WATERMARK = "current_status.last_status_id"
+DEFAULT_REFRESH_BATCH = 5000
+# Status ids below the watermark read again every refresh (rows committed after a higher id)
+DEFAULT_RESCAN_IDS = 1000
+_IN_CHUNK = 500
+
+def _fetch_current(cur, uuids) -> dict:
+    """{uuid: (status_id, time, created_at)} for uuids already materialized."""
+    existing = {}
+    for start in range(0, len(uuids), _IN_CHUNK):
+        chunk = uuids[start:start + _IN_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        cur.execute(
+            f"SELECT transaction_uuid, status_id, time, created_at FROM current_transaction_statuses WHERE transaction_uuid IN ({marks})",
+            chunk,
+        )
+        for uuid, status_id, time, created_at in cur.fetchall():
+            existing[uuid] = (status_id, time, created_at)
+    return existing
+
+def _fold(cur, rows) -> None:
+    """Merge status rows (id, uuid, time, amount, status) into current_transaction_statuses."""
+    latest, earliest = {}, {}
+    for row in rows:
+        status_id, uuid, time = row[0], row[1], row[2]
+        if uuid not in latest or (time, status_id) >= (latest[uuid][2], latest[uuid][0]):
+            latest[uuid] = row
+        if uuid not in earliest or time < earliest[uuid]:
+            earliest[uuid] = time
+    existing = _fetch_current(cur, list(latest))
+    for uuid, (status_id, _, time, amount, status) in latest.items():
+        first = earliest[uuid]
+        if uuid not in existing:
+            cur.execute(
+                """INSERT INTO current_transaction_statuses (transaction_uuid, status_id, time, amount, status, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (uuid, status_id, time, amount, status, first),
+            )
+            continue
+        cur_id, cur_time, cur_created = existing[uuid]
+        created_at = min(cur_created, first)
+        if (time, status_id) > (cur_time, cur_id):
+            cur.execute(
+                """UPDATE current_transaction_statuses SET status_id = ?, time = ?, amount = ?, status = ?, created_at = ?
+                   WHERE transaction_uuid = ?""",
+                (status_id, time, amount, status, created_at, uuid),
+            )
+        elif created_at != cur_created:
+            cur.execute(
+                "UPDATE current_transaction_statuses SET created_at = ? WHERE transaction_uuid = ?",
+                (created_at, uuid),
+            )
+
+def refresh_current_statuses(conn, batch_size: int = DEFAULT_REFRESH_BATCH, rescan: int = DEFAULT_RESCAN_IDS) -> int:
+    """
+    Fold status rows appended since the last run (and the last rescan ids before the watermark) into
+    current_transaction_statuses; one commit per batch together with the watermark. First run
+    materializes the full history. Returns rows folded.
+    """
+    cur = conn.cursor()
+    last_id = int(get_state(conn, WATERMARK, 0))
+    after = max(0, last_id - max(0, int(rescan)))
+    folded = 0
+    while True:
+        cur.execute(
+            "SELECT id, transaction_uuid, time, amount, status FROM transaction_statuses WHERE id > ? ORDER BY id LIMIT ?",
+            (after, batch_size),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return folded
+        _fold(cur, rows)
+        after = rows[-1][0]
+        if after > last_id:
+            last_id = after
+            set_state(conn, WATERMARK, last_id)
+        conn.commit()
+        folded += len(rows)
+
+def check_current_statuses(conn, repair: bool = False) -> list:
+    """
+    Compare current_transaction_statuses with v_transaction_statuses (the view's latest/earliest rows).
+    Returns [(uuid, problem)]. On ties in time the view yields several rows; any of them matches.
+    repair=True rebuilds the mismatched uuids from transaction_statuses.
+    """
+    refresh_current_statuses(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT transaction_uuid, max_status, max_amount, min_timestamp FROM v_transaction_statuses")
+    expected = {}
+    for uuid, status, amount, min_ts in cur.fetchall():
+        entry = expected.setdefault(uuid, (set(), min_ts))
+        entry[0].add((status, float(amount)))
+    cur.execute("SELECT transaction_uuid, status, amount, created_at FROM current_transaction_statuses")
+    actual = {uuid: ((status, float(amount)), created_at) for uuid, status, amount, created_at in cur.fetchall()}
+    problems = []
+    for uuid, (candidates, min_ts) in expected.items():
+        if uuid not in actual:
+            problems.append((uuid, "missing"))
+        elif actual[uuid][0] not in candidates:
+            problems.append((uuid, f"status {actual[uuid][0]} not in view {sorted(candidates)}"))
+        elif actual[uuid][1] != min_ts:
+            problems.append((uuid, f"created_at {actual[uuid][1]} != view {min_ts}"))
+    problems.extend((uuid, "not in view") for uuid in actual if uuid not in expected)
+    if repair and problems:
+        for uuid, _ in problems:
+            cur.execute("DELETE FROM current_transaction_statuses WHERE transaction_uuid = ?", (uuid,))
+            cur.execute(
+                "SELECT id, transaction_uuid, time, amount, status FROM transaction_statuses WHERE transaction_uuid = ?",
+                (uuid,),
+            )
+            rows = cur.fetchall()
+            if rows:
+                _fold(cur, rows)
+        conn.commit()
+    return problems
+
+def main():
+    import argparse
+    import sys
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Check current_transaction_statuses against the status views")
+    parser.add_argument("--check", action="store_true", help="compare with v_transaction_statuses (default)")
+    parser.add_argument("--repair", action="store_true", help="rebuild mismatched rows from transaction_statuses")
+    args = parser.parse_args()
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from db import get_connection
+
+    conn = get_connection(str(Path(__file__).resolve().parent.parent))
+    problems = check_current_statuses(conn, repair=args.repair)
+    for uuid, problem in problems:
+        print(f"{uuid}: {problem}")
+    print(f"{len(problems)} mismatches" + (" repaired" if args.repair and problems else ""))
+    conn.close()
+    sys.exit(1 if problems and not args.repair else 0)
+
+if __name__ == "__main__":
+    main()
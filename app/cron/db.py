@@ -1,12 +1,161 @@
 """
 DB connection for Python cron. Same DB as PHP (SQLite or MariaDB from .env).
+
+get_connection() returns a Connection with one cursor API for both backends: task code always
+uses qmark ('?') placeholders, which are translated to pymysql's %s. MariaDB connections come
+from a small per-DSN pool (pinged on checkout); SQLite runs in WAL mode with tuned pragmas.
+Connection.stats counts execute/executemany calls and the statements they ran (for metrics.py).
 """
 import os
+import queue
+import re
 import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
-def get_connection(base_dir: str):
-    """Return a DB connection (sqlite3 or pymysql)."""
+DEFAULT_POOL_SIZE = 4
+# Applied to every SQLite connection. WAL lets PHP readers and the cron writer run concurrently.
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 30000",
+)
+
+# Single-quoted literals (with '' escapes) or a bare ? / %
+_QMARK_TOKENS = re.compile(r"'(?:[^']|'')*'|[?%]")
+
+@lru_cache(maxsize=512)
+def _qmark_to_format(sql: str) -> str:
+    """'?' -> '%s' and '%' -> '%%' outside string literals (pymysql paramstyle)."""
+    def repl(m):
+        tok = m.group(0)
+        if tok == "?":
+            return "%s"
+        if tok == "%":
+            return "%%"
+        return tok.replace("%", "%%")
+    return _QMARK_TOKENS.sub(repl, sql)
+
+
+class Cursor:
+    """DB-API cursor wrapper; execute/executemany take '?' SQL on every backend."""
+
+    def __init__(self, raw, translate, stats=None):
+        self._raw = raw
+        self._translate = translate
+        self._stats = {"calls": 0, "statements": 0} if stats is None else stats
+
+    def execute(self, sql, params=()):
+        self._stats["calls"] += 1
+        self._stats["statements"] += 1
+        self._raw.execute(self._translate(sql), tuple(params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        rows = [tuple(p) for p in seq_of_params]
+        self._stats["calls"] += 1
+        self._stats["statements"] += len(rows)
+        self._raw.executemany(self._translate(sql), rows)
+        return self
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchall(self):
+        return list(self._raw.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def close(self):
+        self._raw.close()
+
+
+class Connection:
+    """Backend-agnostic connection. dialect is 'sqlite' or 'mysql'. close() returns pooled connections."""
+
+    def __init__(self, raw, dialect: str, pool=None):
+        self.raw = raw
+        self.dialect = dialect
+        self._pool = pool
+        self._translate = _qmark_to_format if dialect == "mysql" else (lambda sql: sql)
+        # calls: execute/executemany round trips; statements: rows run (executemany counts each)
+        self.stats = {"calls": 0, "statements": 0}
+
+    def cursor(self) -> Cursor:
+        return Cursor(self.raw.cursor(), self._translate, self.stats)
+
+    def execute(self, sql, params=()) -> Cursor:
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if self.raw is None:
+            return
+        if self._pool is not None:
+            self._pool.release(self.raw)
+        else:
+            self.raw.close()
+        self.raw = None
+
+
+class MySQLPool:
+    """LIFO pool of pymysql connections; idle ones are pinged (and reconnected) on checkout."""
+
+    def __init__(self, connect, size: int = DEFAULT_POOL_SIZE):
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=max(1, int(size)))
+
+    def acquire(self):
+        try:
+            raw = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        raw.ping(reconnect=True)
+        return raw
+
+    def release(self, raw) -> None:
+        try:
+            raw.rollback()
+            self._idle.put_nowait(raw)
+        except queue.Full:
+            raw.close()
+        except Exception:
+            # Broken connection: drop it; the next acquire opens a fresh one
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+
+_pools = {}
+
+def _sqlite_connect(path: str):
+    # Per-chain polling threads may use the connection, one at a time (see BalanceCache)
+    raw = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    journal_mode = os.environ.get("DB_SQLITE_JOURNAL_MODE", "WAL")
+    raw.execute(f"PRAGMA journal_mode = {journal_mode}")
+    for pragma in SQLITE_PRAGMAS:
+        raw.execute(pragma)
+    return raw
+
+def get_connection(base_dir: str) -> Connection:
+    """Return a Connection (sqlite3 or pooled pymysql underneath)."""
     from cron_env import get, get_required, load_dotenv
     load_dotenv(base_dir)
     driver = get("DB_DRIVER", "sqlite").lower()
@@ -15,23 +164,34 @@ def get_connection(base_dir: str):
         path = dsn.replace("sqlite:", "")
         if not path.startswith("/") and ":" not in path[:2]:
             path = str(Path(base_dir) / path.replace("/", os.sep))
-        return sqlite3.connect(path)
+        return Connection(_sqlite_connect(path), "sqlite")
     if driver in ("mariadb", "mysql"):
         try:
             import pymysql
+            from pymysql.constants import CLIENT
         except ImportError:
             raise RuntimeError("pip install pymysql for MariaDB")
         # Parse DSN: mysql:host=...;dbname=...;charset=...
         parts = {}
-        for part in dsn.split(";"):
+        for part in dsn.split(":", 1)[-1].split(";"):
             if "=" in part:
                 k, v = part.strip().split("=", 1)
                 parts[k.strip().lower()] = v.strip()
-        return pymysql.connect(
-            host=parts.get("host", "127.0.0.1"),
-            user=os.environ.get("DB_USER", ""),
-            password=os.environ.get("DB_PASSWORD", ""),
-            database=parts.get("dbname", ""),
-            charset=parts.get("charset", "utf8mb4"),
-        )
+
+        def connect():
+            return pymysql.connect(
+                host=parts.get("host", "127.0.0.1"),
+                port=int(parts.get("port", 3306)),
+                user=os.environ.get("DB_USER", ""),
+                password=os.environ.get("DB_PASSWORD", ""),
+                database=parts.get("dbname", ""),
+                charset=parts.get("charset", "utf8mb4"),
+                # rowcount = matched rows (not changed), so UPDATE-then-INSERT upserts work
+                client_flag=CLIENT.FOUND_ROWS,
+            )
+
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = _pools[dsn] = MySQLPool(connect, int(get("DB_POOL_SIZE", str(DEFAULT_POOL_SIZE))))
+        return Connection(pool.acquire(), "mysql", pool)
     raise RuntimeError(f"Unsupported DB_DRIVER: {driver}")
@@ -3,10 +3,23 @@ HD-derived escrow address (BIP-32/44) per transaction.
 Deterministic: same transaction_uuid always yields same address.
 """
 import hashlib
+import hmac
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import SECP256K1_N, Node, SoftNode, derive_child_key
+from eth_keys import keys
 
 Account.enable_unaudited_hdwallet_features()
 
+# Parent of every escrow (0'/0) and deposit (0'/1) address; the child index comes from the uuid.
+ACCOUNT_PATH = "m/44'/60'/0'"
+ESCROW_BRANCH = 0
+DEPOSIT_BRANCH = 1
+# Addresses per chunk handed to a worker / written by one executemany
+DEFAULT_CHUNK_SIZE = 500
+
 def _derivation_index(transaction_uuid: str) -> int:
     """Deterministic index from transaction uuid (0 .. 2^31-1)."""
     h = hashlib.sha256(transaction_uuid.encode()).hexdigest()[:8]
@@ -32,3 +45,118 @@ def derive_deposit_address(mnemonic: str, deposit_uuid: str) -> str:
     path = f"m/44'/60'/0'/1/{index}"
     acct = Account.from_mnemonic(mnemonic, account_path=path)
     return acct.address
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _ChunkedDeriver:
+    """escrow_chunks / deposit_chunks: yield [(uuid, address), ...] lists for the fill tasks."""
+
+    chunk_size = DEFAULT_CHUNK_SIZE
+
+    def escrow_chunks(self, uuids):
+        return self.address_chunks(ESCROW_BRANCH, uuids)
+
+    def deposit_chunks(self, uuids):
+        return self.address_chunks(DEPOSIT_BRANCH, uuids)
+
+
+class HDDeriver(_ChunkedDeriver):
+    """
+    Same addresses as derive_escrow_address / derive_deposit_address, but the BIP-39 seed
+    stretch and the m/44'/60'/0'/{0,1} parent nodes are computed once; each address then
+    costs one non-hardened child derivation. Create one per cron run (or per worker process).
+    """
+
+    def __init__(self, mnemonic: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = max(1, int(chunk_size))
+        seed = seed_from_mnemonic(mnemonic, "")
+        root = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+        key, chain_code = root[:32], root[32:]
+        for part in ACCOUNT_PATH.split("/")[1:]:
+            key, chain_code = derive_child_key(key, chain_code, Node.decode(part))
+        self._parents = {}
+        for branch in (ESCROW_BRANCH, DEPOSIT_BRANCH):
+            k, c = derive_child_key(key, chain_code, SoftNode(branch))
+            # Compressed parent public key, reused by every soft child derivation
+            point = keys.PrivateKey(k).public_key.to_compressed_bytes()
+            self._parents[branch] = (k, c, point)
+
+    def _child_key(self, branch: int, index: int) -> bytes:
+        """BIP-32 CKDpriv for a non-hardened child of a cached parent."""
+        key, chain_code, point = self._parents[branch]
+        i = hmac.new(chain_code, point + index.to_bytes(4, "big"), hashlib.sha512).digest()
+        il = int.from_bytes(i[:32], "big")
+        child = (il + int.from_bytes(key, "big")) % SECP256K1_N
+        if il >= SECP256K1_N or child == 0:
+            # Invalid child (< 2**-127 probability): defer to eth_account's skip-to-next rule
+            return derive_child_key(key, chain_code, SoftNode(index))[0]
+        return child.to_bytes(32, "big")
+
+    def private_key(self, branch: int, uuid: str) -> bytes:
+        """Private key for m/44'/60'/0'/{branch}/f(uuid)."""
+        return self._child_key(branch, _derivation_index(uuid))
+
+    def address(self, branch: int, uuid: str) -> str:
+        return keys.PrivateKey(self.private_key(branch, uuid)).public_key.to_checksum_address()
+
+    def escrow_address(self, transaction_uuid: str) -> str:
+        return self.address(ESCROW_BRANCH, transaction_uuid)
+
+    def deposit_address(self, deposit_uuid: str) -> str:
+        return self.address(DEPOSIT_BRANCH, deposit_uuid)
+
+    def address_chunks(self, branch: int, uuids):
+        for chunk in _chunks(list(uuids), self.chunk_size):
+            yield [(u, self.address(branch, u)) for u in chunk]
+
+
+# Per-process deriver for ParallelDeriver workers (built once by the pool initializer)
+_worker_deriver = None
+
+def _init_worker(mnemonic: str) -> None:
+    global _worker_deriver
+    _worker_deriver = HDDeriver(mnemonic)
+
+def _derive_chunk(branch: int, uuids):
+    return [(u, _worker_deriver.address(branch, u)) for u in uuids]
+
+
+class ParallelDeriver(_ChunkedDeriver):
+    """
+    Spreads derivation over a ProcessPoolExecutor for large backfills. Each worker loads the
+    mnemonic once; chunks come back as they finish so a single writer can persist them.
+    Inputs of one chunk or less stay in-process (pool startup is not worth it).
+    """
+
+    def __init__(self, mnemonic: str, workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = max(1, int(chunk_size))
+        self._mnemonic = mnemonic
+        self._workers = max(1, int(workers))
+        self._local = HDDeriver(mnemonic, chunk_size=self.chunk_size)
+
+    def escrow_address(self, transaction_uuid: str) -> str:
+        return self._local.escrow_address(transaction_uuid)
+
+    def deposit_address(self, deposit_uuid: str) -> str:
+        return self._local.deposit_address(deposit_uuid)
+
+    def private_key(self, branch: int, uuid: str) -> bytes:
+        return self._local.private_key(branch, uuid)
+
+    def address_chunks(self, branch: int, uuids):
+        uuids = list(uuids)
+        if len(uuids) <= self.chunk_size:
+            yield from self._local.address_chunks(branch, uuids)
+            return
+        # spawn: the cron process has live threads (HTTP pool, price refresh), which fork does not copy safely
+        with ProcessPoolExecutor(
+            max_workers=self._workers, initializer=_init_worker, initargs=(self._mnemonic,),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(_derive_chunk, branch, chunk) for chunk in _chunks(uuids, self.chunk_size)]
+            for future in as_completed(futures):
+                yield future.result()
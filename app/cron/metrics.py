@@ -0,0 +1,239 @@
+"""
+Run metrics for the cron. Every task is timed and gets the counters that moved while it ran:
+rows processed (the task's return value), RPC requests / calls / errors / retries / throttles /
+seconds (rpc_transport.Transport stats), cache hits and misses (BalanceCache, PriceCache,
+GasPriceCache) and DB statements (db.Connection.stats).
+A finished run is written as a Prometheus textfile (CRON_METRICS_FILE, for node_exporter's
+textfile collector) and as a JSON record in cron_runs, pruned after CRON_METRICS_RETENTION days.
+"""
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+DEFAULT_RETENTION_DAYS = 30
+
+# Per-task record key -> (Prometheus gauge, help); the values are from the last run
+TASK_GAUGES = {
+    "seconds": ("cron_task_duration_seconds", "Wall time of the task."),
+    "rows": ("cron_task_rows", "Rows processed by the task."),
+    "rpc_requests": ("cron_task_rpc_requests", "HTTP requests sent to RPC endpoints."),
+    "rpc_calls": ("cron_task_rpc_calls", "JSON-RPC calls sent (each batch item counts)."),
+    "rpc_errors": ("cron_task_rpc_errors", "Failed RPC requests plus calls answered with an error."),
+    "rpc_retries": ("cron_task_rpc_retries", "RPC requests retried."),
+    "rpc_throttled": ("cron_task_rpc_throttled", "RPC responses that were rate limited."),
+    "rpc_seconds": ("cron_task_rpc_seconds", "Seconds spent waiting on RPC requests."),
+    "cache_hits": ("cron_task_cache_hits", "Balance, price and gas price cache hits."),
+    "cache_misses": ("cron_task_cache_misses", "Balance, price and gas price cache misses."),
+    "db_statements": ("cron_task_db_statements", "DB statements run (executemany counts each row)."),
+}
+# Transport stats key -> (Prometheus counter, help); totals since the process started
+RPC_COUNTERS = {
+    "requests": ("cron_rpc_requests_total", "HTTP requests sent per chain."),
+    "calls": ("cron_rpc_calls_total", "JSON-RPC calls sent per chain."),
+    "call_errors": ("cron_rpc_call_errors_total", "JSON-RPC calls answered with an error per chain."),
+    "failures": ("cron_rpc_failures_total", "RPC requests that failed after retries per chain."),
+    "retries": ("cron_rpc_retries_total", "RPC requests retried per chain."),
+    "throttled": ("cron_rpc_throttled_total", "Rate-limited RPC responses per chain."),
+    "compute_units": ("cron_rpc_compute_units_total", "Compute units spent per chain."),
+    "seconds": ("cron_rpc_seconds_total", "Seconds spent waiting on RPC requests per chain."),
+}
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def task_rows(result):
+    """Rows a task processed from its return value: an int, or the sum of a {status: count} dict."""
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict) and all(isinstance(v, int) for v in result.values()):
+        return sum(result.values())
+    return None
+
+def _number(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunMetrics:
+    """
+    metrics = RunMetrics(conn, client.registry, caches=[balance_cache, client.prices])
+    run_fill_escrow = metrics.timed(run_fill_escrow)     # recorded as task "fill_escrow"
+    with metrics.task("fetch_balances") as t:            # or time a block; set t["rows"] yourself
+        ...
+    metrics.start(); ...; record = metrics.finish("ok")  # one run: cron_runs row + textfile
+
+    conn (optional) supplies DB statement counts and, with store=True, receives the cron_runs record;
+    path (optional) is the Prometheus textfile.
+    Counters are read before and after each task, so run tasks one at a time.
+    """
+
+    def __init__(self, conn=None, registry=None, caches=(), path: str = None, store: bool = True,
+                 retention_days: float = DEFAULT_RETENTION_DAYS):
+        self._conn = conn
+        self.store = store
+        self._registry = registry
+        self.caches = [c for c in caches if c is not None]
+        self.path = path
+        self.retention_days = float(retention_days)
+        self.tasks = []
+        self.runs = {}
+        self._started = None
+        self._start_counters = None
+        self._started_at = None
+
+    def counters(self) -> dict:
+        """Current totals of every counter a task record reports."""
+        rpc = list(self._registry.stats().values()) if self._registry is not None else []
+        db = getattr(self._conn, "stats", None) or {}
+        return {
+            "rpc_requests": sum(st["requests"] for st in rpc),
+            "rpc_calls": sum(st["calls"] for st in rpc),
+            "rpc_errors": sum(st["failures"] + st["call_errors"] + st["short_circuited"] for st in rpc),
+            "rpc_retries": sum(st["retries"] for st in rpc),
+            "rpc_throttled": sum(st["throttled"] for st in rpc),
+            "rpc_seconds": sum(st["seconds"] for st in rpc),
+            "cache_hits": sum(getattr(c, "hits", 0) + getattr(c, "stale_hits", 0) for c in self.caches),
+            "cache_misses": sum(getattr(c, "misses", 0) for c in self.caches),
+            "db_statements": db.get("statements", 0),
+        }
+
+    @staticmethod
+    def _delta(before: dict, after: dict) -> dict:
+        return {k: round(after[k] - before[k], 4) if isinstance(after[k], float) else after[k] - before[k]
+                for k in after}
+
+    def start(self) -> None:
+        """Begin a run (one cron invocation or one daemon cycle)."""
+        self.tasks = []
+        self._started = time.perf_counter()
+        self._started_at = _now()
+        self._start_counters = self.counters()
+
+    @contextmanager
+    def task(self, name: str):
+        """Time the block as task `name`; yields its record (set record["rows"] if known)."""
+        record = {"task": name, "status": "ok", "rows": None}
+        before = self.counters()
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)[:200] or type(e).__name__
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 4)
+            record.update(self._delta(before, self.counters()))
+            self.tasks.append(record)
+
+    def timed(self, fn, name: str = None, rows=task_rows):
+        """fn wrapped as a task named `name` (default: fn's name without run_); rows(result) -> rows processed."""
+        if name is None:
+            name = fn.__name__[4:] if fn.__name__.startswith("run_") else fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.task(name) as record:
+                result = fn(*args, **kwargs)
+                record["rows"] = rows(result)
+                return result
+        return wrapper
+
+    def finish(self, status: str = "ok") -> dict:
+        """End the run: build its record, store it in cron_runs and write the textfile. Returns the record."""
+        if self._started is None:
+            self.start()
+        self.runs[status] = self.runs.get(status, 0) + 1
+        record = {
+            "uuid": uuid.uuid4().hex,
+            "started_at": self._started_at,
+            "finished_at": _now(),
+            "seconds": round(time.perf_counter() - self._started, 4),
+            "status": status,
+            "tasks": self.tasks,
+            "totals": self._delta(self._start_counters, self.counters()),
+        }
+        self._started = None
+        # Metrics must never take the run down: failures are logged and the run carries on
+        if self._conn is not None and self.store:
+            try:
+                if status != "ok":
+                    # Drop what the failed task left uncommitted rather than committing it with the record
+                    self._conn.rollback()
+                self.save(record)
+            except Exception as e:
+                self._conn.rollback()
+                print(f"metrics: cron_runs record not saved: {e}")
+        if self.path:
+            try:
+                self.write_textfile(record)
+            except OSError as e:
+                print(f"metrics: {self.path} not written: {e}")
+        return record
+
+    def save(self, record: dict) -> None:
+        """Insert the run record into cron_runs and drop records older than retention_days (commits)."""
+        cur = self._conn.cursor()
+        cur.execute(
+            "INSERT INTO cron_runs (uuid, started_at, finished_at, seconds, status, record) VALUES (?, ?, ?, ?, ?, ?)",
+            (record["uuid"], record["started_at"], record["finished_at"], record["seconds"], record["status"],
+             json.dumps(record, separators=(",", ":"))),
+        )
+        if self.retention_days > 0:
+            cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+            cur.execute("DELETE FROM cron_runs WHERE started_at < ?", (cutoff,))
+        self._conn.commit()
+
+    def render(self, record: dict) -> str:
+        """Prometheus text exposition of a run record plus the per-chain RPC totals."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label}}} {_number(value)}" if label else f"{name} {_number(value)}")
+
+        metric("cron_last_run_timestamp_seconds", "gauge", "Unix time the last run finished.", [({}, time.time())])
+        metric("cron_last_run_duration_seconds", "gauge", "Wall time of the last run.", [({}, record["seconds"])])
+        metric("cron_last_run_success", "gauge", "1 if the last run finished without an error.",
+               [({}, 1 if record["status"] == "ok" else 0)])
+        metric("cron_runs_total", "counter", "Runs finished by this process, by status.",
+               [({"status": s}, n) for s, n in sorted(self.runs.items())])
+        for key, (name, help_text) in TASK_GAUGES.items():
+            samples = [({"task": t["task"]}, t[key]) for t in record["tasks"] if t.get(key) is not None]
+            if samples:
+                metric(name, "gauge", help_text + " Last run.", samples)
+        rpc = self._registry.stats() if self._registry is not None else {}
+        if rpc:
+            for key, (name, help_text) in RPC_COUNTERS.items():
+                metric(name, "counter", help_text, [({"chain": chain}, st[key]) for chain, st in sorted(rpc.items(), key=str)])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, record: dict) -> None:
+        """Write render(record) to self.path atomically (temp file + rename), as the textfile collector expects."""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render(record))
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def summary(record: dict) -> list:
+        """One log line per task of a run record."""
+        return [
+            f"Task {t['task']} {t['status']} in {t['seconds']:.2f}s: "
+            f"{'-' if t['rows'] is None else t['rows']} rows, {t['rpc_calls']} RPC calls "
+            f"({t['rpc_errors']} errors, {t['rpc_seconds']:.2f}s), {t['cache_hits']} cache hits, "
+            f"{t['db_statements']} DB statements"
+            for t in record["tasks"]
+        ]
@@ -0,0 +1,608 @@
+"""
+Payout workers: transaction_intents (RELEASE / CANCEL / PARTIAL_REFUND rows PHP's StatusMachine writes)
+and deposit_withdraw_intents. Intents are leased in batches, signed together, stored on the intent, then
+broadcast and booked one transaction per intent; unpayable intents back off. Native coin only.
+"""
+import json
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from eth_account import Account
+from eth_utils import is_address, to_checksum_address
+
+from bulk import DEFAULT_WRITE_CHUNK, ChunkedWriter
+from current_status import refresh_current_statuses
+from rpc_transport import RpcError
+from tasks import _token_contracts, _tokens_by_symbol
+from tx_sender import (
+    GasPriceCache, NonceManager, Signer, StaleNonceError, known_hashes, max_tx_cost, send_by_chain, sent_rows,
+)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+# A failed attempt is retried after RETRY_SECONDS * 2 ** (attempts - 1), at most MAX_RETRY_SECONDS
+RETRY_SECONDS = 300
+MAX_RETRY_SECONDS = 6 * 3600
+
+RESULT_STATUS = {"RELEASE": "RELEASED", "CANCEL": "CANCELLED", "PARTIAL_REFUND": "CANCELLED"}
+TERMINAL_STATUSES = ("RELEASED", "CANCELLED")
+# Config.php defaults, used when the config row is missing
+DEFAULT_COMMISSION = {"gold": "0.02", "silver": "0.05", "bronze": "0.10", "free": "0.20"}
+DEFAULT_REFERRAL_PERCENT = "0.50"
+DEFAULT_RESOLVER_PERCENT = "0.10"
+COMMISSION_WALLET_ENV = {
+    1: "COMMISSION_WALLET_MAINNET",
+    11155111: "COMMISSION_WALLET_SEPOLIA",
+    8453: "COMMISSION_WALLET_BASE",
+    84532: "COMMISSION_WALLET_BASE_SEPOLIA",
+}
+
+
+class PayoutError(RuntimeError):
+    """Intent cannot be paid yet (missing address, no funds, ...); nothing was sent."""
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def commission_wallets(environ=None) -> dict:
+    """chain_id -> commission wallet from COMMISSION_WALLET_<MAINNET|SEPOLIA|BASE|BASE_SEPOLIA> or COMMISSION_WALLET_<chain_id>."""
+    environ = os.environ if environ is None else environ
+    wallets = {chain_id: environ.get(name, "") for chain_id, name in COMMISSION_WALLET_ENV.items()}
+    for name, value in environ.items():
+        if name.startswith("COMMISSION_WALLET_") and name[len("COMMISSION_WALLET_"):].isdigit():
+            wallets[int(name[len("COMMISSION_WALLET_"):])] = value
+    return {chain_id: w for chain_id, w in wallets.items() if w}
+
+def _decimal(value, default: str) -> Decimal:
+    try:
+        return Decimal(str(value if value not in (None, "") else default))
+    except InvalidOperation:
+        return Decimal(default)
+
+
+def release_split(vendor, commission, wallet, inviter=None, referral_percent=Decimal(0)):
+    """Vendor gets 1 - commission; the buyer's inviter commission * referral_percent; the commission wallet the rest."""
+    shares = [("vendor", vendor, 1 - commission)]
+    if inviter:
+        shares.append(("referral", inviter, commission * referral_percent))
+    shares.append(("commission", wallet, commission - sum(s for _, _, s in shares[1:])))
+    return shares
+
+def cancel_split(buyer):
+    return [("buyer", buyer, Decimal(1))]
+
+def partial_refund_split(vendor, buyer, resolver, refund_percent, resolver_percent):
+    """
+    Dispute split per the accounting spec: buyer refund_percent - resolver/2, vendor the complement
+    minus resolver/2, resolver resolver_percent; clamped so no share goes negative.
+    """
+    buyer_share = min(max(Decimal(0), refund_percent - resolver_percent / 2), 1 - resolver_percent)
+    return [("buyer", buyer, buyer_share), ("vendor", vendor, 1 - resolver_percent - buyer_share),
+            ("resolver", resolver, resolver_percent)]
+
+def allocate(total_wei: int, shares) -> list:
+    """Wei per share (floored); the last recipient takes the rounding remainder."""
+    out, paid = [], 0
+    for i, share in enumerate(shares):
+        wei = total_wei - paid if i == len(shares) - 1 else int(Decimal(total_wei) * share)
+        out.append(wei)
+        paid += wei
+    return out
+
+def share_plan(shares, keep=()):
+    """
+    Plan for prepare_payouts: the balance minus gas split by shares [(role, to, Decimal)]. Roles in keep
+    are not sent (their wei stays on the source, e.g. commission left for the sweep) and cost no gas.
+    plan(balance, tx_cost) -> (transfers [(role, to, wei)], kept [(role, to, wei)]).
+    """
+    shares = [s for s in shares if s[2] > 0]
+
+    def plan(balance, tx_cost):
+        total = balance - sum(1 for role, _, _ in shares if role not in keep) * tx_cost
+        if total <= 0:
+            raise PayoutError("balance does not cover gas")
+        amounts = [(role, to, wei) for (role, to, _), wei in zip(shares, allocate(total, [s for _, _, s in shares])) if wei > 0]
+        return [a for a in amounts if a[0] not in keep], [a for a in amounts if a[0] in keep]
+    return plan
+
+
+def claim_intents(conn, owner: str, batch_size: int = DEFAULT_BATCH_SIZE, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                  table: str = "transaction_intents") -> list:
+    """
+    Lease up to batch_size pending (or lease-expired) intents of table to owner; returns their ids.
+    Intents waiting out a retry backoff (next_attempt_at in the future) are skipped.
+    Each row is taken with a conditional UPDATE, so two workers racing for it cannot both win.
+    """
+    now = _now()
+    until = (datetime.utcnow() + timedelta(seconds=lease_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+    claimable = ("((status = 'pending' AND (next_attempt_at IS NULL OR next_attempt_at <= ?))"
+                 " OR (status = 'processing' AND lease_until < ?))")
+    cur = conn.cursor()
+    cur.execute(f"SELECT id FROM {table} WHERE {claimable} ORDER BY id LIMIT ?", (now, now, int(batch_size)))
+    claimed = []
+    for (intent_id,) in cur.fetchall():
+        cur.execute(
+            f"UPDATE {table} SET status = 'processing', claimed_by = ?, lease_until = ? WHERE id = ? AND {claimable}",
+            (owner, until, intent_id, now, now),
+        )
+        if cur.rowcount == 1:
+            claimed.append(intent_id)
+    conn.commit()
+    return claimed
+
+def _store_tier(gold, silver, bronze) -> str:
+    return "gold" if gold else "silver" if silver else "bronze" if bronze else "free"
+
+def _tiers(cur, user_uuids) -> dict:
+    """user_uuid -> best account tier among the stores the user belongs to (default free)."""
+    tiers = {}
+    user_uuids = [u for u in set(user_uuids) if u]
+    if not user_uuids:
+        return tiers
+    cur.execute(
+        f"""SELECT su.user_uuid, s.is_gold, s.is_silver, s.is_bronze FROM store_users su
+            JOIN stores s ON s.uuid = su.store_uuid WHERE su.user_uuid IN ({", ".join("?" * len(user_uuids))})""",
+        user_uuids,
+    )
+    rank = {"gold": 3, "silver": 2, "bronze": 1, "free": 0}
+    for user_uuid, gold, silver, bronze in cur.fetchall():
+        tier = _store_tier(gold, silver, bronze)
+        if rank[tier] > rank[tiers.get(user_uuid, "free")]:
+            tiers[user_uuid] = tier
+    return tiers
+
+def load_intents(conn, intent_ids) -> list:
+    """Claimed intents with everything a payout needs, as dicts (one query plus inviter tiers)."""
+    if not intent_ids:
+        return []
+    cur = conn.cursor()
+    cur.execute(
+        f"""SELECT i.id, i.transaction_uuid, i.action, i.params, i.requested_by_user_uuid, i.signed_txs, i.attempts,
+                   e.escrow_address, e.chain_id, e.currency, t.refund_address, bu.refund_address_evm,
+                   s.withdraw_address, s.is_gold, s.is_silver, s.is_bronze, c.status,
+                   bu.inviter_uuid, iu.refund_address_evm, ru.resolver_evm_address
+            FROM transaction_intents i
+            LEFT JOIN transactions t ON t.uuid = i.transaction_uuid
+            LEFT JOIN evm_transactions e ON e.uuid = i.transaction_uuid
+            LEFT JOIN stores s ON s.uuid = t.store_uuid
+            LEFT JOIN users bu ON bu.uuid = t.buyer_uuid
+            LEFT JOIN users iu ON iu.uuid = bu.inviter_uuid
+            LEFT JOIN users ru ON ru.uuid = i.requested_by_user_uuid
+            LEFT JOIN current_transaction_statuses c ON c.transaction_uuid = i.transaction_uuid
+            WHERE i.id IN ({", ".join("?" * len(intent_ids))})
+            ORDER BY i.id""",
+        list(intent_ids),
+    )
+    keys = ("id", "transaction_uuid", "action", "params", "requested_by", "signed_txs", "attempts",
+            "escrow_address", "chain_id", "currency", "refund_address", "buyer_refund_address",
+            "withdraw_address", "is_gold", "is_silver", "is_bronze", "status",
+            "inviter_uuid", "inviter_address", "resolver_address")
+    intents = [dict(zip(keys, row)) for row in cur.fetchall()]
+    tiers = _tiers(cur, [i["inviter_uuid"] for i in intents])
+    for intent in intents:
+        intent["store_tier"] = _store_tier(intent["is_gold"], intent["is_silver"], intent["is_bronze"])
+        intent["inviter_tier"] = tiers.get(intent["inviter_uuid"], "free")
+    return intents
+
+def _address(value, what: str) -> str:
+    if not value or not is_address(value):
+        raise PayoutError(f"no valid {what}")
+    return to_checksum_address(value)
+
+def plan_shares(intent, config_get, wallets, token_contracts=None) -> list:
+    """[(role, checksum address, Decimal share)] summing to 1 for the intent's action. Raises PayoutError."""
+    if intent["escrow_address"] is None or intent["chain_id"] is None:
+        raise PayoutError("transaction has no escrow address")
+    if token_contracts and token_contracts.get((int(intent["chain_id"]), intent["currency"])):
+        raise PayoutError("ERC-20 escrow payouts are not supported (escrow holds no gas)")
+    chain_id = int(intent["chain_id"])
+    action = intent["action"]
+    if action == "CANCEL":
+        return cancel_split(_address(intent["refund_address"] or intent["buyer_refund_address"], "buyer refund address"))
+    vendor = _address(intent["withdraw_address"], "store withdraw_address")
+    wallet = _address(wallets.get(chain_id), f"commission wallet for chain {chain_id}")
+    if action == "RELEASE":
+        tier = intent["store_tier"]
+        commission = _decimal(config_get(f"{tier}_account_commission", DEFAULT_COMMISSION[tier]), DEFAULT_COMMISSION[tier])
+        inviter = intent["inviter_address"] if intent["inviter_address"] and is_address(intent["inviter_address"]) else None
+        referral = _decimal(config_get(f"{intent['inviter_tier']}_account_referral_percent", DEFAULT_REFERRAL_PERCENT),
+                            DEFAULT_REFERRAL_PERCENT)
+        return release_split(vendor, commission, wallet, inviter and to_checksum_address(inviter), referral)
+    if action == "PARTIAL_REFUND":
+        try:
+            percent = Decimal(str(json.loads(intent["params"] or "{}").get("refund_percent")))
+        except (ValueError, TypeError, InvalidOperation, AttributeError):
+            raise PayoutError("bad refund_percent")
+        if not 0 < percent <= 100:
+            raise PayoutError("refund_percent out of range")
+        buyer = _address(intent["refund_address"] or intent["buyer_refund_address"], "buyer refund address")
+        resolver = intent["resolver_address"] if intent["resolver_address"] and is_address(intent["resolver_address"]) else wallet
+        resolver_percent = _decimal(config_get("partial_refund_resolver_percent", DEFAULT_RESOLVER_PERCENT), DEFAULT_RESOLVER_PERCENT)
+        return partial_refund_split(vendor, buyer, to_checksum_address(resolver), percent / 100, resolver_percent)
+    raise PayoutError(f"unknown action {action!r}")
+
+
+def prepare_payouts(payouts, registry, nonces, gas_prices, signer, workers=DEFAULT_WORKERS) -> dict:
+    """
+    Signed txs per payout: {id: [tx] or Exception}. payouts are dicts with id, chain_id, source (address),
+    private_key() -> key bytes of source, plan(balance_wei, tx_cost_wei) -> (transfers, kept) (see
+    share_plan; raises PayoutError) and signed_txs (stored JSON). Payouts with signed_txs keep them
+    (re-broadcast, never re-signed). The others get their transfers from plan, nonces from nonces
+    (NonceManager) and the fees from gas_prices (GasPriceCache, planned at max_tx_cost per transfer so the
+    fee headroom stays on the source); all their transfers are signed in
+    one signer.sign call. payout["kept"] is set to the planned wei that stays on the source.
+    """
+    out, by_chain = {}, {}
+    for payout in payouts:
+        if payout["signed_txs"]:
+            out[payout["id"]] = json.loads(payout["signed_txs"])
+        else:
+            by_chain.setdefault(int(payout["chain_id"]), []).append(payout)
+
+    def reads(chain_id):
+        try:
+            endpoint = registry.get(chain_id)
+            sources = [p["source"] for p in by_chain[chain_id]]
+            return endpoint.get_balances_wei(sources), nonces.prime(endpoint, sources), gas_prices.get(endpoint)
+        except RpcError as e:
+            return e
+
+    chain_reads = {}
+    if by_chain:
+        with ThreadPoolExecutor(max(1, min(workers, len(by_chain)))) as pool:
+            chain_reads = dict(zip(by_chain, pool.map(reads, by_chain)))
+    unsigned = {}
+    for chain_id, items in by_chain.items():
+        result = chain_reads[chain_id]
+        if isinstance(result, Exception):
+            out.update({p["id"]: result for p in items})
+            continue
+        balances, nonce_errors, fees = result
+        for payout in items:
+            source = payout["source"]
+            balance = balances.get(source)
+            error = nonce_errors.get(source) or (balance if isinstance(balance, Exception) else None)
+            if error is not None or balance is None:
+                out[payout["id"]] = error or RpcError("balance read missing")
+                continue
+            key = payout["private_key"]()
+            if Account.from_key(key).address.lower() != source.lower():
+                out[payout["id"]] = PayoutError("derived key does not match the source address")
+                continue
+            try:
+                transfers, payout["kept"] = payout["plan"](balance, max_tx_cost(fees))
+            except PayoutError as e:
+                out[payout["id"]] = e
+                continue
+            nonce = nonces.reserve(chain_id, source, len(transfers))
+            unsigned[payout["id"]] = [(key, chain_id, nonce + i, fees, role, to, wei)
+                                      for i, (role, to, wei) in enumerate(transfers)]
+            # Same source twice in one batch: the first payout takes the whole balance
+            balances[source] = 0
+    signed = iter(signer.sign([job for jobs in unsigned.values() for job in jobs]))
+    for payout_id, jobs in unsigned.items():
+        out[payout_id] = [next(signed) for _ in jobs]
+    return out
+
+def send_payouts(payouts, signed, registry, nonces, workers=DEFAULT_WORKERS) -> dict:
+    """
+    Broadcast the signed txs of payouts: JSON-RPC batches per chain, chains in parallel, nonce order per
+    source. Returns {id: None or RpcError (first rejected tx)}; a rejection makes nonces re-read that source.
+    The error is a StaleNonceError only when every tx of the payout was refused for a nonce already used by
+    another tx: nothing of it was sent, so it may be signed again. A failed payout gets payout["accepted"],
+    the txs the node did take (see broadcast_txs).
+    """
+    by_chain = {}
+    for payout in payouts:
+        txs = signed.get(payout["id"])
+        if isinstance(txs, list):
+            by_chain.setdefault(int(payout["chain_id"]), []).extend(txs)
+    for txs in by_chain.values():
+        # Stable: each source's txs stay in nonce order
+        txs.sort(key=lambda tx: tx["nonce"])
+    results = send_by_chain(registry, by_chain, workers)
+    out = {}
+    for payout in payouts:
+        txs = signed.get(payout["id"])
+        if not isinstance(txs, list):
+            continue
+        errors = [results.get(tx["hash"]) for tx in txs]
+        error = next((e for e in errors if e is not None), None)
+        if isinstance(error, StaleNonceError) and not all(isinstance(e, StaleNonceError) for e in errors):
+            error = RpcError(str(error))
+        out[payout["id"]] = error
+        if error is not None:
+            payout["accepted"] = [tx for tx, e in zip(txs, errors) if e is None]
+            nonces.reset(int(payout["chain_id"]), payout["source"])
+    return out
+
+def broadcast_txs(payout, signed, sent) -> list:
+    """The txs of a sent payout that are out on the node: all of them, or after a failed send the accepted ones."""
+    return signed[payout["id"]] if sent.get(payout["id"]) is None else payout.get("accepted", [])
+
+
+def _release_lease(table: str) -> str:
+    return f"UPDATE {table} SET status = 'pending', claimed_by = NULL, lease_until = NULL, last_error = ? WHERE id = ?"
+
+def _attempt_failed(table: str, intent_id, attempts, error, max_attempts: int):
+    """Count a failed attempt: back to pending after a backoff, or failed after max_attempts."""
+    attempts = int(attempts or 0) + 1
+    retry_at = datetime.utcnow() + timedelta(seconds=min(MAX_RETRY_SECONDS, RETRY_SECONDS * 2 ** (attempts - 1)))
+    return (f"""UPDATE {table} SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, claimed_by = NULL,
+                lease_until = NULL WHERE id = ?""",
+            ("failed" if attempts >= max_attempts else "pending", attempts, str(error),
+             retry_at.strftime("%Y-%m-%d %H:%M:%S"), intent_id))
+
+def _send_failed(table: str, payout, error, max_attempts: int):
+    if isinstance(error, StaleNonceError):
+        # The stored txs can never be mined: drop them, the next claim signs again on a fresh pending nonce
+        attempts = int(payout["attempts"] or 0) + 1
+        return (f"""UPDATE {table} SET status = ?, attempts = ?, last_error = ?, signed_txs = NULL, next_attempt_at = NULL,
+                    claimed_by = NULL, lease_until = NULL WHERE id = ?""",
+                ("failed" if attempts >= max_attempts else "pending", attempts, str(error), payout["id"]))
+    return _attempt_failed(table, payout["id"], payout["attempts"], error, max_attempts)
+
+def _sign_and_send(conn, table: str, task: str, payouts, errors, statements, registry, nonces, gas_prices, signer,
+                   workers, chunk_size, attempts, max_attempts, signed_statements=None):
+    """
+    Sign payouts, commit the new signed txs (together with statements, and signed_statements(payout, txs)
+    for each newly signed payout) and broadcast. Payouts that cannot be signed, and errors
+    ({id: PayoutError}), go back to pending with last_error: a failed chain read at once, a
+    PayoutError counted as a failed attempt (attempts: {id: attempts so far}) with backoff.
+    Returns (signed, sendable payouts, {id: None or RpcError}, deferred {id: error}).
+    """
+    signed = prepare_payouts(payouts, registry, nonces, gas_prices, signer, workers)
+    deferred = dict(errors)
+    deferred.update({payout_id: txs for payout_id, txs in signed.items() if isinstance(txs, Exception)})
+    with ChunkedWriter(conn, f"{task}.sign", chunk_size) as writer:
+        for statement in statements:
+            writer.add(statement)
+        for payout_id, error in deferred.items():
+            if isinstance(error, RpcError):
+                writer.add((_release_lease(table), (str(error), payout_id)))
+            else:
+                # e.g. balance below gas or no withdraw address: do not re-plan it every tick
+                writer.add(_attempt_failed(table, payout_id, attempts.get(payout_id), error, max_attempts))
+        for payout in payouts:
+            txs = signed.get(payout["id"])
+            if isinstance(txs, list) and not payout["signed_txs"]:
+                writer.add((f"UPDATE {table} SET signed_txs = ? WHERE id = ?", (json.dumps(txs), payout["id"])),
+                           *(signed_statements(payout, txs) if signed_statements else ()))
+    sendable = [p for p in payouts if p["id"] not in deferred]
+    return signed, sendable, send_payouts(sendable, signed, registry, nonces, workers), deferred
+
+def _tx_sender_defaults(nonces, gas_prices, signer):
+    return (NonceManager() if nonces is None else nonces, GasPriceCache() if gas_prices is None else gas_prices,
+            Signer(processes=1) if signer is None else signer)
+
+
+def _comment(intent) -> str:
+    if intent["action"] == "RELEASE":
+        return "Released to vendor"
+    if intent["action"] == "CANCEL":
+        return "Cancelled: refunded to buyer"
+    percent = json.loads(intent["params"] or "{}").get("refund_percent")
+    return f"Partial refund {percent}% to buyer"
+
+def _intent_payouts(intents, private_key, config_get, wallets, token_contracts, defer_commission=False):
+    """(payouts for prepare_payouts, {intent id: PayoutError}) for transaction intents."""
+    payouts, errors = [], {}
+    for intent in intents:
+        try:
+            shares = [] if intent["signed_txs"] else plan_shares(intent, config_get, wallets, token_contracts)
+        except PayoutError as e:
+            errors[intent["id"]] = e
+            continue
+        keep = ("commission",) if defer_commission and intent["action"] == "RELEASE" else ()
+        payouts.append({"id": intent["id"], "chain_id": intent["chain_id"], "source": intent["escrow_address"],
+                        "signed_txs": intent["signed_txs"], "attempts": intent["attempts"],
+                        "plan": share_plan(shares, keep), "transaction_uuid": intent["transaction_uuid"],
+                        "private_key": partial(private_key, intent["transaction_uuid"])})
+    return payouts, errors
+
+def _owed_rows(payout, txs):
+    """escrow_sweeps row for commission a release left on the escrow (collected later by sweep.py)."""
+    owed = sum(wei for _, _, wei in payout.get("kept") or ())
+    if not owed:
+        return []
+    now = _now()
+    return [("DELETE FROM escrow_sweeps WHERE transaction_uuid = ?", (payout["transaction_uuid"],)),
+            ("""INSERT INTO escrow_sweeps (transaction_uuid, chain_id, escrow_address, owed_wei, status, checks, attempts,
+                                          swept_wei, next_check_at, created_at) VALUES (?, ?, ?, ?, 'owed', 0, 0, '0', ?, ?)""",
+             (payout["transaction_uuid"], int(payout["chain_id"]), payout["source"], str(owed), now, now))]
+
+def run_process_transaction_intents(conn, registry, private_key, config_get, wallets=None, eth_usd=None,
+                                    chunk_size=DEFAULT_WRITE_CHUNK,
+                                    batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                                    lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                                    nonces=None, gas_prices=None, signer=None, defer_commission=False) -> int:
+    """
+    Claim and pay one batch of intents; returns the number completed.
+    registry: alchemy_client.ChainRegistry; private_key(transaction_uuid) -> escrow key bytes;
+    wallets: chain_id -> commission wallet (commission_wallets()); eth_usd() -> float or None, for
+    referral_payments.referral_payment_usd. nonces / gas_prices / signer: tx_sender NonceManager,
+    GasPriceCache and Signer to keep across runs (default: fresh ones, signing inline).
+    defer_commission: a release sends no commission tx; the commission stays on the escrow, is recorded
+    in escrow_sweeps and collected by sweep.run_sweep_escrows once it is worth the gas.
+    """
+    wallets = commission_wallets() if wallets is None else wallets
+    nonces, gas_prices, signer = _tx_sender_defaults(nonces, gas_prices, signer)
+    claimed = claim_intents(conn, worker_id(), batch_size, lease_seconds)
+    if not claimed:
+        return 0
+    refresh_current_statuses(conn)
+    intents = load_intents(conn, claimed)
+    now = _now()
+    # Already paid: complete without sending. A second intent for the same transaction waits for the next batch
+    settle, todo, seen, completed = [], [], set(), 0
+    for intent in intents:
+        if intent["status"] in TERMINAL_STATUSES and not intent["signed_txs"]:
+            completed += 1
+            settle.append(("UPDATE transaction_intents SET status = 'completed', processed_at = ?, lease_until = NULL WHERE id = ?",
+                           (now, intent["id"])))
+        elif intent["transaction_uuid"] in seen:
+            settle.append((_release_lease("transaction_intents"), (None, intent["id"])))
+        else:
+            seen.add(intent["transaction_uuid"])
+            todo.append(intent)
+
+    payouts, errors = _intent_payouts(todo, private_key, config_get, wallets, _token_contracts(conn), defer_commission)
+    signed, sendable, sent, deferred = _sign_and_send(
+        conn, "transaction_intents", "transaction_intents", payouts, errors, settle,
+        registry, nonces, gas_prices, signer, workers, chunk_size,
+        {intent["id"]: intent["attempts"] for intent in todo}, max_attempts, _owed_rows,
+    )
+    by_id = {intent["id"]: intent for intent in todo}
+    paid = [p for p in sendable if sent.get(p["id"]) is None and signed[p["id"]]]
+    recorded = known_hashes(conn, [tx["hash"] for p in sendable for tx in broadcast_txs(p, signed, sent)])
+    cur = conn.cursor()
+    receipts = [signed[p["id"]][0]["hash"] for p in paid]
+    known = set()
+    if receipts:
+        cur.execute(f"SELECT uuid FROM payment_receipts WHERE uuid IN ({', '.join('?' * len(receipts))})", receipts)
+        known = {row[0] for row in cur.fetchall()}
+    usd = eth_usd() if eth_usd is not None else None
+    failed = {}
+    # One transaction per intent, rows in dependency order (payout_txs, receipt, status, referrals, intent)
+    with ChunkedWriter(conn, "transaction_intents", ordered=True) as writer:
+        for payout in sendable:
+            intent, error, txs = by_id[payout["id"]], sent.get(payout["id"]), signed[payout["id"]]
+            if error is not None:
+                # Txs the node took before one was refused are tracked, so they are never planned again
+                failed[intent["id"]] = error
+                writer.add(*sent_rows("transaction_intent", intent["id"], intent["chain_id"], intent["escrow_address"],
+                                      [t for t in payout["accepted"] if t["hash"] not in recorded], now),
+                           _send_failed("transaction_intents", intent, error, max_attempts))
+                continue
+            receipt = txs[0]["hash"]
+            total_eth = float(sum(Decimal(t["value"]) for t in txs) / Decimal(10 ** 18))
+            statements = sent_rows("transaction_intent", intent["id"], intent["chain_id"], intent["escrow_address"],
+                                   [t for t in txs if t["hash"] not in recorded], now)
+            if receipt not in known:
+                data = {"intent_id": intent["id"], "action": intent["action"], "chain_id": int(intent["chain_id"]),
+                        "from": intent["escrow_address"], "txs": [{k: t[k] for k in ("role", "to", "value", "nonce", "hash")} for t in txs]}
+                statements.append(("INSERT INTO payment_receipts (uuid, type, serialized_data, version, created_at) VALUES (?, 'evm', ?, 0, ?)",
+                                   (receipt, json.dumps(data), now)))
+            if intent["status"] not in TERMINAL_STATUSES:
+                statements.append(("""INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, user_uuid, payment_receipt_uuid, created_at)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   (intent["transaction_uuid"], now, total_eth, RESULT_STATUS[intent["action"]],
+                                    _comment(intent), intent["requested_by"], receipt, now)))
+                for t in txs:
+                    if t["role"] == "referral":
+                        eth = float(Decimal(t["value"]) / Decimal(10 ** 18))
+                        statements.append(("""INSERT INTO referral_payments (transaction_uuid, user_uuid, referral_percent, referral_payment_eth,
+                                              referral_payment_usd, is_buyer_referral, created_at) VALUES (?, ?, ?, ?, ?, 1, ?)""",
+                                           (intent["transaction_uuid"], intent["inviter_uuid"], eth / total_eth if total_eth else 0,
+                                            eth, eth * usd if usd else 0, now)))
+            statements.append(("""UPDATE transaction_intents SET status = 'completed', processed_at = ?, last_error = NULL,
+                                  lease_until = NULL WHERE id = ?""", (now, intent["id"])))
+            writer.add(*statements)
+            completed += 1
+    _report("transaction_intents", deferred, "deferred (nothing sent, retried with backoff)")
+    _report("transaction_intents", failed, "broadcast failed (will re-send the same txs, or re-sign on a stale nonce)")
+    return completed
+
+
+def load_withdraw_intents(conn, intent_ids) -> list:
+    """Claimed deposit_withdraw_intents joined with their deposit, as dicts."""
+    if not intent_ids:
+        return []
+    cur = conn.cursor()
+    cur.execute(
+        f"""SELECT i.id, i.deposit_uuid, i.to_address, i.signed_txs, i.attempts, d.uuid, d.address, d.crypto, d.crypto_value
+            FROM deposit_withdraw_intents i
+            LEFT JOIN deposits d ON d.uuid = i.deposit_uuid
+            WHERE i.id IN ({", ".join("?" * len(intent_ids))})
+            ORDER BY i.id""",
+        list(intent_ids),
+    )
+    keys = ("id", "deposit_uuid", "to_address", "signed_txs", "attempts", "found", "address", "crypto", "crypto_value")
+    return [dict(zip(keys, row)) for row in cur.fetchall()]
+
+def run_process_withdraw_payouts(conn, registry, private_key, chunk_size=DEFAULT_WRITE_CHUNK,
+                                 batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                                 lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                                 nonces=None, gas_prices=None, signer=None) -> int:
+    """
+    Claim and send one batch of deposit_withdraw_intents: the deposit address balance minus gas goes to
+    to_address; then deposit_history (withdraw), crypto_value 0 and the intent completed, as the
+    bookkeeping-only tasks.run_process_withdraw_intents does. private_key(deposit_uuid) -> deposit key
+    bytes. An intent whose deposit is missing or empty, or whose to_address is invalid, fails at once.
+    Returns the number completed.
+    """
+    nonces, gas_prices, signer = _tx_sender_defaults(nonces, gas_prices, signer)
+    claimed = claim_intents(conn, worker_id(), batch_size, lease_seconds, "deposit_withdraw_intents")
+    if not claimed:
+        return 0
+    intents = load_withdraw_intents(conn, claimed)
+    tokens = _tokens_by_symbol(conn)
+    now = _now()
+    fail = "UPDATE deposit_withdraw_intents SET status = 'failed', last_error = ?, claimed_by = NULL, lease_until = NULL WHERE id = ?"
+    settle, payouts, errors, seen = [], [], {}, set()
+    for intent in intents:
+        token, chain_id = tokens.get(intent["crypto"], (None, None))
+        if intent["found"] is None or not intent["address"] or (float(intent["crypto_value"] or 0) <= 0 and not intent["signed_txs"]):
+            settle.append((fail, ("deposit missing or empty", intent["id"])))
+        elif not is_address(intent["to_address"] or ""):
+            settle.append((fail, ("invalid to_address", intent["id"])))
+        elif intent["deposit_uuid"] in seen:
+            settle.append((_release_lease("deposit_withdraw_intents"), (None, intent["id"])))
+        elif chain_id is None:
+            errors[intent["id"]] = PayoutError(f"{intent['crypto']} is not an accepted token")
+        elif token:
+            errors[intent["id"]] = PayoutError("ERC-20 deposit withdrawals are not supported (deposit address holds no gas)")
+        else:
+            seen.add(intent["deposit_uuid"])
+            payouts.append({"id": intent["id"], "chain_id": chain_id, "source": intent["address"],
+                            "signed_txs": intent["signed_txs"], "attempts": intent["attempts"],
+                            "plan": share_plan([("withdraw", to_checksum_address(intent["to_address"]), Decimal(1))]),
+                            "private_key": partial(private_key, intent["deposit_uuid"])})
+
+    signed, sendable, sent, deferred = _sign_and_send(
+        conn, "deposit_withdraw_intents", "withdraw_intents", payouts, errors, settle,
+        registry, nonces, gas_prices, signer, workers, chunk_size,
+        {intent["id"]: intent["attempts"] for intent in intents}, max_attempts,
+    )
+    by_id = {intent["id"]: intent for intent in intents}
+    recorded = known_hashes(conn, [tx["hash"] for p in sendable for tx in broadcast_txs(p, signed, sent)])
+    completed, failed = 0, {}
+    with ChunkedWriter(conn, "withdraw_intents", ordered=True) as writer:
+        for payout in sendable:
+            intent, error, txs = by_id[payout["id"]], sent.get(payout["id"]), signed[payout["id"]]
+            if error is not None:
+                failed[intent["id"]] = error
+                writer.add(*sent_rows("deposit_withdraw_intent", intent["id"], payout["chain_id"], intent["address"],
+                                      [t for t in payout["accepted"] if t["hash"] not in recorded], now),
+                           _send_failed("deposit_withdraw_intents", payout, error, max_attempts))
+                continue
+            amount = float(sum(Decimal(t["value"]) for t in txs) / Decimal(10 ** 18))
+            writer.add(
+                *sent_rows("deposit_withdraw_intent", intent["id"], payout["chain_id"], intent["address"],
+                           [t for t in txs if t["hash"] not in recorded], now),
+                ("""INSERT INTO deposit_history (uuid, deposit_uuid, action, value, created_at)
+                   VALUES (?, ?, 'withdraw', ?, ?)""", (uuid.uuid4().hex, intent["deposit_uuid"], -amount, now)),
+                ("UPDATE deposits SET crypto_value = 0, updated_at = ? WHERE uuid = ?", (now, intent["deposit_uuid"])),
+                ("""UPDATE deposit_withdraw_intents SET status = 'completed', processed_at = ?, last_error = NULL,
+                    lease_until = NULL WHERE id = ?""", (now, intent["id"])),
+            )
+            completed += 1
+    _report("withdraw_intents", deferred, "deferred (nothing sent, retried with backoff)")
+    _report("withdraw_intents", failed, "broadcast failed (will re-send the same txs, or re-sign on a stale nonce)")
+    return completed
+
+def _report(task: str, errors: dict, what: str) -> None:
+    if errors:
+        first_id, first = next(iter(errors.items()))
+        print(f"{task}: {len(errors)} intents {what}; first: intent {first_id}: {first}")
@@ -0,0 +1,153 @@
+"""
+USD price cache with TTL and stale-while-revalidate, persisted to the prices table (read by PHP).
+A quote younger than ttl is served as is; an older one (up to max_stale) is still served while one
+background refresh fetches every stale symbol in a single by-symbol request. Only positive prices are
+ever stored or returned: a failed or zero quote leaves the last good one in place, and a symbol with no
+usable quote is None, never 0.0.
+"""
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_STALE = 3600.0
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def valid_price(value):
+    """float(value) if it is a usable (finite, positive) price, else None."""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if 0 < price < float("inf") else None
+
+class PriceCache:
+    """
+    prices = PriceCache(client.get_usd_prices, conn, ttl=60)
+    usd = prices.get("ETH")   # float or None; never blocks while a stale quote exists
+
+    fetch(symbols) -> {symbol: price}; missing symbols keep their last quote. conn (optional) loads the
+    last quotes at start and receives new ones; DB writes happen on the caller's thread (get/warm/close),
+    never on the refresh thread.
+    """
+
+    def __init__(self, fetch, conn=None, ttl: float = DEFAULT_TTL, max_stale: float = DEFAULT_MAX_STALE,
+                 currency: str = "USD"):
+        self._fetch = fetch
+        self._conn = conn
+        self.ttl = max(0.0, float(ttl))
+        self.max_stale = max(self.ttl, float(max_stale))
+        self.currency = currency
+        # symbol -> (price, monotonic time fetched)
+        self._quotes = {}
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        if conn is not None:
+            self._load()
+
+    def _load(self) -> None:
+        cur = self._conn.cursor()
+        cur.execute("SELECT symbol, price, fetched_at FROM prices WHERE currency = ?", (self.currency,))
+        utcnow, now = datetime.utcnow(), time.monotonic()
+        for symbol, price, fetched_at in cur.fetchall():
+            price = valid_price(price)
+            if price is None:
+                continue
+            try:
+                age = (utcnow - datetime.strptime(fetched_at, "%Y-%m-%d %H:%M:%S")).total_seconds()
+            except (TypeError, ValueError):
+                continue
+            self._quotes[symbol] = (price, now - max(0.0, age))
+
+    def _age(self, symbol):
+        quote = self._quotes.get(symbol)
+        return None if quote is None else time.monotonic() - quote[1]
+
+    def _refresh(self, symbols) -> None:
+        try:
+            fetched = self._fetch(list(symbols)) or {}
+        except Exception as e:
+            self.errors += 1
+            print(f"price cache: refresh of {', '.join(symbols)} failed: {e}")
+            return
+        now = time.monotonic()
+        with self._lock:
+            for symbol, value in fetched.items():
+                price = valid_price(value)
+                if price is not None:
+                    self._quotes[symbol] = (price, now)
+                    self._dirty[symbol] = (price, _now())
+
+    def _refresh_in_background(self, symbols) -> None:
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self._refresh, args=(symbols,), daemon=True)
+            self._refreshing.start()
+
+    def warm(self, symbols) -> None:
+        """Fetch symbols with no usable quote now; refresh ones past ttl in the background. Persists new quotes."""
+        missing, stale = [], []
+        for symbol in dict.fromkeys(symbols):
+            age = self._age(symbol)
+            if age is None or age > self.max_stale:
+                missing.append(symbol)
+            elif age > self.ttl:
+                stale.append(symbol)
+        if missing:
+            self._refresh(missing + stale)
+        elif stale:
+            self._refresh_in_background(stale)
+        self.flush()
+
+    def get(self, symbol: str):
+        """Last good price for symbol (float), or None if none is known within max_stale."""
+        age = self._age(symbol)
+        if age is None or age > self.max_stale:
+            self.misses += 1
+            self._refresh([symbol])
+            age = self._age(symbol)
+            if age is None or age > self.max_stale:
+                return None
+        elif age > self.ttl:
+            self.stale_hits += 1
+            self._refresh_in_background([symbol])
+        else:
+            self.hits += 1
+        self.flush()
+        return self._quotes[symbol][0]
+
+    def flush(self) -> None:
+        """Write quotes fetched since the last flush to the prices table (commits)."""
+        if self._conn is None:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        cur = self._conn.cursor()
+        for symbol, (price, fetched_at) in dirty.items():
+            cur.execute(
+                "UPDATE prices SET price = ?, fetched_at = ? WHERE symbol = ? AND currency = ?",
+                (repr(price), fetched_at, symbol, self.currency),
+            )
+            if cur.rowcount == 0:
+                cur.execute(
+                    "INSERT INTO prices (symbol, currency, price, fetched_at) VALUES (?, ?, ?, ?)",
+                    (symbol, self.currency, repr(price), fetched_at),
+                )
+        self._conn.commit()
+
+    def close(self, timeout: float = 10) -> None:
+        """Let an in-flight background refresh finish (up to timeout seconds), then persist it."""
+        refreshing = self._refreshing
+        if refreshing is not None:
+            refreshing.join(timeout)
+        self.flush()
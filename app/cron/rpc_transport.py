@@ -0,0 +1,290 @@
+"""
+Resilient JSON-RPC transport, one per endpoint: request and compute-unit token buckets, jittered
+exponential backoff on 429/5xx/connection errors (honouring Retry-After), a circuit breaker that
+fails fast while the endpoint is down, and counters for calls/errors/throttles/retries/time.
+Sync (requests or an httpx HTTP/2 client) and async (aiohttp) callers share the same budget,
+breaker and stats.
+"""
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+# Alchemy compute units per method; unlisted methods count DEFAULT_COMPUTE_UNITS
+COMPUTE_UNITS = {
+    "eth_blockNumber": 10,
+    "eth_getBalance": 19,
+    "eth_getBlockByNumber": 16,
+    "eth_call": 26,
+    "eth_gasPrice": 19,
+    "eth_getTransactionCount": 26,
+    "eth_getTransactionByHash": 17,
+    "eth_getTransactionReceipt": 15,
+    "eth_estimateGas": 87,
+    "eth_sendRawTransaction": 250,
+}
+DEFAULT_COMPUTE_UNITS = 20
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 30.0
+
+class RpcError(RuntimeError):
+    """JSON-RPC error for one call (single request or one item of a batch)."""
+
+    def __init__(self, error):
+        if isinstance(error, dict):
+            self.code = error.get("code")
+            message = error.get("message", str(error))
+        else:
+            self.code = None
+            message = str(error)
+        super().__init__(message)
+
+class CircuitOpenError(RpcError):
+    """Endpoint skipped: its circuit breaker is open after repeated failures."""
+
+
+def compute_units(payload) -> int:
+    calls = payload if isinstance(payload, list) else [payload]
+    return sum(COMPUTE_UNITS.get(c.get("method"), DEFAULT_COMPUTE_UNITS) for c in calls)
+
+
+def _error_items(data) -> int:
+    """Calls answered with a JSON-RPC error in a decoded response (single object or batch array)."""
+    if isinstance(data, list):
+        return sum(1 for item in data if isinstance(item, dict) and "error" in item)
+    return int(isinstance(data, dict) and "error" in data)
+
+
+def _http_errors(http):
+    """(retryable, fatal) exception types for the sync HTTP client in use (requests or httpx)."""
+    if type(http).__module__.startswith("httpx"):
+        import httpx
+        return (httpx.TransportError,), (httpx.HTTPError, ValueError)
+    return (requests.ConnectionError, requests.Timeout), (requests.RequestException, ValueError)
+
+
+class RateLimiter:
+    """Token bucket: `rate` tokens per second, bursts up to `burst`. rate 0 = unlimited. Thread-safe."""
+
+    def __init__(self, rate: float = 0.0, burst: float = None):
+        self.rate = max(0.0, float(rate))
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns the seconds the caller must wait before sending."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= cost
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, cost: float = 1.0) -> None:
+        wait = self.reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed requests; while open, calls fail fast. After
+    `cooldown` seconds one trial request is let through (half-open): success closes it again.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = float(cooldown)
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.cooldown:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self) -> bool:
+        """Record a failure; True when this failure opened (or re-opened) the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self._trial = False
+                return True
+            return False
+
+
+class Transport:
+    """
+    POST JSON-RPC payloads to one URL. post() returns the decoded JSON body or raises RpcError
+    (HTTP/transport failure after retries, or CircuitOpenError). stats counts requests, JSON-RPC
+    calls (batch items), calls answered with an error, throttled (429) responses, retries, failed
+    requests, breaker opens, short-circuited calls and seconds spent in post (waits included).
+    """
+
+    def __init__(self, url: str, rate: float = 0.0, cu_rate: float = 0.0, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = 0.5, backoff_cap: float = 8.0, breaker: CircuitBreaker = None,
+                 timeout: float = 10, session=None):
+        # session: pooled requests.Session / httpx.Client shared by the caller; None = one-off requests.post
+        self.url = url
+        self.limiter = RateLimiter(rate)
+        self.cu_limiter = RateLimiter(cu_rate)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.session = session
+        self._retryable, self._fatal = _http_errors(session or requests)
+        self.stats = {"requests": 0, "calls": 0, "call_errors": 0, "compute_units": 0, "throttled": 0,
+                      "retries": 0, "failures": 0, "breaker_opens": 0, "short_circuited": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _admit(self, payload) -> int:
+        """Breaker check; returns the payload's compute units."""
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"circuit open for {self.url}")
+        cost = compute_units(payload)
+        self._count("requests")
+        self._count("calls", len(payload) if isinstance(payload, list) else 1)
+        return cost
+
+    def _reserve(self, cost: int) -> float:
+        """Budget for one attempt (first send or retry); returns seconds to wait before sending."""
+        self._count("compute_units", cost)
+        return max(self.limiter.reserve(), self.cu_limiter.reserve(cost))
+
+    def _delay(self, attempt: int, retry_after=None) -> float:
+        """Full-jitter exponential backoff; Retry-After (seconds) wins when the server sends it."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff * (2 ** attempt)))
+
+    def _fail(self, error: Exception) -> RpcError:
+        self._count("failures")
+        if self.breaker.failure():
+            self._count("breaker_opens")
+        return error if isinstance(error, RpcError) else RpcError(str(error) or type(error).__name__)
+
+    @staticmethod
+    def _throttled_body(data) -> bool:
+        # Some providers answer 200 with a top-level rate-limit error instead of HTTP 429
+        error = data.get("error") if isinstance(data, dict) else None
+        return isinstance(error, dict) and error.get("code") in (429, -32005)
+
+    def post(self, payload):
+        started = time.perf_counter()
+        try:
+            data = self._post(payload)
+        finally:
+            self._count("seconds", time.perf_counter() - started)
+        self._count("call_errors", _error_items(data))
+        return data
+
+    def _post(self, payload):
+        cost = self._admit(payload)
+        http = self.session or requests
+        attempt, delay = 0, 0.0
+        while True:
+            # Retries draw from the budgets too, so concurrent retries cannot outrun the rate limits
+            wait = max(delay, self._reserve(cost))
+            if wait > 0:
+                time.sleep(wait)
+            retry_after = None
+            try:
+                r = http.post(self.url, json=payload, timeout=self.timeout)
+                if r.status_code in RETRY_STATUSES:
+                    if r.status_code == 429:
+                        self._count("throttled")
+                    retry_after = r.headers.get("Retry-After")
+                    error = RpcError(f"HTTP {r.status_code}")
+                else:
+                    r.raise_for_status()
+                    data = r.json()
+                    if not self._throttled_body(data):
+                        self.breaker.success()
+                        return data
+                    self._count("throttled")
+                    error = RpcError(data["error"])
+            except self._retryable as e:
+                error = e
+            except self._fatal as e:
+                # 4xx other than 429, undecodable body: retrying will not help
+                raise self._fail(e)
+            if attempt >= self.max_retries:
+                raise self._fail(error)
+            self._count("retries")
+            delay = self._delay(attempt, retry_after)
+            attempt += 1
+
+    async def post_async(self, session, payload):
+        """post() over an aiohttp session; waits with asyncio.sleep so other requests keep flowing."""
+        started = time.perf_counter()
+        try:
+            data = await self._post_async(session, payload)
+        finally:
+            self._count("seconds", time.perf_counter() - started)
+        self._count("call_errors", _error_items(data))
+        return data
+
+    async def _post_async(self, session, payload):
+        import aiohttp
+        cost = self._admit(payload)
+        attempt, delay = 0, 0.0
+        while True:
+            wait = max(delay, self._reserve(cost))
+            if wait > 0:
+                await asyncio.sleep(wait)
+            retry_after = None
+            try:
+                async with session.post(self.url, json=payload) as r:
+                    if r.status in RETRY_STATUSES:
+                        if r.status == 429:
+                            self._count("throttled")
+                        retry_after = r.headers.get("Retry-After")
+                        error = RpcError(f"HTTP {r.status}")
+                    else:
+                        r.raise_for_status()
+                        data = await r.json(content_type=None)
+                        if not self._throttled_body(data):
+                            self.breaker.success()
+                            return data
+                        self._count("throttled")
+                        error = RpcError(data["error"])
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            except (aiohttp.ClientError, ValueError) as e:
+                raise self._fail(e)
+            if attempt >= self.max_retries:
+                raise self._fail(error)
+            self._count("retries")
+            delay = self._delay(attempt, retry_after)
+            attempt += 1
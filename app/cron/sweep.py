@@ -0,0 +1,208 @@
+"""
+Sweep scheduler for escrows of settled transactions (current status RELEASED or CANCELLED).
+Collects the commission a CRON_SWEEP release left on the escrow (escrow_sweeps.owed_wei) plus any late
+payment; a cancelled escrow goes to the buyer. Dust waits until the sweep is worth min_ratio times its gas.
+"""
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+
+from bulk import DEFAULT_WRITE_CHUNK, ChunkedWriter
+from current_status import refresh_current_statuses
+from payouts import (
+    DEFAULT_COMMISSION, DEFAULT_MAX_ATTEMPTS, DEFAULT_WORKERS, PayoutError, _address, _decimal, _store_tier,
+    _tx_sender_defaults, broadcast_txs, commission_wallets, prepare_payouts, send_payouts,
+)
+from rpc_transport import RpcError
+from tasks import _token_contracts
+from tx_sender import StaleNonceError, known_hashes, sent_rows
+
+DEFAULT_SWEEP_BATCH = 200
+# Value swept must be at least this many times the gas it burns
+DEFAULT_MIN_RATIO = 10.0
+DEFAULT_RECHECK_SECONDS = 86400
+# Idle escrows are rechecked after recheck_seconds * 2 ** min(checks, MAX_DOUBLINGS)
+MAX_DOUBLINGS = 6
+RETRY_SECONDS = 60
+
+_STATE = ("transaction_uuid", "chain_id", "escrow_address", "owed_wei", "status", "checks", "attempts", "last_error",
+          "signed_txs", "swept_wei", "checked_at", "next_check_at", "created_at")
+
+
+class NotWorthGas(PayoutError):
+    """Nothing on the escrow is worth the gas of moving it (yet)."""
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def _at(seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+def select_sweep_candidates(conn, batch_size: int = DEFAULT_SWEEP_BATCH) -> list:
+    """Due escrows of RELEASED / CANCELLED transactions with no open intent or unconfirmed payout tx, as dicts."""
+    cur = conn.cursor()
+    cur.execute(
+        """SELECT e.uuid, e.escrow_address, e.chain_id, e.currency, c.status, s.withdraw_address,
+                  s.is_gold, s.is_silver, s.is_bronze, t.refund_address, bu.refund_address_evm,
+                  w.owed_wei, w.status, w.checks, w.attempts, w.signed_txs, w.swept_wei, w.created_at
+           FROM evm_transactions e
+           JOIN current_transaction_statuses c ON c.transaction_uuid = e.uuid
+           JOIN transactions t ON t.uuid = e.uuid
+           LEFT JOIN stores s ON s.uuid = t.store_uuid
+           LEFT JOIN users bu ON bu.uuid = t.buyer_uuid
+           LEFT JOIN escrow_sweeps w ON w.transaction_uuid = e.uuid
+           WHERE c.status IN ('RELEASED', 'CANCELLED') AND e.escrow_address IS NOT NULL AND e.escrow_address != ''
+             AND (w.transaction_uuid IS NULL OR w.next_check_at <= ?)
+             AND NOT EXISTS (SELECT 1 FROM transaction_intents i
+                             WHERE i.transaction_uuid = e.uuid AND i.status IN ('pending', 'processing'))
+             AND NOT EXISTS (SELECT 1 FROM payout_txs p WHERE p.from_address = e.escrow_address
+                             AND p.status IN ('sent', 'superseded'))
+           ORDER BY w.next_check_at, e.uuid
+           LIMIT ?""",
+        (_now(), int(batch_size)),
+    )
+    keys = ("uuid", "escrow_address", "chain_id", "currency", "tx_status", "withdraw_address",
+            "is_gold", "is_silver", "is_bronze", "refund_address", "buyer_refund_address",
+            "owed_wei", "status", "checks", "attempts", "signed_txs", "swept_wei", "created_at")
+    return [dict(zip(keys, row)) for row in cur.fetchall()]
+
+def plan_sweep(row, wallet, commission: Decimal, min_ratio: float = DEFAULT_MIN_RATIO):
+    """
+    plan(balance, tx_cost) for prepare_payouts; raises NotWorthGas when the sweep would not pay for its gas.
+    A late payment too small for its own vendor transfer is left on the escrow for a later sweep.
+    """
+    def plan(balance, tx_cost):
+        if row["tx_status"] == "CANCELLED":
+            buyer = _address(row["refund_address"] or row["buyer_refund_address"], "buyer refund address")
+            transfers = [("buyer", buyer, balance - tx_cost)]
+        else:
+            owed = min(int(row["owed_wei"] or 0), max(0, balance - tx_cost))
+            late = balance - tx_cost - owed
+            vendor = row["withdraw_address"]
+            # A late payment gets its own vendor transfer only if that transfer is worth its gas too
+            if vendor and late - tx_cost >= min_ratio * tx_cost:
+                vendor_wei = int(Decimal(late - tx_cost) * (1 - commission))
+                transfers = [("commission", wallet, balance - 2 * tx_cost - vendor_wei),
+                             ("vendor", _address(vendor, "store withdraw_address"), vendor_wei)]
+            else:
+                # The vendor's share of it must not end up with the commission: it waits for more funds
+                transfers = [("commission", wallet, owed)]
+        value = sum(wei for _, _, wei in transfers)
+        if value <= 0 or value < min_ratio * tx_cost * len(transfers):
+            raise NotWorthGas(f"{max(balance, 0)} wei not worth {len(transfers)} x {tx_cost} wei gas")
+        return transfers, []
+    return plan
+
+def _state(row, now: str) -> dict:
+    """Current escrow_sweeps row for a candidate (defaults for an escrow seen for the first time)."""
+    return {"transaction_uuid": row["uuid"], "chain_id": int(row["chain_id"]), "escrow_address": row["escrow_address"],
+            "owed_wei": row["owed_wei"] or "0", "status": row["status"] or "new", "checks": int(row["checks"] or 0),
+            "attempts": int(row["attempts"] or 0), "last_error": None, "signed_txs": row["signed_txs"],
+            "swept_wei": row["swept_wei"] or "0", "checked_at": now, "next_check_at": now,
+            "created_at": row["created_at"] or now}
+
+def _state_rows(state) -> list:
+    # DELETE + INSERT: a portable upsert that also works inside ChunkedWriter's executemany batches
+    return [("DELETE FROM escrow_sweeps WHERE transaction_uuid = ?", (state["transaction_uuid"],)),
+            (f"INSERT INTO escrow_sweeps ({', '.join(_STATE)}) VALUES ({', '.join('?' * len(_STATE))})",
+             tuple(state[k] for k in _STATE))]
+
+def run_sweep_escrows(conn, registry, private_key, config_get, wallets=None, min_ratio: float = DEFAULT_MIN_RATIO,
+                      recheck_seconds: float = DEFAULT_RECHECK_SECONDS, batch_size: int = DEFAULT_SWEEP_BATCH,
+                      workers: int = DEFAULT_WORKERS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                      chunk_size=DEFAULT_WRITE_CHUNK, nonces=None, gas_prices=None, signer=None) -> dict:
+    """
+    Sweep one batch of due escrows; returns {outcome: count} (swept, idle, blocked, retry, failed, unsupported).
+    private_key(transaction_uuid) -> escrow key bytes; wallets: chain_id -> commission wallet;
+    nonces / gas_prices / signer as for payouts.run_process_transaction_intents.
+    """
+    wallets = commission_wallets() if wallets is None else wallets
+    nonces, gas_prices, signer = _tx_sender_defaults(nonces, gas_prices, signer)
+    refresh_current_statuses(conn)
+    rows = select_sweep_candidates(conn, batch_size)
+    if not rows:
+        return {}
+    contracts = _token_contracts(conn)
+    now = _now()
+    states = {row["uuid"]: _state(row, now) for row in rows}
+    outcomes, payouts = {}, []
+    for row in rows:
+        state = states[row["uuid"]]
+        if contracts.get((int(row["chain_id"]), row["currency"])):
+            state.update(status="unsupported", last_error="ERC-20 escrows hold no gas to sweep", next_check_at=None)
+            outcomes[row["uuid"]] = "unsupported"
+            continue
+        tier = _store_tier(row["is_gold"], row["is_silver"], row["is_bronze"])
+        commission = _decimal(config_get(f"{tier}_account_commission", DEFAULT_COMMISSION[tier]), DEFAULT_COMMISSION[tier])
+        try:
+            wallet = _address(wallets.get(int(row["chain_id"])), f"commission wallet for chain {row['chain_id']}")
+        except PayoutError as e:
+            state.update(status="blocked", last_error=str(e), next_check_at=_at(recheck_seconds))
+            outcomes[row["uuid"]] = "blocked"
+            continue
+        payouts.append({"id": row["uuid"], "chain_id": row["chain_id"], "source": row["escrow_address"],
+                        "signed_txs": row["signed_txs"], "attempts": state["attempts"],
+                        "plan": plan_sweep(row, wallet, commission, min_ratio),
+                        "private_key": partial(private_key, row["uuid"])})
+
+    signed = prepare_payouts(payouts, registry, nonces, gas_prices, signer, workers)
+    with ChunkedWriter(conn, "escrow_sweeps.sign", chunk_size) as writer:
+        for payout in payouts:
+            txs = signed[payout["id"]]
+            if isinstance(txs, list) and not payout["signed_txs"]:
+                state = dict(states[payout["id"]], status="sending", signed_txs=json.dumps(txs))
+                writer.add(*_state_rows(state))
+    sendable = [p for p in payouts if isinstance(signed[p["id"]], list)]
+    sent = send_payouts(sendable, signed, registry, nonces, workers)
+    recorded = known_hashes(conn, [tx["hash"] for p in sendable for tx in broadcast_txs(p, signed, sent)])
+
+    swept_wei, first_error = 0, None
+    with ChunkedWriter(conn, "escrow_sweeps", chunk_size) as writer:
+        for payout in payouts:
+            state, txs = states[payout["id"]], signed[payout["id"]]
+            if isinstance(txs, NotWorthGas):
+                interval = recheck_seconds * 2 ** min(state["checks"], MAX_DOUBLINGS)
+                state.update(status="idle", checks=state["checks"] + 1, next_check_at=_at(interval))
+                outcome = "idle"
+            elif isinstance(txs, RpcError):
+                # Chain read failed: try again next run
+                state.update(last_error=str(txs))
+                outcome, first_error = "retry", first_error or txs
+            elif isinstance(txs, Exception):
+                state.update(status="blocked", last_error=str(txs), next_check_at=_at(recheck_seconds))
+                outcome, first_error = "blocked", first_error or txs
+            elif sent.get(payout["id"]) is not None:
+                error = sent[payout["id"]]
+                attempts = state["attempts"] + 1
+                given_up = attempts >= max_attempts
+                # A stale nonce means the txs can never be mined: plan and sign again on the retry
+                state.update(status="failed" if given_up else "retry", attempts=attempts, last_error=str(error),
+                             signed_txs=None if isinstance(error, StaleNonceError) else json.dumps(txs),
+                             next_check_at=None if given_up else _at(min(recheck_seconds, RETRY_SECONDS * 2 ** attempts)))
+                # Txs the node took before one was refused are tracked; the escrow waits until they settle
+                accepted = [t for t in payout["accepted"] if t["hash"] not in recorded]
+                if accepted:
+                    writer.add(*sent_rows("escrow_sweep", payout["id"], payout["chain_id"], payout["source"], accepted, now))
+                outcome, first_error = "failed" if given_up else "retry", first_error or error
+            else:
+                value = sum(int(t["value"]) for t in txs)
+                swept_wei += value
+                state.update(status="swept", owed_wei="0", checks=0, attempts=0, signed_txs=None,
+                             swept_wei=str(int(state["swept_wei"]) + value), next_check_at=_at(recheck_seconds))
+                writer.add(*sent_rows("escrow_sweep", payout["id"], payout["chain_id"], payout["source"],
+                                      [t for t in txs if t["hash"] not in recorded], now))
+                outcome = "swept"
+            outcomes[payout["id"]] = outcome
+        for uuid in states:
+            writer.add(*_state_rows(states[uuid]))
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    if counts.get("swept") or first_error is not None:
+        print(f"escrow_sweeps: {counts.get('swept', 0)} swept ({swept_wei / 10 ** 18:.6f} ETH), "
+              f"{counts.get('idle', 0)} not worth the gas, {counts.get('retry', 0)} to retry, "
+              f"{counts.get('blocked', 0)} blocked, {counts.get('failed', 0)} failed"
+              + (f"; first error: {first_error}" if first_error is not None else ""))
+    return counts
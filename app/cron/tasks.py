@@ -2,9 +2,19 @@
 Cron tasks per 01 §9: update PENDING (poll balance -> COMPLETED), fail old PENDING,
 release old COMPLETED, freeze stuck, cancel not-dispatched, reconcile, deposit withdraw.
 Uses config for durations; Alchemy for balance/price.
+All writes go through bulk.ChunkedWriter: executemany chunks of chunk_size, one commit each.
+Each run_*/apply_* returns the number of rows it processed (metrics.py records it per task).
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import re
+import uuid
+
+from bulk import DEFAULT_WRITE_CHUNK, ChunkedWriter
+from current_status import refresh_current_statuses
+
+_INSERT_STATUS = """INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
+               VALUES (?, ?, ?, ?, ?, ?)"""
 
 def _parse_duration(s: str) -> timedelta:
     """Parse '24h', '336h', '720h' into timedelta."""
@@ -22,115 +32,245 @@ def _parse_duration(s: str) -> timedelta:
         return timedelta(days=n)
     return timedelta(hours=24)
 
-def run_fill_escrow(conn, mnemonic, escrow_derive):
-    """Fill escrow_address for evm_transactions where NULL; insert first PENDING status."""
+def _group_by_chain(rows):
+    """Group rows by their last column (chain_id) -> {chain_id: [rows]}, keeping order."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[-1], []).append(row)
+    return groups
+
+def _report_failed_reads(task: str, failed) -> None:
+    """One log line per task for balance reads that failed; their rows are retried next run."""
+    if failed:
+        errors = {}
+        for e in failed:
+            errors[str(e)] = errors.get(str(e), 0) + 1
+        summary = "; ".join(f"{n}x {msg}" for msg, n in sorted(errors.items(), key=lambda kv: -kv[1])[:3])
+        print(f"{task}: {len(failed)} balance reads failed, rows skipped until next run ({summary})")
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def run_fill_escrow(conn, derive_chunks, chunk_size=DEFAULT_WRITE_CHUNK):
+    """
+    Fill escrow_address for evm_transactions where NULL; insert first PENDING status.
+    derive_chunks(uuids) yields [(tx_uuid, address), ...] lists (HDDeriver / ParallelDeriver
+    .escrow_chunks). Address + status are written together per tx, committed every chunk_size,
+    so an interrupted backfill resumes from the rows that are still NULL.
+    """
     cur = conn.cursor()
     cur.execute(
         "SELECT uuid FROM evm_transactions WHERE escrow_address IS NULL OR escrow_address = ''"
     )
     rows = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for (tx_uuid,) in rows:
-        address = escrow_derive(mnemonic, tx_uuid)
-        cur.execute(
-            "UPDATE evm_transactions SET escrow_address = ?, updated_at = ? WHERE uuid = ?",
-            (address, now, tx_uuid),
-        )
-        cur.execute(
-            """INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
-               VALUES (?, ?, 0, 'PENDING', 'Escrow address created', ?)""",
-            (tx_uuid, now, now),
-        )
-    conn.commit()
-
-def run_update_pending(conn, get_balance_eth, tolerance=0.05):
+    with ChunkedWriter(conn, "fill_escrow", chunk_size) as writer:
+        for chunk in derive_chunks([tx_uuid for (tx_uuid,) in rows]):
+            now = _now()
+            for tx_uuid, address in chunk:
+                writer.add(
+                    ("UPDATE evm_transactions SET escrow_address = ?, updated_at = ? WHERE uuid = ?", (address, now, tx_uuid)),
+                    (_INSERT_STATUS, (tx_uuid, now, 0, "PENDING", "Escrow address created", now)),
+                )
+    return len(rows)
+
+def _chain_balances(get_balances_eth, get_token_balances, chain_id, rows) -> dict:
+    """{(chain_id, address, token): balance or Exception} for one chain's rows."""
+    native = [row[1] for row in rows if row[-2] is None]
+    pairs = [(row[-2], row[1]) for row in rows if row[-2] is not None]
+    out = {}
+    if native:
+        try:
+            result = get_balances_eth(native, chain_id)
+        except Exception as e:
+            # e.g. no endpoint for this chain: only its rows are skipped
+            result = {a: e for a in native}
+        out.update({(chain_id, a, None): v for a, v in result.items()})
+    if pairs and get_token_balances is not None:
+        try:
+            result = get_token_balances(pairs, chain_id)
+        except Exception as e:
+            result = {p: e for p in pairs}
+        out.update({(chain_id, holder, token): v for (token, holder), v in result.items()})
+    return out
+
+def fetch_balances_by_chain(rows, get_balances_eth, get_token_balances=None):
     """
-    For each PENDING tx with escrow_address, get balance; if current >= (1-tolerance)*required, insert COMPLETED.
+    Balances for rows whose column 1 is the address, second-to-last the ERC-20 contract (None = native)
+    and last the chain_id. Per chain: one batched get_balances_eth(addresses, chain_id) for native rows
+    and one get_token_balances([(token, holder)], chain_id) (Multicall3) for token rows; without
+    get_token_balances token rows are left out. Returns {(chain_id, address, token): amount or Exception}.
+    Chains are polled in parallel threads, so a slow chain does not delay the others.
     """
+    groups = list(_group_by_chain(rows).items())
+
+    def fetch(group):
+        return _chain_balances(get_balances_eth, get_token_balances, *group)
+
+    if len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            results = list(pool.map(fetch, groups))
+    else:
+        results = [fetch(g) for g in groups]
+    balances = {}
+    for result in results:
+        balances.update(result)
+    return balances
+
+def _token_contracts(conn) -> dict:
+    """(chain_id, symbol) -> ERC-20 contract address, or None for the native coin (first accepted_tokens row wins)."""
+    cur = conn.cursor()
+    cur.execute("SELECT chain_id, symbol, contract_address FROM accepted_tokens ORDER BY id")
+    contracts = {}
+    for chain_id, symbol, contract in cur.fetchall():
+        contracts.setdefault((int(chain_id), symbol), contract or None)
+    return contracts
+
+def select_pending_escrows(conn):
+    """
+    PENDING txs with an escrow address and a positive required amount:
+    (uuid, escrow_address, required, current, token, chain_id). token is the ERC-20 contract for
+    evm_transactions.currency (accepted_tokens on that chain), None for the native coin or an unknown symbol.
+    Reads the materialized current_transaction_statuses (refreshed first) instead of the full-history view,
+    with the view's inner joins on stores and users: a tx whose store or buyer is gone is left alone.
+    """
+    refresh_current_statuses(conn)
+    contracts = _token_contracts(conn)
     cur = conn.cursor()
     cur.execute("""
-        SELECT v.uuid, v.escrow_address, v.required_amount, v.current_amount, v.chain_id
-        FROM v_current_evm_transaction_statuses v
-        WHERE v.current_status = 'PENDING' AND v.escrow_address IS NOT NULL AND v.escrow_address != ''
+        SELECT c.transaction_uuid, e.escrow_address, e.amount, c.amount, e.currency, e.chain_id
+        FROM current_transaction_statuses c
+        JOIN transactions t ON t.uuid = c.transaction_uuid AND t.type = 'evm'
+        JOIN stores s ON s.uuid = t.store_uuid
+        JOIN users u ON u.uuid = t.buyer_uuid
+        JOIN evm_transactions e ON e.uuid = c.transaction_uuid
+        WHERE c.status = 'PENDING' AND e.escrow_address IS NOT NULL AND e.escrow_address != ''
     """)
-    rows = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for row in rows:
-        tx_uuid, escrow_address, required, current_amt, chain_id = row
-        if not required or float(required) <= 0:
-            continue
-        balance_eth = get_balance_eth(escrow_address, chain_id)
-        if balance_eth >= float(required) * (1 - tolerance):
-            cur.execute(
-                """INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
-                   VALUES (?, ?, ?, 'COMPLETED', 'Transaction funded', ?)""",
-                (tx_uuid, now, balance_eth, now),
-            )
-    conn.commit()
+    return [
+        (tx_uuid, address, required, current, contracts.get((int(chain_id), currency)), chain_id)
+        for tx_uuid, address, required, current, currency, chain_id in cur.fetchall()
+        if required and float(required) > 0
+    ]
 
-def run_fail_old_pending(conn, config_get):
-    """PENDING older than pending_duration -> insert FAILED."""
+def apply_pending_balances(conn, rows, balances, tolerance=0.05, chunk_size=DEFAULT_WRITE_CHUNK):
+    """Insert COMPLETED for rows whose balance >= (1-tolerance)*required. Missing/errored balances are skipped (errors logged)."""
+    now = _now()
+    failed = []
+    with ChunkedWriter(conn, "update_pending", chunk_size) as writer:
+        for tx_uuid, escrow_address, required, current_amt, token, chain_id in rows:
+            balance = balances.get((chain_id, escrow_address, token))
+            if isinstance(balance, Exception):
+                failed.append(balance)
+                continue
+            if balance is None:
+                continue
+            if balance >= float(required) * (1 - tolerance):
+                writer.add((_INSERT_STATUS, (tx_uuid, now, balance, "COMPLETED", "Transaction funded", now)))
+    _report_failed_reads("update_pending", failed)
+    return len(rows)
+
+def run_update_pending(conn, get_balances_eth, tolerance=0.05, chunk_size=DEFAULT_WRITE_CHUNK, get_token_balances=None):
+    """
+    For each PENDING tx with escrow_address, get balance; if current >= (1-tolerance)*required, insert COMPLETED.
+    Balances are fetched in one batched call per chain: get_balances_eth(addresses, chain_id) -> {address: eth or Exception};
+    token escrows via get_token_balances([(token, holder)], chain_id) -> {(token, holder): units or Exception}.
+    """
+    rows = select_pending_escrows(conn)
+    balances = fetch_balances_by_chain(rows, get_balances_eth, get_token_balances)
+    return apply_pending_balances(conn, rows, balances, tolerance, chunk_size)
+
+def run_fail_old_pending(conn, config_get, chunk_size=DEFAULT_WRITE_CHUNK):
+    """PENDING older than pending_duration -> insert FAILED (joined like select_pending_escrows)."""
     duration = _parse_duration(config_get("pending_duration", "24h"))
     cutoff = (datetime.utcnow() - duration).strftime("%Y-%m-%d %H:%M:%S")
+    refresh_current_statuses(conn)
     cur = conn.cursor()
     cur.execute("""
-        SELECT v.uuid FROM v_current_evm_transaction_statuses v
-        WHERE v.current_status = 'PENDING' AND v.created_at < ?
+        SELECT c.transaction_uuid FROM current_transaction_statuses c
+        JOIN transactions t ON t.uuid = c.transaction_uuid AND t.type = 'evm'
+        JOIN stores s ON s.uuid = t.store_uuid
+        JOIN users u ON u.uuid = t.buyer_uuid
+        JOIN evm_transactions e ON e.uuid = c.transaction_uuid
+        WHERE c.status = 'PENDING' AND c.created_at < ?
     """, (cutoff,))
     rows = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for (tx_uuid,) in rows:
-        cur.execute(
-            """INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
-               VALUES (?, ?, 0, 'FAILED', 'Pending timeout', ?)""",
-            (tx_uuid, now, now),
-        )
-    conn.commit()
-
-
-def run_fill_deposit_address(conn, mnemonic, derive_deposit_address):
-    """Fill deposits.address for rows where address IS NULL. v2.5 Vendor CMS."""
+    now = _now()
+    with ChunkedWriter(conn, "fail_old_pending", chunk_size) as writer:
+        for (tx_uuid,) in rows:
+            writer.add((_INSERT_STATUS, (tx_uuid, now, 0, "FAILED", "Pending timeout", now)))
+    return len(rows)
+
+
+def run_fill_deposit_address(conn, derive_chunks, chunk_size=DEFAULT_WRITE_CHUNK):
+    """
+    Fill deposits.address for rows where address IS NULL. v2.5 Vendor CMS.
+    derive_chunks(uuids) yields [(deposit_uuid, address), ...] lists (.deposit_chunks).
+    """
     cur = conn.cursor()
     cur.execute("SELECT uuid FROM deposits WHERE (address IS NULL OR address = '') AND deleted_at IS NULL")
     rows = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for (deposit_uuid,) in rows:
-        address = derive_deposit_address(mnemonic, deposit_uuid)
-        cur.execute(
-            "UPDATE deposits SET address = ?, updated_at = ? WHERE uuid = ?",
-            (address, now, deposit_uuid),
-        )
-    conn.commit()
-
-
-def run_update_deposit_balances(conn, get_balance_eth):
-    """Update deposits.crypto_value from chain balance for deposits that have an address. v2.5."""
+    with ChunkedWriter(conn, "fill_deposit_address", chunk_size) as writer:
+        for chunk in derive_chunks([deposit_uuid for (deposit_uuid,) in rows]):
+            now = _now()
+            for deposit_uuid, address in chunk:
+                writer.add(("UPDATE deposits SET address = ?, updated_at = ? WHERE uuid = ?", (address, now, deposit_uuid)))
+    return len(rows)
+
+
+def _tokens_by_symbol(conn) -> dict:
+    """symbol -> (ERC-20 contract or None for the native coin, chain_id); first accepted_tokens row wins."""
+    cur = conn.cursor()
+    cur.execute("SELECT symbol, chain_id, contract_address FROM accepted_tokens ORDER BY id")
+    token_by_symbol = {}
+    for symbol, chain_id, contract in cur.fetchall():
+        token_by_symbol.setdefault(symbol, (contract or None, chain_id))
+    return token_by_symbol
+
+def select_deposit_addresses(conn):
+    """Deposits with an address and an accepted token: (uuid, address, token, chain_id); token None = native."""
+    token_by_symbol = _tokens_by_symbol(conn)
     cur = conn.cursor()
     cur.execute("""
         SELECT d.uuid, d.address, d.crypto
         FROM deposits d
         WHERE d.address IS NOT NULL AND d.address != '' AND d.deleted_at IS NULL
     """)
-    deposits = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for deposit_uuid, address, crypto in deposits:
-        cur.execute("SELECT chain_id FROM accepted_tokens WHERE symbol = ? LIMIT 1", (crypto,))
-        row = cur.fetchone()
-        if not row:
-            continue
-        chain_id = row[0]
-        try:
-            balance = get_balance_eth(address, chain_id)
-        except Exception:
-            continue
-        cur.execute(
-            "UPDATE deposits SET crypto_value = ?, updated_at = ? WHERE uuid = ?",
-            (balance, now, deposit_uuid),
-        )
-    conn.commit()
+    return [(u, a, *token_by_symbol[c]) for u, a, c in cur.fetchall() if c in token_by_symbol]
+
+def apply_deposit_balances(conn, rows, balances, chunk_size=DEFAULT_WRITE_CHUNK):
+    """Set deposits.crypto_value from balances; missing/errored balances are skipped (errors logged)."""
+    now = _now()
+    failed = []
+    with ChunkedWriter(conn, "update_deposit_balances", chunk_size) as writer:
+        for deposit_uuid, address, token, chain_id in rows:
+            balance = balances.get((chain_id, address, token))
+            if isinstance(balance, Exception):
+                failed.append(balance)
+                continue
+            if balance is None:
+                continue
+            writer.add(("UPDATE deposits SET crypto_value = ?, updated_at = ? WHERE uuid = ?", (balance, now, deposit_uuid)))
+    _report_failed_reads("update_deposit_balances", failed)
+    return len(rows)
 
+def run_update_deposit_balances(conn, get_balances_eth, chunk_size=DEFAULT_WRITE_CHUNK, get_token_balances=None):
+    """Update deposits.crypto_value from chain balance (native or ERC-20) for deposits that have an address. v2.5."""
+    rows = select_deposit_addresses(conn)
+    return apply_deposit_balances(conn, rows, fetch_balances_by_chain(rows, get_balances_eth, get_token_balances), chunk_size)
 
-def run_process_withdraw_intents(conn):
+
+def run_refresh_prices(conn, prices, symbols=("ETH",)):
+    """
+    Keep USD quotes for symbols plus every accepted_tokens symbol fresh in the prices table.
+    prices: price_cache.PriceCache; stale quotes are refreshed in the background, missing ones now.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT symbol FROM accepted_tokens")
+    symbols = list(dict.fromkeys(list(symbols) + [row[0] for row in cur.fetchall()]))
+    prices.warm(symbols)
+    return len(symbols)
+
+
+def run_process_withdraw_intents(conn, chunk_size=DEFAULT_WRITE_CHUNK):
     """
     Process deposit_withdraw_intents with status 'pending'.
     Stub: mark as completed and insert deposit_history (withdrawal). Real implementation
@@ -138,31 +278,29 @@ def run_process_withdraw_intents(conn):
     """
     cur = conn.cursor()
     cur.execute("""
-        SELECT id, deposit_uuid, to_address, requested_at, requested_by_user_uuid
-        FROM deposit_withdraw_intents
-        WHERE status = 'pending'
+        SELECT i.id, i.deposit_uuid, i.to_address, i.requested_at, i.requested_by_user_uuid, d.uuid, d.crypto_value
+        FROM deposit_withdraw_intents i
+        LEFT JOIN deposits d ON d.uuid = i.deposit_uuid
+        WHERE i.status = 'pending'
+        ORDER BY i.id
     """)
     rows = cur.fetchall()
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for row in rows:
-        intent_id, deposit_uuid, to_address, requested_at, requested_by = row
-        cur.execute("SELECT crypto_value FROM deposits WHERE uuid = ?", (deposit_uuid,))
-        dep = cur.fetchone()
-        if not dep:
-            cur.execute("UPDATE deposit_withdraw_intents SET status = 'failed' WHERE id = ?", (intent_id,))
-            continue
-        amount = float(dep[0] or 0)
-        if amount <= 0:
-            cur.execute("UPDATE deposit_withdraw_intents SET status = 'failed' WHERE id = ?", (intent_id,))
-            continue
-        # Stub: record withdrawal in history and mark intent completed. Real impl would send tx.
-        import uuid
-        history_uuid = uuid.uuid4().hex
-        cur.execute(
-            """INSERT INTO deposit_history (uuid, deposit_uuid, action, value, created_at)
-               VALUES (?, ?, 'withdraw', ?, ?)""",
-            (history_uuid, deposit_uuid, -amount, now),
-        )
-        cur.execute("UPDATE deposits SET crypto_value = 0, updated_at = ? WHERE uuid = ?", (now, deposit_uuid))
-        cur.execute("UPDATE deposit_withdraw_intents SET status = 'completed' WHERE id = ?", (intent_id,))
-    conn.commit()
+    now = _now()
+    fail = "UPDATE deposit_withdraw_intents SET status = 'failed' WHERE id = ?"
+    withdrawn = set()
+    with ChunkedWriter(conn, "withdraw_intents", chunk_size) as writer:
+        for intent_id, deposit_uuid, to_address, requested_at, requested_by, found, crypto_value in rows:
+            amount = float(crypto_value or 0)
+            # A second intent on the same deposit sees the balance already zeroed by the first
+            if found is None or amount <= 0 or deposit_uuid in withdrawn:
+                writer.add((fail, (intent_id,)))
+                continue
+            withdrawn.add(deposit_uuid)
+            # Stub: record withdrawal in history and mark intent completed. Real impl would send tx.
+            writer.add(
+                ("""INSERT INTO deposit_history (uuid, deposit_uuid, action, value, created_at)
+                   VALUES (?, ?, 'withdraw', ?, ?)""", (uuid.uuid4().hex, deposit_uuid, -amount, now)),
+                ("UPDATE deposits SET crypto_value = 0, updated_at = ? WHERE uuid = ?", (now, deposit_uuid)),
+                ("UPDATE deposit_withdraw_intents SET status = 'completed' WHERE id = ?", (intent_id,)),
+            )
+    return len(rows)
@@ -0,0 +1,6 @@
+"""Cron tests import the cron modules flat, as cron.py does, plus the stub chain from bench/."""
+import os
+import sys
+
+CRON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [CRON_DIR, os.path.join(CRON_DIR, "bench")]
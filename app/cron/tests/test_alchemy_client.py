@@ -0,0 +1,103 @@
+"""
+alchemy_client: chain routing, and the batched read helpers against a stub transport (ids answered
+out of order, per-item errors, failed batches) and the stub chain (Multicall3 token balances).
+
+Run from app folder: python -m pytest cron/tests
+"""
+import pytest
+
+from alchemy_client import AlchemyClient, ChainEndpoint, ChainRegistry
+from rpc_transport import RpcError
+from stub_rpc import StubChain, start
+
+
+def test_registry_fails_closed_on_unknown_chain():
+    mainnet = ChainEndpoint(1, "http://127.0.0.1:1/")
+    default = ChainEndpoint(None, "http://127.0.0.1:2/")
+    registry = ChainRegistry([mainnet], default)
+    assert registry.get(1) is mainnet and registry.get("1") is mainnet
+    assert registry.get(None) is default
+    # An unknown chain is never served by the default network
+    with pytest.raises(RpcError, match="no RPC endpoint configured for chain 10"):
+        registry.get(10)
+
+def test_from_env_routes_only_configured_chains():
+    client = AlchemyClient("", environ={"ALCHEMY_RPC_URL": "http://127.0.0.1:1/", "CHAIN_31337_RPC_URL": "http://127.0.0.1:3/"})
+    assert {e.chain_id for e in client.registry} == {1, 11155111, 8453, 84532, 31337}
+    assert client.registry.get(31337).url == "http://127.0.0.1:3/"
+    with pytest.raises(RpcError):
+        client.registry.get(137)
+    client.close()
+
+
+class StubTransport:
+    """Transport stand-in: answers each posted batch with respond(payload) and records the payloads."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.posted = []
+        self.stats = {"requests": 0, "short_circuited": 0}
+
+    def post(self, payload):
+        self.posted.append(payload)
+        return self.respond(payload)
+
+
+def _balance(item):
+    return {"jsonrpc": "2.0", "id": item["id"], "result": hex(int(item["params"][0][2:4], 16) * 10 ** 18)}
+
+def _endpoint(respond, batch_size=100):
+    return ChainEndpoint(1, "http://stub/", batch_size, transport=StubTransport(respond))
+
+ADDRESSES = ["0x" + f"{i:02x}" * 20 for i in range(1, 6)]
+
+
+def test_batch_answers_out_of_id_order_map_to_their_addresses():
+    endpoint = _endpoint(lambda payload: [_balance(item) for item in reversed(payload)])
+    assert endpoint.get_balances_wei(ADDRESSES) == {a: int(a[2:4], 16) * 10 ** 18 for a in ADDRESSES}
+
+def test_per_item_errors_stay_with_their_address():
+    def respond(payload):
+        out = [_balance(item) for item in payload]
+        out[1] = {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "header not found"}}
+        out[2]["result"] = "0xnope"
+        del out[3]
+        return out
+
+    balances = _endpoint(respond).get_balances_wei(ADDRESSES)
+    assert isinstance(balances[ADDRESSES[1]], RpcError) and "header not found" in str(balances[ADDRESSES[1]])
+    assert "bad result" in str(balances[ADDRESSES[2]])
+    assert "missing batch response" in str(balances[ADDRESSES[3]])
+    assert balances[ADDRESSES[0]] == 10 ** 18 and balances[ADDRESSES[4]] == 5 * 10 ** 18
+
+def test_failed_batch_only_fails_its_own_addresses():
+    def respond(payload):
+        if payload[0]["params"][0] == ADDRESSES[2]:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}}
+        if payload[0]["params"][0] == ADDRESSES[4]:
+            raise RpcError("HTTP 503")
+        return [_balance(item) for item in payload]
+
+    endpoint = _endpoint(respond, batch_size=2)
+    balances = endpoint.get_balances_wei(ADDRESSES + ADDRESSES[:1])
+    # Duplicates are read once; batches of batch_size, ids restarting at 0 in each
+    assert [[item["id"] for item in p] for p in endpoint.transport.posted] == [[0, 1], [0, 1], [0]]
+    assert [a for a, v in balances.items() if isinstance(v, RpcError)] == ADDRESSES[2:]
+    assert "batch too large" in str(balances[ADDRESSES[3]]) and "HTTP 503" in str(balances[ADDRESSES[4]])
+    assert balances[ADDRESSES[0]] == 10 ** 18 and balances[ADDRESSES[1]] == 2 * 10 ** 18
+
+def test_token_balances_fail_per_token():
+    chain = StubChain()
+    usdc, broken, holder = "0x" + "aa" * 20, "0x" + "bb" * 20, ADDRESSES[0]
+    chain.tokens[usdc] = 6
+    chain.token_balances[(usdc, holder)] = 2_500_000
+    server, url = start(chain)
+    try:
+        endpoint = ChainEndpoint(1, url, multicall_size=1)
+        balances = endpoint.get_token_balances([(usdc, holder), (broken, holder), (usdc, ADDRESSES[1])])
+    finally:
+        server.shutdown()
+    assert balances[(usdc, holder)] == 2.5 and balances[(usdc, ADDRESSES[1])] == 0.0
+    # A token whose decimals() reverts fails only its own rows
+    assert isinstance(balances[(broken, holder)], RpcError)
+    assert endpoint.decimals == {usdc: 6}
@@ -0,0 +1,82 @@
+"""
+balance_cache.BalanceCache: entries are reused while fresh or read at the chain head, and fetched
+again once the head moves past them.
+
+Run from app folder: python -m pytest cron/tests
+"""
+import sqlite3
+
+import pytest
+
+from app_schema import apply_schema
+from balance_cache import BalanceCache
+from db import Connection
+
+CHAIN = 1
+A = "0x" + "11" * 20
+B = "0x" + "22" * 20
+
+
+class Fetcher:
+    """fetch_wei stand-in: serves `balances` and records the addresses asked for."""
+
+    def __init__(self, balances):
+        self.balances = balances
+        self.calls = []
+
+    def __call__(self, addresses, chain_id):
+        self.calls.append(list(addresses))
+        return {a: self.balances[a] for a in addresses}
+
+
+@pytest.fixture
+def conn():
+    conn = Connection(sqlite3.connect(":memory:", check_same_thread=False), "sqlite")
+    apply_schema(conn)
+    return conn
+
+
+def test_entry_read_at_head_is_reused(conn):
+    cache, fetch = BalanceCache(conn), Fetcher({A: 5, B: 7})
+    assert cache.get_balances_wei([A, B], CHAIN, fetch, lambda c: 100) == {A: 5, B: 7}
+    fetch.balances = {A: 6, B: 8}
+    assert cache.get_balances_wei([A, B], CHAIN, fetch, lambda c: 100) == {A: 5, B: 7}
+    assert fetch.calls == [[A, B]]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_new_block_invalidates_the_entry(conn):
+    cache, fetch = BalanceCache(conn), Fetcher({A: 5})
+    cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100)
+    fetch.balances = {A: 6}
+    assert cache.get_balances_wei([A], CHAIN, fetch, lambda c: 101) == {A: 6}
+    # The refreshed entry is at the new head
+    assert cache.get_balances_wei([A], CHAIN, fetch, lambda c: 101) == {A: 6}
+    assert fetch.calls == [[A], [A]]
+
+def test_fresh_entry_is_reused_past_the_head(conn):
+    cache, fetch = BalanceCache(conn, max_age=60), Fetcher({A: 5})
+    cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100)
+    assert cache.get_balances_wei([A], CHAIN, fetch, lambda c: 105) == {A: 5}
+    assert fetch.calls == [[A]]
+
+def test_failing_head_lookup_only_disables_the_head_check(conn):
+    def broken_head(chain_id):
+        raise RuntimeError("rpc down")
+
+    cache, fetch = BalanceCache(conn), Fetcher({A: 5})
+    cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100)
+    assert cache.get_balances_wei([A], CHAIN, fetch, broken_head) == {A: 5}
+    assert fetch.calls == [[A], [A]]
+
+def test_errors_are_not_cached(conn):
+    cache, fetch = BalanceCache(conn), Fetcher({A: RuntimeError("timeout")})
+    assert isinstance(cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100)[A], RuntimeError)
+    fetch.balances = {A: 5}
+    assert cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100) == {A: 5}
+    assert fetch.calls == [[A], [A]]
+
+def test_entries_are_per_chain(conn):
+    cache, fetch = BalanceCache(conn), Fetcher({A: 5})
+    cache.get_balances_wei([A], CHAIN, fetch, lambda c: 100)
+    cache.get_balances_wei([A], 10, fetch, lambda c: 100)
+    assert fetch.calls == [[A], [A]]
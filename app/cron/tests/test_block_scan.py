@@ -0,0 +1,144 @@
+"""
+block_scan: deposit detection from scanned blocks against a stub transport (value transfers to
+watched addresses, gaps in the chain, checkpointing only after every touched balance was read).
+
+Run from app folder: python -m pytest cron/tests
+"""
+import sqlite3
+
+import pytest
+
+from alchemy_client import ChainEndpoint, ChainRegistry
+from app_schema import apply_schema
+from block_scan import CHECKPOINT, run_block_scan, scan_blocks
+from cron_state import get_state, set_state
+from db import Connection
+from rpc_transport import RpcError
+
+WATCHED = "0x" + "aa" * 20
+OTHER = "0x" + "bb" * 20
+IDLE = "0x" + "cc" * 20
+
+
+class StubTransport:
+    """Transport stand-in serving eth_blockNumber and eth_getBlockByNumber from `blocks` ({number: [(to, wei)]})."""
+
+    def __init__(self, head, blocks):
+        self.head = head
+        self.blocks = blocks
+        self.posted = []
+        self.stats = {"requests": 0, "short_circuited": 0}
+
+    def post(self, payload):
+        self.posted.append(payload)
+        if isinstance(payload, dict):
+            return {"jsonrpc": "2.0", "id": payload["id"], "result": hex(self.head)}
+        return [{"jsonrpc": "2.0", "id": item["id"], "result": self._block(int(item["params"][0], 16))} for item in payload]
+
+    def _block(self, number):
+        if number not in self.blocks:
+            return None
+        return {"number": hex(number), "transactions": [{"to": to, "value": hex(wei)} for to, wei in self.blocks[number]]}
+
+    def scanned(self):
+        return [int(item["params"][0], 16) for payload in self.posted if isinstance(payload, list) for item in payload]
+
+
+def _endpoint(transport):
+    return ChainEndpoint(1, "http://stub/", 100, transport=transport)
+
+
+def test_only_value_transfers_to_watched_addresses_are_touched():
+    transport = StubTransport(12, {
+        10: [("0x" + "AA" * 20, 5), (OTHER, 0)],
+        11: [(None, 7), (IDLE, 3)],
+        12: [],
+    })
+    assert scan_blocks(_endpoint(transport), 10, 12, {WATCHED, OTHER}) == {WATCHED}
+
+def test_blocks_are_fetched_in_batches():
+    transport = StubTransport(14, {n: [] for n in range(10, 15)})
+    scan_blocks(_endpoint(transport), 10, 14, {WATCHED}, batch_size=2)
+    assert [len(p) for p in transport.posted] == [2, 2, 1]
+
+def test_missing_block_raises():
+    transport = StubTransport(12, {10: [], 12: [(WATCHED, 5)]})
+    with pytest.raises(RpcError, match="block 11 not available"):
+        scan_blocks(_endpoint(transport), 10, 12, {WATCHED})
+
+
+@pytest.fixture
+def conn():
+    conn = Connection(sqlite3.connect(":memory:", check_same_thread=False), "sqlite")
+    apply_schema(conn)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO accepted_tokens (chain_id, symbol, contract_address, created_at) VALUES (1, 'ETH', NULL, '2024-01-01')")
+    cur.executemany(
+        """INSERT INTO deposits (uuid, store_uuid, currency, crypto, address, crypto_value, fiat_value,
+           currency_rate, created_at) VALUES (?, 's', 'USD', 'ETH', ?, 0, 0, 1, '2024-01-01')""",
+        [("d-watched", WATCHED), ("d-idle", IDLE)],
+    )
+    conn.commit()
+    return conn
+
+
+class Balances:
+    """get_balances_eth stand-in: records the addresses read; addresses in `failing` return an error."""
+
+    def __init__(self):
+        self.reads = []
+        self.failing = set()
+
+    def __call__(self, addresses, chain_id):
+        self.reads.append(sorted(addresses))
+        return {a: RpcError("timeout") if a in self.failing else 1.5 for a in addresses}
+
+
+def _crypto_values(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT uuid, crypto_value FROM deposits ORDER BY uuid")
+    return {u: float(v) for u, v in cur.fetchall()}
+
+def _scan(conn, transport, balances, **options):
+    registry = ChainRegistry([_endpoint(transport)])
+    return run_block_scan(conn, registry, balances, full_poll_seconds=0, **options)
+
+
+def test_first_run_reads_everything_and_starts_at_the_head(conn):
+    transport, balances = StubTransport(100, {}), Balances()
+    assert _scan(conn, transport, balances) == {1: (100, 100, 2)}
+    assert balances.reads == [sorted([WATCHED, IDLE])]
+    assert transport.scanned() == []
+    assert int(get_state(conn, CHECKPOINT.format(1))) == 100
+
+def test_only_touched_deposits_are_read(conn):
+    set_state(conn, CHECKPOINT.format(1), 100)
+    transport, balances = StubTransport(103, {101: [], 102: [(WATCHED, 10 ** 18)], 103: [(OTHER, 1)]}), Balances()
+    assert _scan(conn, transport, balances) == {1: (101, 103, 1)}
+    assert transport.scanned() == [101, 102, 103]
+    assert balances.reads == [[WATCHED]]
+    assert _crypto_values(conn) == {"d-idle": 0.0, "d-watched": 1.5}
+    assert int(get_state(conn, CHECKPOINT.format(1))) == 103
+
+def test_confirmations_and_max_blocks_bound_the_range(conn):
+    set_state(conn, CHECKPOINT.format(1), 100)
+    transport = StubTransport(120, {n: [] for n in range(101, 121)})
+    assert _scan(conn, transport, Balances(), confirmations=5, max_blocks=10) == {1: (101, 110, 0)}
+    assert _scan(conn, transport, Balances(), confirmations=5, max_blocks=10) == {1: (111, 115, 0)}
+
+def test_failed_read_rescans_the_range(conn):
+    set_state(conn, CHECKPOINT.format(1), 100)
+    transport, balances = StubTransport(102, {101: [(WATCHED, 5)], 102: []}), Balances()
+    balances.failing.add(WATCHED)
+    assert _scan(conn, transport, balances) == {}
+    assert int(get_state(conn, CHECKPOINT.format(1))) == 100
+    balances.failing.clear()
+    assert _scan(conn, transport, balances) == {1: (101, 102, 1)}
+    assert transport.scanned() == [101, 102, 101, 102]
+
+def test_gap_in_the_chain_keeps_the_checkpoint(conn):
+    set_state(conn, CHECKPOINT.format(1), 100)
+    transport, balances = StubTransport(102, {102: [(WATCHED, 5)]}), Balances()
+    assert _scan(conn, transport, balances) == {}
+    assert balances.reads == []
+    assert int(get_state(conn, CHECKPOINT.format(1))) == 100
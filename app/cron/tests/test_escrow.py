@@ -0,0 +1,16 @@
+"""
+escrow: ParallelDeriver on its spawned worker pool derives the same addresses as HDDeriver.
+
+Run from app folder: python -m pytest cron/tests
+"""
+from escrow import ESCROW_BRANCH, HDDeriver, ParallelDeriver
+
+MNEMONIC = "test test test test test test test test test test test junk"
+
+
+def test_parallel_deriver_matches_hd_deriver():
+    uuids = [f"t{i}" for i in range(7)]
+    chunks = list(ParallelDeriver(MNEMONIC, workers=2, chunk_size=3).address_chunks(ESCROW_BRANCH, uuids))
+    assert sorted(len(chunk) for chunk in chunks) == [1, 3, 3]
+    local = HDDeriver(MNEMONIC)
+    assert dict(pair for chunk in chunks for pair in chunk) == {u: local.address(ESCROW_BRANCH, u) for u in uuids}
@@ -0,0 +1,285 @@
+"""
+Payout pipeline against the stub JSON-RPC chain: claim -> sign -> send -> track, with the failure
+paths of tx_sender (stale nonce, replaced or reverted tx, crash between signing and bookkeeping).
+
+Run from app folder: python -m pytest cron/tests
+"""
+import sqlite3
+
+import pytest
+
+import payouts
+from alchemy_client import AlchemyClient
+from app_schema import apply_schema
+from db import Connection
+from escrow import ESCROW_BRANCH, HDDeriver
+from payouts import claim_intents, run_process_transaction_intents
+from stub_rpc import StubChain, start
+from tx_sender import TRANSFER_GAS, NonceManager, run_track_payout_txs, signed_fees
+
+MNEMONIC = "test test test test test test test test test test test junk"
+VENDOR = "0x" + "22" * 20
+WALLET = "0x" + "33" * 20
+FUNDED = 10 ** 18
+
+
+class RevertingChain(StubChain):
+    """Mines every tx, but the receipts of hashes in `reverted` have status 0x0; refuses txs to `refused`."""
+
+    def __init__(self):
+        super().__init__()
+        self.reverted = set()
+        self.refused = set()
+
+    def send_raw(self, raw_hex):
+        to = self._decode(bytes.fromhex(raw_hex[2:]))[4]
+        if "0x" + to.hex() in self.refused:
+            raise ValueError("tx refused")
+        return super().send_raw(raw_hex)
+
+    def call(self, method, params):
+        result = super().call(method, params)
+        if method == "eth_getTransactionReceipt" and result and params[0] in self.reverted:
+            result = dict(result, status="0x0")
+        return result
+
+
+@pytest.fixture
+def chain():
+    return RevertingChain()
+
+@pytest.fixture
+def env(chain):
+    server, url = start(chain)
+    client = AlchemyClient("", environ={"ALCHEMY_RPC_URL": url})
+    conn = Connection(sqlite3.connect(":memory:", check_same_thread=False), "sqlite")
+    apply_schema(conn)
+    deriver = HDDeriver(MNEMONIC)
+    escrow = deriver.escrow_address("t1")
+    cur = conn.cursor()
+    cur.execute("INSERT INTO users (uuid, username, passphrase_hash, role, created_at) VALUES ('b', 'b', 'x', 'user', '2024-01-01')")
+    cur.execute("INSERT INTO stores (uuid, storename, created_at, withdraw_address) VALUES ('s', 's', '2024-01-01', ?)", (VENDOR,))
+    cur.execute("""INSERT INTO transactions (uuid, type, package_uuid, store_uuid, buyer_uuid, created_at)
+                   VALUES ('t1', 'evm', 's', 's', 'b', '2024-01-01')""")
+    cur.execute("""INSERT INTO evm_transactions (uuid, escrow_address, amount, chain_id, currency, created_at)
+                   VALUES ('t1', ?, 1, 1, 'ETH', '2024-01-01')""", (escrow,))
+    cur.execute("INSERT INTO accepted_tokens (chain_id, symbol, contract_address, created_at) VALUES (1, 'ETH', NULL, '2024-01-01')")
+    cur.execute("""INSERT INTO transaction_statuses (transaction_uuid, time, amount, status, comment, created_at)
+                   VALUES ('t1', '2024-01-01 00:00:00', 1, 'COMPLETED', 'paid', '2024-01-01')""")
+    cur.execute("""INSERT INTO transaction_intents (transaction_uuid, action, requested_at, status, created_at)
+                   VALUES ('t1', 'RELEASE', '2024-01-01', 'pending', '2024-01-01')""")
+    conn.commit()
+    chain.balances[escrow.lower()] = FUNDED
+
+    def pay(**options):
+        return run_process_transaction_intents(conn, client.registry, lambda u: deriver.private_key(ESCROW_BRANCH, u),
+                                               lambda key, default="": default, wallets={1: WALLET, 8453: WALLET}, **options)
+
+    yield {"conn": conn, "client": client, "escrow": escrow.lower(), "pay": pay}
+    server.shutdown()
+    client.close()
+
+
+def _intent(conn):
+    return conn.execute("SELECT status, attempts, last_error, signed_txs, next_attempt_at FROM transaction_intents").fetchone()
+
+def _statuses(conn):
+    return [row[0] for row in conn.execute("SELECT status FROM transaction_statuses ORDER BY id").fetchall()]
+
+def _expire_lease(conn):
+    conn.execute("UPDATE transaction_intents SET lease_until = '2000-01-01 00:00:00'")
+    conn.commit()
+
+
+def test_release_is_sent_booked_and_confirmed(env, chain):
+    conn = env["conn"]
+    assert env["pay"]() == 1
+    assert _intent(conn)[0] == "completed"
+    assert _statuses(conn) == ["COMPLETED", "RELEASED"]
+    assert len(chain.sent) == 2
+    # Gas is paid at base fee + tip; the unused maxFeePerGas headroom stays on the escrow
+    assert chain.balances[VENDOR] + chain.balances[WALLET] + 2 * 21000 * chain.gas_price + chain.balances[env["escrow"]] == FUNDED
+    assert chain.balances[env["escrow"]] == 2 * 21000 * chain.base_fee
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=3) == {}
+    chain.mine()
+    chain.mine()
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=3) == {"confirmed": 2}
+    assert {row[0] for row in conn.execute("SELECT status FROM payout_txs").fetchall()} == {"confirmed"}
+
+def test_crash_after_broadcast_completes_without_paying_twice(env, chain, monkeypatch):
+    conn = env["conn"]
+    send = payouts.send_by_chain
+
+    def send_then_crash(*args, **kwargs):
+        send(*args, **kwargs)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(payouts, "send_by_chain", send_then_crash)
+    with pytest.raises(KeyboardInterrupt):
+        env["pay"]()
+    status, _, _, signed_txs, _ = _intent(conn)
+    assert status == "processing" and signed_txs
+    paid = dict(chain.balances)
+
+    monkeypatch.setattr(payouts, "send_by_chain", send)
+    _expire_lease(conn)
+    # The node answers "already known"; the hashes are found on it, so the intent is booked as sent
+    assert env["pay"]() == 1
+    assert _intent(conn)[0] == "completed"
+    assert len(chain.sent) == 2 and chain.balances == paid
+    assert _statuses(conn) == ["COMPLETED", "RELEASED"]
+
+def test_crash_before_broadcast_sends_the_stored_txs(env, chain, monkeypatch):
+    conn = env["conn"]
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(payouts, "send_by_chain", crash)
+    with pytest.raises(KeyboardInterrupt):
+        env["pay"]()
+    signed_txs = _intent(conn)[3]
+    assert signed_txs and not chain.sent
+
+    monkeypatch.undo()
+    _expire_lease(conn)
+    assert env["pay"]() == 1
+    assert set(chain.sent) == {row[0] for row in conn.execute("SELECT tx_hash FROM payout_txs").fetchall()}
+    assert all(tx_hash in signed_txs for tx_hash in chain.sent)
+
+def test_stale_nonce_signs_again_on_the_chain_nonce(env, chain):
+    conn = env["conn"]
+    nonces = NonceManager()
+    nonces.prime(env["client"].registry.get(1), [env["escrow"]])
+    # Another tx from the escrow took nonces 0 and 1 after they were read
+    chain.nonces[env["escrow"]] = 2
+
+    assert env["pay"](nonces=nonces) == 0
+    status, attempts, last_error, signed_txs, next_attempt_at = _intent(conn)
+    assert (status, attempts, signed_txs, next_attempt_at) == ("pending", 1, None, None)
+    assert "nonce too low" in last_error
+    assert not chain.sent and _statuses(conn) == ["COMPLETED"]
+
+    assert env["pay"](nonces=nonces) == 1
+    assert sorted(int(tx["nonce"], 16) for tx in chain.sent.values()) == [2, 3]
+    assert _intent(conn)[0] == "completed"
+
+def test_nonces_are_read_again_after_clear(env, chain):
+    endpoint = env["client"].registry.get(1)
+    nonces = NonceManager()
+    nonces.prime(endpoint, [env["escrow"]])
+    chain.nonces[env["escrow"]] = 5
+    nonces.prime(endpoint, [env["escrow"]])
+    assert nonces.reserve(1, env["escrow"]) == 0
+    nonces.clear()
+    nonces.prime(endpoint, [env["escrow"]])
+    assert nonces.reserve(1, env["escrow"]) == 5
+
+def test_replaced_tx_fails_its_intent(env, chain):
+    conn = env["conn"]
+    assert env["pay"]() == 1
+    replaced = next(iter(chain.sent))
+    # Its nonce is used, but by a tx the node has no receipt for under this hash
+    del chain.receipts[replaced]
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=1) == {"confirmed": 1, "replaced": 1}
+    status, _, last_error, _, _ = _intent(conn)
+    assert status == "failed" and last_error == f"payout tx {replaced} replaced"
+
+def test_reverted_tx_fails_its_intent(env, chain):
+    conn = env["conn"]
+    assert env["pay"]() == 1
+    reverted = next(iter(chain.sent))
+    chain.reverted.add(reverted)
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=1) == {"confirmed": 1, "reverted": 1}
+    status, _, last_error, _, _ = _intent(conn)
+    assert status == "failed" and last_error == f"payout tx {reverted} reverted"
+    assert conn.execute("SELECT status FROM payout_txs WHERE tx_hash = ?", (reverted,)).fetchone()[0] == "reverted"
+
+def test_op_chain_payout_keeps_the_l1_fee_margin(env, chain):
+    conn = env["conn"]
+    conn.execute("UPDATE evm_transactions SET chain_id = 8453")
+    conn.execute("UPDATE accepted_tokens SET chain_id = 8453")
+    conn.commit()
+    chain.l1_fee = 3 * 10 ** 13
+    assert env["pay"]() == 1
+    assert _intent(conn)[0] == "completed"
+    paid = 2 * (21000 * chain.gas_price + chain.l1_fee)
+    assert chain.balances[VENDOR] + chain.balances[WALLET] + paid + chain.balances[env["escrow"]] == FUNDED
+    # Left on the escrow: the base fee headroom and the second L1 fee estimate of each tx
+    assert chain.balances[env["escrow"]] == 2 * (21000 * chain.base_fee + chain.l1_fee)
+
+def test_leased_intent_is_not_claimed_twice(env):
+    conn = env["conn"]
+    assert claim_intents(conn, "worker-a") == [1]
+    assert claim_intents(conn, "worker-b") == []
+    _expire_lease(conn)
+    assert claim_intents(conn, "worker-b") == [1]
+    assert conn.execute("SELECT claimed_by FROM transaction_intents").fetchone()[0] == "worker-b"
+
+def test_unpayable_intent_backs_off(env, chain):
+    conn = env["conn"]
+    chain.balances[env["escrow"]] = 21000
+    assert env["pay"]() == 0
+    status, attempts, last_error, signed_txs, next_attempt_at = _intent(conn)
+    assert (status, attempts, signed_txs) == ("pending", 1, None)
+    assert "does not cover gas" in last_error and next_attempt_at > payouts._now()
+    # Not claimed again before next_attempt_at
+    assert env["pay"]() == 0
+    assert _intent(conn)[1] == 1 and not chain.sent
+
+def test_retried_booking_writes_one_receipt(env, chain):
+    conn = env["conn"]
+    assert env["pay"]() == 1
+    # The intent is claimed again after its txs and receipt were booked (e.g. a lost completion)
+    conn.execute("UPDATE transaction_intents SET status = 'processing', lease_until = '2000-01-01 00:00:00'")
+    conn.commit()
+    assert env["pay"]() == 1
+    assert _intent(conn)[0] == "completed"
+    assert conn.execute("SELECT COUNT(*) FROM payment_receipts").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM payout_txs").fetchone()[0] == 2
+    assert _statuses(conn) == ["COMPLETED", "RELEASED"] and len(chain.sent) == 2
+
+def test_partial_broadcast_is_recorded(env, chain):
+    conn = env["conn"]
+    chain.refused.add(WALLET)
+    assert env["pay"]() == 0
+    status, attempts, last_error, signed_txs, _ = _intent(conn)
+    assert (status, attempts) == ("pending", 1) and "tx refused" in last_error and signed_txs
+    # The vendor tx went out: it is tracked even though the intent is not booked yet
+    vendor_tx = next(iter(chain.sent))
+    assert conn.execute("SELECT tx_hash, status FROM payout_txs").fetchall() == [(vendor_tx, "sent")]
+
+    chain.refused.clear()
+    conn.execute("UPDATE transaction_intents SET next_attempt_at = NULL")
+    conn.commit()
+    assert env["pay"]() == 1
+    assert len(chain.sent) == 2 and _statuses(conn) == ["COMPLETED", "RELEASED"]
+    assert {row[0] for row in conn.execute("SELECT tx_hash FROM payout_txs").fetchall()} == set(chain.sent)
+
+def test_stuck_txs_are_replaced_with_higher_fees(env, chain):
+    conn = env["conn"]
+    deriver = HDDeriver(MNEMONIC)
+    assert env["pay"]() == 1
+    old = dict(conn.execute("SELECT tx_hash, raw FROM payout_txs").fetchall())
+    # Neither tx was mined: roll the chain back to before the payout
+    for tx_hash in old:
+        del chain.receipts[tx_hash]
+    chain.nonces[env["escrow"]] = 0
+    chain.balances = {env["escrow"]: FUNDED}
+    conn.execute("UPDATE payout_txs SET sent_at = '2000-01-01 00:00:00'")
+    conn.commit()
+
+    keys = {"transaction_intent": lambda u: deriver.private_key(ESCROW_BRANCH, u)}
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=1, rebroadcast_after=60,
+                                private_keys=keys) == {"superseded": 2}
+    rows = conn.execute("SELECT tx_hash, nonce, value, raw, status, source_id FROM payout_txs ORDER BY nonce, status").fetchall()
+    assert [(nonce, status) for _, nonce, _, _, status, _ in rows] == [(0, "sent"), (0, "superseded"), (1, "sent"), (1, "superseded")]
+    for new, replaced in (rows[0], rows[1]), (rows[2], rows[3]):
+        (old_tip, old_max), (tip, max_fee) = signed_fees(replaced[3]), signed_fees(new[3])
+        assert tip * 10 >= old_tip * 11 and max_fee * 10 >= old_max * 11
+        # The extra gas comes off the value; the replacement is what was mined
+        assert int(replaced[2]) - int(new[2]) == TRANSFER_GAS * (max_fee - old_max)
+        assert new[5] == replaced[5] and new[0] in chain.receipts
+
+    assert run_track_payout_txs(conn, env["client"].registry, confirmations=1) == {"confirmed": 2, "dropped": 2}
+    assert _intent(conn)[0] == "completed"
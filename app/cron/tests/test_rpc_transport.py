@@ -0,0 +1,168 @@
+"""
+rpc_transport.Transport against a stub session on a fake clock: retries and their budget, and the
+circuit breaker opening, letting one trial request through (half-open) and closing again.
+
+Run from app folder: python -m pytest cron/tests
+"""
+import pytest
+import requests
+
+import rpc_transport
+from rpc_transport import CircuitBreaker, CircuitOpenError, RateLimiter, RpcError, Transport
+
+OK = {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+PAYLOAD = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() and records the waits."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubResponse:
+    def __init__(self, status_code=200, body=OK, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.body
+
+
+class StubSession(requests.Session):
+    """Answers each post with the next queued reply (StubResponse or exception); the last one repeats."""
+
+    def __init__(self, *replies):
+        super().__init__()
+        self.replies = list(replies)
+        self.posts = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.posts += 1
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rpc_transport, "time", clock)
+    monkeypatch.setattr(rpc_transport.random, "uniform", lambda low, high: high)
+    return clock
+
+def _transport(session, **options):
+    options.setdefault("breaker", CircuitBreaker(threshold=2, cooldown=30))
+    return Transport("http://stub/", session=session, **options)
+
+
+def test_retryable_failures_are_retried_with_backoff(clock):
+    session = StubSession(StubResponse(503), requests.ConnectionError("reset"), StubResponse())
+    transport = _transport(session, backoff=0.5)
+    assert transport.post(PAYLOAD) == OK
+    assert session.posts == 3
+    assert clock.sleeps == [0.5, 1.0]
+    assert transport.stats["retries"] == 2 and transport.stats["failures"] == 0
+
+def test_retry_after_wins_over_the_backoff(clock):
+    session = StubSession(StubResponse(429, headers={"Retry-After": "3"}), StubResponse())
+    transport = _transport(session)
+    assert transport.post(PAYLOAD) == OK
+    assert clock.sleeps == [3.0]
+    assert transport.stats["throttled"] == 1
+
+def test_throttled_body_is_retried(clock):
+    session = StubSession(StubResponse(body={"error": {"code": -32005, "message": "limit"}}), StubResponse())
+    transport = _transport(session)
+    assert transport.post(PAYLOAD) == OK
+    assert transport.stats["throttled"] == 1 and transport.stats["retries"] == 1
+
+def test_retries_stop_at_max_retries(clock):
+    session = StubSession(StubResponse(502))
+    transport = _transport(session, max_retries=2)
+    with pytest.raises(RpcError, match="HTTP 502"):
+        transport.post(PAYLOAD)
+    assert session.posts == 3
+    assert transport.stats["retries"] == 2 and transport.stats["failures"] == 1
+
+def test_client_errors_are_not_retried(clock):
+    session = StubSession(StubResponse(400))
+    transport = _transport(session)
+    with pytest.raises(RpcError, match="HTTP 400"):
+        transport.post(PAYLOAD)
+    assert session.posts == 1 and transport.stats["retries"] == 0
+
+def test_retries_draw_from_the_rate_budget(clock):
+    session = StubSession(StubResponse(503), StubResponse())
+    transport = _transport(session, backoff=0)
+    transport.limiter = RateLimiter(rate=1, burst=1)
+    assert transport.post(PAYLOAD) == OK
+    # The first send used the only token; the retry waits for the next one despite a zero backoff
+    assert clock.sleeps == [1.0]
+    assert transport.stats["compute_units"] == 2 * rpc_transport.COMPUTE_UNITS["eth_blockNumber"]
+
+
+def test_breaker_opens_after_threshold_failed_requests(clock):
+    session = StubSession(StubResponse(503))
+    transport = _transport(session, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(RpcError):
+            transport.post(PAYLOAD)
+    assert transport.stats["breaker_opens"] == 1
+    with pytest.raises(CircuitOpenError):
+        transport.post(PAYLOAD)
+    assert session.posts == 2 and transport.stats["short_circuited"] == 1
+
+def test_half_open_trial_success_closes_the_breaker(clock):
+    session = StubSession(StubResponse(503), StubResponse(503), StubResponse())
+    transport = _transport(session, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(RpcError):
+            transport.post(PAYLOAD)
+    clock.now += 30
+    assert transport.post(PAYLOAD) == OK
+    assert transport.post(PAYLOAD) == OK
+    assert session.posts == 4 and transport.stats["short_circuited"] == 0
+
+def test_half_open_trial_failure_reopens_the_breaker(clock):
+    session = StubSession(StubResponse(503))
+    transport = _transport(session, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(RpcError):
+            transport.post(PAYLOAD)
+    clock.now += 30
+    with pytest.raises(RpcError, match="HTTP 503"):
+        transport.post(PAYLOAD)
+    assert transport.stats["breaker_opens"] == 2
+    # A fresh cooldown starts from the failed trial
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        transport.post(PAYLOAD)
+    assert session.posts == 3
+
+def test_only_one_trial_while_half_open(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    assert breaker.failure() is True
+    assert breaker.allow() is False
+    clock.now += 30
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.success()
+    assert breaker.allow() is True
@@ -0,0 +1,51 @@
+"""
+sweep.plan_sweep: what a sweep of a settled escrow sends, given its balance and the most a transfer can cost.
+
+Run from app folder: python -m pytest cron/tests
+"""
+from decimal import Decimal
+
+import pytest
+
+from sweep import NotWorthGas, plan_sweep
+
+WALLET = "0x" + "33" * 20
+VENDOR = "0x" + "22" * 20
+BUYER = "0x" + "44" * 20
+TX_COST = 21000 * 2 * 10 ** 9
+OWED = 10 ** 17
+
+
+def _row(status="RELEASED", owed=OWED, vendor=VENDOR):
+    return {"tx_status": status, "owed_wei": str(owed), "withdraw_address": vendor,
+            "refund_address": BUYER, "buyer_refund_address": None}
+
+def _plan(row, balance, commission=Decimal("0.1")):
+    return plan_sweep(row, WALLET, commission, min_ratio=10)(balance, TX_COST)
+
+
+def test_owed_commission_is_swept():
+    assert _plan(_row(), OWED + TX_COST) == ([("commission", WALLET, OWED)], [])
+
+def test_small_late_payment_stays_on_the_escrow():
+    late = 5 * TX_COST
+    transfers, _ = _plan(_row(), OWED + TX_COST + late)
+    # Only the commission owed goes out; the vendor's share of the late payment is not seized
+    assert transfers == [("commission", WALLET, OWED)]
+
+def test_late_payment_worth_a_transfer_is_split():
+    late = 100 * TX_COST
+    transfers, _ = _plan(_row(), OWED + TX_COST + late)
+    vendor_wei = int(Decimal(late - TX_COST) * Decimal("0.9"))
+    assert transfers == [("commission", WALLET, OWED + late - TX_COST - vendor_wei), ("vendor", VENDOR, vendor_wei)]
+
+def test_late_payment_without_withdraw_address_waits():
+    transfers, _ = _plan(_row(vendor=None), OWED + TX_COST + 100 * TX_COST)
+    assert transfers == [("commission", WALLET, OWED)]
+
+def test_late_payment_alone_is_not_worth_gas_yet():
+    with pytest.raises(NotWorthGas):
+        _plan(_row(owed=0), TX_COST + 5 * TX_COST)
+
+def test_cancelled_escrow_refunds_the_buyer():
+    assert _plan(_row("CANCELLED", owed=0), OWED) == ([("buyer", BUYER, OWED - TX_COST)], [])
@@ -0,0 +1,434 @@
+"""
+Outgoing transaction plumbing for the payout workers (payouts.py): local nonces, cached fee quotes,
+signing on a process pool, JSON-RPC batch broadcast and receipt tracking (payout_txs) across cron ticks,
+with stuck txs replaced at their nonce on bumped fees.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import rlp
+from eth_account import Account
+from eth_utils import to_checksum_address
+
+from bulk import DEFAULT_WRITE_CHUNK, ChunkedWriter
+from rpc_transport import RpcError
+
+DEFAULT_GAS_TTL = 15.0
+DEFAULT_SIGN_PROCESSES = 0  # 0: one per CPU
+DEFAULT_SIGN_MIN_BATCH = 32
+DEFAULT_CONFIRMATIONS = 3
+DEFAULT_REBROADCAST_SECONDS = 300
+# A replacement tx must pay at least 10% more on both fee fields
+REPLACEMENT_BUMP_PERCENT = 115
+# Plain ETH transfer to an externally owned account
+TRANSFER_GAS = 21000
+# maxFeePerGas = BASE_FEE_MULTIPLIER x base fee + tip: survives six full blocks of +12.5% base fee
+BASE_FEE_MULTIPLIER = 2
+# The L1 data fee follows the L1 base fee, which can move between quote and inclusion
+L1_FEE_MULTIPLIER = 2
+# Stand-in transfer whose size prices the L1 data fee (values at least as long as any real one)
+_SAMPLE_KEY = b"\x01" * 32
+_SAMPLE_TO = "0x" + "99" * 20
+# Node answers that may mean the exact same signed tx was already accepted; checked against the tx hash
+ALREADY_SENT = ("already known", "nonce too low", "known transaction", "already imported")
+STALE_NONCE = ("nonce too low",)
+# payout_txs.source -> UPDATE marking that source failed (params: last_error, source_id)
+FAILED_SOURCE = {
+    "transaction_intent": "UPDATE transaction_intents SET status = 'failed', last_error = ? WHERE id = ?",
+    "deposit_withdraw_intent": "UPDATE deposit_withdraw_intents SET status = 'failed', last_error = ? WHERE id = ?",
+    "escrow_sweep": "UPDATE escrow_sweeps SET status = 'failed', last_error = ?, next_check_at = NULL WHERE transaction_uuid = ?",
+}
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def already_sent(error) -> bool:
+    return any(marker in str(error).lower() for marker in ALREADY_SENT)
+
+def stale_nonce(error) -> bool:
+    return any(marker in str(error).lower() for marker in STALE_NONCE)
+
+
+class StaleNonceError(RpcError):
+    """The tx's nonce was used by another tx: it can never be mined, sign the payout again."""
+
+
+class NonceManager:
+    """Next nonce per (chain_id, sender), kept in memory for the life of the process (thread-safe)."""
+
+    def __init__(self):
+        self._next = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+
+    def prime(self, endpoint, addresses) -> dict:
+        """Read the pending nonce of every address not tracked yet, in one batch. Returns {address: RpcError} for failed reads."""
+        with self._lock:
+            missing = [a for a in dict.fromkeys(addresses) if (endpoint.chain_id, a.lower()) not in self._next]
+        if not missing:
+            return {}
+        self.reads += 1
+        counts = endpoint.get_transaction_counts(missing)
+        errors = {}
+        with self._lock:
+            for address in missing:
+                count = counts.get(address)
+                if isinstance(count, int):
+                    self._next.setdefault((endpoint.chain_id, address.lower()), count)
+                else:
+                    errors[address] = count or RpcError("nonce read missing")
+        return errors
+
+    def reserve(self, chain_id, address: str, count: int = 1) -> int:
+        """First of count consecutive nonces for a primed address."""
+        key = (chain_id, address.lower())
+        with self._lock:
+            nonce = self._next[key]
+            self._next[key] = nonce + count
+        return nonce
+
+    def reset(self, chain_id, address: str) -> None:
+        """Forget address (e.g. after a rejected tx): the next prime reads its nonce from the chain again."""
+        with self._lock:
+            self._next.pop((chain_id, address.lower()), None)
+
+    def clear(self) -> None:
+        """Forget every address, so each is read from the chain again (once per cron cycle)."""
+        with self._lock:
+            self._next.clear()
+
+
+def max_tx_cost(fees) -> int:
+    """Most a transfer signed with fees (GasPriceCache.get) can cost the sender, in wei, besides its value."""
+    return TRANSFER_GAS * fees["max_fee"] + fees["l1_fee"]
+
+def quote_fees(endpoint) -> dict:
+    """
+    Fees to sign with: {"max_fee", "priority_fee" (None: legacy gasPrice = max_fee), "l1_fee"} in wei.
+    Raises RpcError.
+    """
+    data = endpoint.get_fee_data()
+    if data["base_fee"] is None:
+        fees = {"max_fee": data["gas_price"], "priority_fee": None, "l1_fee": 0}
+    else:
+        priority = data["priority_fee"]
+        if priority is None:
+            priority = max(0, data["gas_price"] - data["base_fee"])
+        fees = {"max_fee": BASE_FEE_MULTIPLIER * data["base_fee"] + priority, "priority_fee": priority, "l1_fee": 0}
+    if endpoint.op_stack:
+        sample = sign_transfer((_SAMPLE_KEY, endpoint.chain_id or 1, 2 ** 32, fees, "sample", _SAMPLE_TO, 10 ** 27))
+        fees["l1_fee"] = L1_FEE_MULTIPLIER * endpoint.get_l1_fee(bytes.fromhex(sample["raw"][2:]))
+    return fees
+
+
+class GasPriceCache:
+    """Fee quote (quote_fees) per chain, reused for ttl seconds."""
+
+    def __init__(self, ttl: float = DEFAULT_GAS_TTL):
+        self.ttl = max(0.0, float(ttl))
+        self._prices = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint) -> dict:
+        """quote_fees() for endpoint's chain. Raises RpcError."""
+        with self._lock:
+            cached = self._prices.get(endpoint.chain_id)
+            if cached is not None and time.monotonic() - cached[1] <= self.ttl:
+                self.hits += 1
+                return cached[0]
+        self.misses += 1
+        price = quote_fees(endpoint)
+        with self._lock:
+            self._prices[endpoint.chain_id] = (price, time.monotonic())
+        return price
+
+
+def sign_transfer(job) -> dict:
+    """
+    job = (private_key, chain_id, nonce, fees, role, to, wei) -> {role, to, value, nonce, hash, raw}; an
+    EIP-1559 tx, or legacy when fees["priority_fee"] is None (see quote_fees).
+    """
+    key, chain_id, nonce, fees, role, to, wei = job
+    tx = {"nonce": nonce, "gas": TRANSFER_GAS, "to": to, "value": wei, "data": b"", "chainId": chain_id}
+    if fees["priority_fee"] is None:
+        tx["gasPrice"] = fees["max_fee"]
+    else:
+        tx.update(type=2, maxFeePerGas=fees["max_fee"], maxPriorityFeePerGas=fees["priority_fee"])
+    signed = Account.sign_transaction(tx, key)
+    raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+    return {"role": role, "to": to, "value": str(wei), "nonce": nonce,
+            "hash": "0x" + bytes(signed.hash).hex(), "raw": "0x" + bytes(raw).hex()}
+
+class Signer:
+    """
+    signer = Signer(processes=4)
+    txs = signer.sign(jobs)   # sign_transfer(job) for each job, in order
+    signer.close()
+
+    Batches of min_batch jobs or more go to a process pool (started on first use and kept until
+    close); smaller ones, or processes=1, are signed inline.
+    """
+
+    def __init__(self, processes: int = DEFAULT_SIGN_PROCESSES, min_batch: int = DEFAULT_SIGN_MIN_BATCH):
+        self.processes = int(processes) or os.cpu_count() or 1
+        self.min_batch = max(1, int(min_batch))
+        self._pool = None
+
+    def sign(self, jobs) -> list:
+        jobs = list(jobs)
+        if self.processes < 2 or len(jobs) < self.min_batch:
+            return [sign_transfer(job) for job in jobs]
+        if self._pool is None:
+            # spawn: the cron process has live threads (HTTP pool, price refresh), which fork does not copy safely
+            self._pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return list(self._pool.map(sign_transfer, jobs, chunksize=max(1, len(jobs) // (self.processes * 4))))
+        except BrokenProcessPool as e:
+            print(f"signer: process pool failed ({e}); signing inline")
+            self.close()
+            self.processes = 1
+            return [sign_transfer(job) for job in jobs]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def send_all(endpoint, txs) -> dict:
+    """
+    Broadcast signed txs ({hash, raw, ...}) on one chain in JSON-RPC batches, in the given order (keep
+    each sender's txs in nonce order). Returns {hash: None (accepted, or found on the node) or RpcError};
+    StaleNonceError for a "nonce too low" tx the node does not know.
+    """
+    results = endpoint.send_raw_transactions([tx["raw"] for tx in txs])
+    out = {tx["hash"]: result if isinstance(result, RpcError) else None for tx, result in zip(txs, results)}
+    # "already known" / "nonce too low" is also the answer to a fresh tx reusing a spent nonce
+    maybe = [h for h, error in out.items() if error is not None and already_sent(error)]
+    if maybe:
+        found = endpoint.get_transactions(maybe)
+        for tx_hash in maybe:
+            if isinstance(found.get(tx_hash), dict):
+                out[tx_hash] = None
+            elif found.get(tx_hash) is None and stale_nonce(out[tx_hash]):
+                out[tx_hash] = StaleNonceError(str(out[tx_hash]))
+    return out
+
+def send_by_chain(registry, txs_by_chain, workers: int = 4) -> dict:
+    """send_all per chain, chains in parallel threads. txs_by_chain: {chain_id: [tx]}. Returns {hash: None or error}."""
+    def send(chain_id):
+        try:
+            return send_all(registry.get(chain_id), txs_by_chain[chain_id])
+        except RpcError as e:
+            # e.g. no endpoint for this chain
+            return {tx["hash"]: e for tx in txs_by_chain[chain_id]}
+
+    out = {}
+    if txs_by_chain:
+        with ThreadPoolExecutor(max(1, min(workers, len(txs_by_chain)))) as pool:
+            for results in pool.map(send, txs_by_chain):
+                out.update(results)
+    return out
+
+
+def sent_rows(source: str, source_id, chain_id, sender: str, txs, now: str) -> list:
+    """INSERT statements recording broadcast txs in payout_txs (skip hashes already recorded)."""
+    return [("""INSERT INTO payout_txs (tx_hash, chain_id, from_address, nonce, to_address, value, raw, source, source_id,
+                                      status, sent_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'sent', ?, ?)""",
+             (tx["hash"], int(chain_id), sender, tx["nonce"], tx["to"], tx["value"], tx["raw"], source, str(source_id), now, now))
+            for tx in txs]
+
+def known_hashes(conn, hashes) -> set:
+    """The subset of hashes already in payout_txs."""
+    known, hashes = set(), list(hashes)
+    cur = conn.cursor()
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cur.execute(f"SELECT tx_hash FROM payout_txs WHERE tx_hash IN ({', '.join('?' * len(chunk))})", chunk)
+        known.update(row[0] for row in cur.fetchall())
+    return known
+
+
+_TRACKED = ("tx_hash", "chain_id", "from_address", "nonce", "raw", "sent_at", "status", "to_address", "value",
+            "source", "source_id", "owner", "nonce_mined")
+
+def _track_chain(endpoint, rows, confirmations: int, rebroadcast_before: str) -> dict:
+    """
+    {tx_hash: (status, block_number) or 'resend' or RpcError} for one chain's 'sent' and 'superseded' rows
+    (dicts of _TRACKED). A tx whose nonce was mined by another tx of the same sender and nonce is
+    'dropped'; by a tx not in payout_txs, 'replaced'.
+    """
+    head = endpoint.get_block_number()
+    receipts = endpoint.get_transaction_receipts([r["tx_hash"] for r in rows])
+    unmined = [r for r in rows if receipts.get(r["tx_hash"]) is None]
+    mined_nonces = endpoint.get_transaction_counts([r["from_address"] for r in unmined], "latest") if unmined else {}
+    # A tx mined between the two reads looks replaced: ask for those receipts once more
+    recheck = [r["tx_hash"] for r in unmined
+               if isinstance(mined_nonces.get(r["from_address"]), int) and mined_nonces[r["from_address"]] > r["nonce"]]
+    if recheck:
+        receipts.update(endpoint.get_transaction_receipts(recheck))
+    # Nonces mined by one of our own txs: now, or by a sibling already settled on an earlier run
+    mined = {(r["from_address"], r["nonce"]) for r in rows if r["nonce_mined"]
+             or isinstance(receipts.get(r["tx_hash"]), dict) and receipts[r["tx_hash"]].get("blockNumber")}
+    out = {}
+    for row in rows:
+        tx_hash, sender, nonce = row["tx_hash"], row["from_address"], row["nonce"]
+        receipt = receipts.get(tx_hash)
+        if isinstance(receipt, RpcError):
+            out[tx_hash] = receipt
+        elif isinstance(receipt, dict) and receipt.get("blockNumber"):
+            block = int(receipt["blockNumber"], 16)
+            if int(receipt.get("status") or "0x1", 16) == 0:
+                out[tx_hash] = ("reverted", block)
+            elif head - block + 1 >= confirmations:
+                out[tx_hash] = ("confirmed", block)
+        elif isinstance(mined_nonces.get(sender), int) and mined_nonces[sender] > nonce:
+            # The nonce was mined by a different tx: this one can never be
+            out[tx_hash] = ("dropped" if (sender, nonce) in mined else "replaced", None)
+        elif row["status"] == "sent" and row["sent_at"] < rebroadcast_before:
+            out[tx_hash] = "resend"
+    return out
+
+def signed_fees(raw: str):
+    """(tip, max fee) per gas of a signed legacy or EIP-1559 raw tx; a legacy gasPrice is both."""
+    tx = bytes.fromhex(raw[2:] if raw.startswith("0x") else raw)
+    if tx[0] == 2:
+        tip, max_fee = (int.from_bytes(x, "big") for x in rlp.decode(tx[1:])[2:4])
+        return tip, max_fee
+    gas_price = int.from_bytes(rlp.decode(tx)[1], "big")
+    return gas_price, gas_price
+
+def replacement_fees(raw: str, fees: dict) -> dict:
+    """
+    Fees for a tx replacing the signed raw tx at its nonce: the raw tx's fees raised by
+    REPLACEMENT_BUMP_PERCENT (nodes refuse a replacement below +10%), or fees (quote_fees) if higher.
+    """
+    old_tip, old_max = signed_fees(raw)
+
+    def bump(wei):
+        return -(-wei * REPLACEMENT_BUMP_PERCENT // 100)
+
+    tip = None if fees["priority_fee"] is None else max(bump(old_tip), fees["priority_fee"])
+    return {"max_fee": max(bump(old_max), fees["max_fee"]), "priority_fee": tip, "l1_fee": fees["l1_fee"]}
+
+def _replacement(row, key: bytes, fees: dict):
+    """
+    Signed replacement of an unmined tracked row at the same nonce, with bumped fees; the extra gas comes
+    off the value. None (re-send the same raw tx) when the key does not match or nothing would be left.
+    """
+    if Account.from_key(key).address.lower() != row["from_address"].lower():
+        return None
+    bumped = replacement_fees(row["raw"], fees)
+    value = int(row["value"]) - TRANSFER_GAS * (bumped["max_fee"] - signed_fees(row["raw"])[1])
+    if value <= 0:
+        return None
+    return sign_transfer((key, int(row["chain_id"]), int(row["nonce"]), bumped, "replacement",
+                          to_checksum_address(row["to_address"]), value))
+
+def run_track_payout_txs(conn, registry, confirmations: int = DEFAULT_CONFIRMATIONS,
+                         rebroadcast_after: float = DEFAULT_REBROADCAST_SECONDS,
+                         chunk_size=DEFAULT_WRITE_CHUNK, workers: int = 4, private_keys=None, gas_prices=None) -> dict:
+    """
+    Poll receipts of payout_txs still 'sent' or 'superseded' (batched per chain, chains in parallel) and
+    record the outcome; the intent or sweep of a reverted or replaced tx is marked failed (FAILED_SOURCE).
+    A 'sent' tx unmined after rebroadcast_after seconds is replaced at the same nonce with bumped fees
+    (replacement_fees): the new tx is recorded as 'sent' and the old one as 'superseded', and whichever of
+    them is mined settles the other as 'dropped'. private_keys: {payout_txs.source: key(owner) -> key bytes},
+    owner being the transaction uuid (intents, sweeps) or deposit uuid (withdrawals); sources without a
+    key get the same raw tx again. gas_prices: GasPriceCache for the current fee quote.
+    Returns {status: count} for the rows that changed.
+    """
+    private_keys = private_keys or {}
+    gas_prices = GasPriceCache() if gas_prices is None else gas_prices
+    cur = conn.cursor()
+    # owner: whose derived key sent the tx
+    cur.execute("""SELECT p.tx_hash, p.chain_id, p.from_address, p.nonce, p.raw, p.sent_at, p.status, p.to_address,
+                          p.value, p.source, p.source_id,
+                          CASE p.source WHEN 'transaction_intent' THEN ti.transaction_uuid
+                                        WHEN 'deposit_withdraw_intent' THEN dw.deposit_uuid
+                                        WHEN 'escrow_sweep' THEN p.source_id END,
+                          EXISTS (SELECT 1 FROM payout_txs q WHERE q.chain_id = p.chain_id AND q.from_address = p.from_address
+                                  AND q.nonce = p.nonce AND q.status IN ('confirmed', 'reverted'))
+                   FROM payout_txs p
+                   LEFT JOIN transaction_intents ti ON p.source = 'transaction_intent' AND ti.id = p.source_id
+                   LEFT JOIN deposit_withdraw_intents dw ON p.source = 'deposit_withdraw_intent' AND dw.id = p.source_id
+                   WHERE p.status IN ('sent', 'superseded') ORDER BY p.chain_id, p.from_address, p.nonce""")
+    by_chain, rows = {}, {}
+    for row in cur.fetchall():
+        row = dict(zip(_TRACKED, row))
+        by_chain.setdefault(int(row["chain_id"]), []).append(row)
+        rows[row["tx_hash"]] = row
+    if not by_chain:
+        return {}
+    before = (datetime.utcnow() - timedelta(seconds=rebroadcast_after)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def track(chain_id):
+        try:
+            endpoint = registry.get(chain_id)
+            results = _track_chain(endpoint, by_chain[chain_id], confirmations, before)
+            resend = [r for r in by_chain[chain_id] if results.get(r["tx_hash"]) == "resend"]
+            if not resend:
+                return results
+            fees = gas_prices.get(endpoint) if any(r["source"] in private_keys and r["owner"] for r in resend) else None
+            txs, replaced = [], {}
+            for row in resend:
+                key = private_keys.get(row["source"])
+                new = _replacement(row, key(row["owner"]), fees) if key and row["owner"] else None
+                if new is not None:
+                    replaced[new["hash"]] = row["tx_hash"]
+                txs.append(new or {"hash": row["tx_hash"], "raw": row["raw"]})
+            for tx_hash, error in send_all(endpoint, txs).items():
+                if tx_hash in replaced:
+                    results[replaced[tx_hash]] = ("superseded", (next(t for t in txs if t["hash"] == tx_hash), error))
+                else:
+                    results[tx_hash] = ("resent", error)
+            return results
+        except RpcError as e:
+            return {r["tx_hash"]: e for r in by_chain[chain_id]}
+
+    with ThreadPoolExecutor(max(1, min(workers, len(by_chain)))) as pool:
+        results = {}
+        for chain_results in pool.map(track, by_chain):
+            results.update(chain_results)
+    now = _now()
+    counts, errors = {}, []
+    with ChunkedWriter(conn, "payout_txs", chunk_size) as writer:
+        for tx_hash, result in results.items():
+            if isinstance(result, RpcError):
+                errors.append(result)
+                continue
+            status, detail = result
+            row = rows[tx_hash]
+            if status == "resent":
+                if detail is not None:
+                    errors.append(detail)
+                    continue
+                writer.add(("UPDATE payout_txs SET sent_at = ? WHERE tx_hash = ?", (now, tx_hash)))
+            elif status == "superseded":
+                new, error = detail
+                if error is not None:
+                    errors.append(error)
+                    continue
+                writer.add(("UPDATE payout_txs SET status = 'superseded' WHERE tx_hash = ?", (tx_hash,)),
+                           *sent_rows(row["source"], row["source_id"], row["chain_id"], row["from_address"], [new], now))
+            else:
+                statements = [("UPDATE payout_txs SET status = ?, block_number = ?, confirmed_at = ? WHERE tx_hash = ?",
+                               (status, detail, now, tx_hash))]
+                if status in ("reverted", "replaced") and row["source"] in FAILED_SOURCE:
+                    statements.append((FAILED_SOURCE[row["source"]], (f"payout tx {tx_hash} {status}", row["source_id"])))
+                writer.add(*statements)
+            counts[status] = counts.get(status, 0) + 1
+    if counts.get("reverted") or counts.get("replaced"):
+        print(f"payout_txs: {counts.get('reverted', 0)} reverted, {counts.get('replaced', 0)} replaced; "
+              "their intents / sweeps are marked failed, see payout_txs for details")
+    if errors:
+        print(f"payout_txs: {len(errors)} receipt checks failed, retried next run ({errors[0]})")
+    return counts
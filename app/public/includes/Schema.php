@@ -32,6 +32,7 @@ final class Schema
         $this->createTransactions();
         $this->createEvmTransactions();
         $this->createTransactionStatuses();
+        $this->createCurrentTransactionStatuses();
         $this->createShippingStatuses();
         $this->createReferralPayments();
         $this->createDeposits();
@@ -52,6 +53,7 @@ final class Schema
         $this->createDepositWithdrawIntents();
         $this->createAuditLog();
         $this->addV25Columns();
+        $this->addIntentWorkerColumns();
         $this->createConfig();
         $this->createApiKeys();
         $this->createApiKeyRequests();
@@ -60,6 +62,12 @@ final class Schema
         $this->createHooks();
         $this->createHookEvents();
         $this->createAcceptedTokens();
+        $this->createCronState();
+        $this->createBalanceCache();
+        $this->createPrices();
+        $this->createPayoutTxs();
+        $this->createEscrowSweeps();
+        $this->createCronRuns();
     }
 
     private function createApiKeyRequests(): void
@@ -312,6 +320,24 @@ final class Schema
         }
     }
 
+    /** Materialized current status per transaction; maintained incrementally by the Python cron (current_status.py). */
+    private function createCurrentTransactionStatuses(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS current_transaction_statuses (
+            transaction_uuid TEXT PRIMARY KEY,
+            status_id INTEGER NOT NULL,
+            time TEXT NOT NULL,
+            amount REAL NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (transaction_uuid) REFERENCES transactions(uuid)
+        )
+        SQL);
+        // Index DDL is portable between SQLite and MariaDB
+        $this->exec('CREATE INDEX IF NOT EXISTS idx_current_tx_statuses_status ON current_transaction_statuses(status)');
+    }
+
     private function createShippingStatuses(): void
     {
         $pk = $this->pk();
@@ -472,6 +498,108 @@ final class Schema
         )");
     }
 
+    /** Python cron bookkeeping (watermarks, checkpoints); not read by PHP. */
+    private function createCronState(): void
+    {
+        $this->exec('CREATE TABLE IF NOT EXISTS cron_state (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )');
+    }
+
+    private function createBalanceCache(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS balance_cache (
+            chain_id INTEGER NOT NULL,
+            address TEXT NOT NULL,
+            balance_wei TEXT NOT NULL,
+            block_number INTEGER,
+            checked_at TEXT NOT NULL,
+            PRIMARY KEY (chain_id, address)
+        )
+        SQL);
+    }
+
+    /** Last good USD quote per symbol, written by the Python cron (price_cache.py). */
+    private function createPrices(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS prices (
+            symbol TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            price TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (symbol, currency)
+        )
+        SQL);
+    }
+
+    /** Every payout tx the Python cron broadcast (tx_sender.py), tracked until its receipt is confirmed. */
+    private function createPayoutTxs(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS payout_txs (
+            tx_hash TEXT PRIMARY KEY,
+            chain_id INTEGER NOT NULL,
+            from_address TEXT NOT NULL,
+            nonce INTEGER NOT NULL,
+            to_address TEXT NOT NULL,
+            value TEXT NOT NULL,
+            raw TEXT NOT NULL,
+            source TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            block_number INTEGER,
+            sent_at TEXT NOT NULL,
+            confirmed_at TEXT,
+            created_at TEXT NOT NULL
+        )
+        SQL);
+        $this->exec('CREATE INDEX IF NOT EXISTS idx_payout_txs_status ON payout_txs(status)');
+        $this->exec('CREATE INDEX IF NOT EXISTS idx_payout_txs_source ON payout_txs(source, source_id)');
+    }
+
+    /** Sweep state per settled escrow, kept by the Python cron (sweep.py). */
+    private function createEscrowSweeps(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS escrow_sweeps (
+            transaction_uuid TEXT PRIMARY KEY,
+            chain_id INTEGER NOT NULL,
+            escrow_address TEXT NOT NULL,
+            owed_wei TEXT NOT NULL DEFAULT '0',
+            status TEXT NOT NULL,
+            checks INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            signed_txs TEXT,
+            swept_wei TEXT NOT NULL DEFAULT '0',
+            checked_at TEXT,
+            next_check_at TEXT,
+            created_at TEXT NOT NULL
+        )
+        SQL);
+        $this->exec('CREATE INDEX IF NOT EXISTS idx_escrow_sweeps_next_check ON escrow_sweeps(next_check_at)');
+    }
+
+    /** One JSON record per Python cron run (metrics.py): per-task timings and counters. */
+    private function createCronRuns(): void
+    {
+        $this->exec(<<<'SQL'
+        CREATE TABLE IF NOT EXISTS cron_runs (
+            uuid TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            status TEXT NOT NULL,
+            record TEXT NOT NULL
+        )
+        SQL);
+        $this->exec('CREATE INDEX IF NOT EXISTS idx_cron_runs_started ON cron_runs(started_at)');
+    }
+
     private function createPasswordResetTokens(): void
     {
         $pk = $this->pk();
@@ -737,6 +865,20 @@ final class Schema
         $this->addColumnIfMissing('dispute_claims', 'user_uuid', 'TEXT');
     }
 
+    /** Lease and retry bookkeeping for the Python intent worker (payouts.py). */
+    private function addIntentWorkerColumns(): void
+    {
+        foreach (['transaction_intents', 'deposit_withdraw_intents'] as $table) {
+            $this->addColumnIfMissing($table, 'claimed_by', 'TEXT');
+            $this->addColumnIfMissing($table, 'lease_until', 'TEXT');
+            $this->addColumnIfMissing($table, 'attempts', 'INTEGER NOT NULL DEFAULT 0');
+            $this->addColumnIfMissing($table, 'last_error', 'TEXT');
+            $this->addColumnIfMissing($table, 'signed_txs', 'TEXT');
+            $this->addColumnIfMissing($table, 'processed_at', 'TEXT');
+            $this->addColumnIfMissing($table, 'next_attempt_at', 'TEXT');
+        }
+    }
+
     private function addColumnIfMissing(string $table, string $column, string $definition): void
     {
         if ($this->sqlite) {
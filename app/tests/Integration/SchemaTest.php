@@ -17,10 +17,11 @@ final class SchemaTest extends TestCase
         $schema->run();
 
         $tables = ['users', 'stores', 'store_users', 'items', 'item_categories', 'packages', 'package_prices',
-            'transactions', 'evm_transactions', 'transaction_statuses', 'transaction_intents', 'shipping_statuses',
+            'transactions', 'evm_transactions', 'transaction_statuses', 'current_transaction_statuses',
+            'transaction_intents', 'shipping_statuses',
             'payment_receipts', 'referral_payments', 'deposits', 'deposit_history', 'disputes', 'dispute_claims',
             'registration_rate_limit', 'agent_identities', 'agent_requests', 'hooks', 'hook_events',
-            'config', 'api_keys', 'api_key_requests', 'accepted_tokens'];
+            'config', 'api_keys', 'api_key_requests', 'accepted_tokens', 'cron_state', 'balance_cache', 'prices', 'payout_txs', 'escrow_sweeps', 'cron_runs'];
 
         foreach ($tables as $table) {
             $stmt = $pdo->query("SELECT name FROM sqlite_master WHERE type='table' AND name=" . $pdo->quote($table));
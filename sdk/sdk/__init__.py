@@ -14,8 +14,30 @@ Session auth (for creating stores, items, transactions, keys):
     client = MarketplaceClient(base_url="https://market.example.com")
     client.login("alice", "secret123")
     client.create_store("MyStore", description="My shop", vendorship_agree=True)
+
+Cache the public catalog in memory (see sdk.cache for TTLs and the SQLite backend):
+
+    from sdk import ResponseCache
+
+    client = MarketplaceClient(base_url="https://market.example.com", cache=ResponseCache())
+
+Pace API-key requests to the server's per-key limit and retry GETs answered 429:
+
+    from sdk import RateLimiter
+
+    client = MarketplaceClient(base_url="https://market.example.com", api_key="your-key",
+                               rate_limiter=RateLimiter())
+
+Async (pip install marketplace-sdk[async]):
+
+    from sdk import AsyncMarketplaceClient
+
+    async with AsyncMarketplaceClient(base_url="https://market.example.com") as client:
+        catalog = await client.catalog()  # stores + items of every store, fetched concurrently
 """
 
+from .async_client import AsyncMarketplaceClient
+from .cache import MemoryBackend, ResponseCache, SQLiteBackend
 from .client import DEFAULT_BASE_URL, MarketplaceClient
 from .exceptions import (
     ConflictError,
@@ -27,10 +49,16 @@ from .exceptions import (
     UnauthorizedError,
     ValidationError,
 )
+from .ratelimit import RateLimiter
 
 __all__ = [
     "DEFAULT_BASE_URL",
     "MarketplaceClient",
+    "AsyncMarketplaceClient",
+    "ResponseCache",
+    "MemoryBackend",
+    "SQLiteBackend",
+    "RateLimiter",
     "MarketplaceAPIError",
     "UnauthorizedError",
     "ForbiddenError",
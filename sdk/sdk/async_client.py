@@ -0,0 +1,329 @@
+"""
+Async Marketplace API client.
+
+Same methods and exceptions as MarketplaceClient, on one pooled httpx.AsyncClient
+(pip install marketplace-sdk[async]). At most max_concurrency requests are in flight;
+the fan-out helpers (list_items_for_stores, catalog) issue their requests concurrently
+within that cap.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from .cache import key_fingerprint
+from .client import DEFAULT_BASE_URL, parse_response
+from .ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+class AsyncMarketplaceClient:
+    """
+    Async client for the Marketplace REST API.
+
+        async with AsyncMarketplaceClient(base_url, api_key=key) as client:
+            catalog = await client.catalog()
+
+    Session cookies from login() are kept on the pooled client, as with MarketplaceClient.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        api_key: Optional[str] = None,
+        client: Optional["httpx.AsyncClient"] = None,
+        timeout: float = 30.0,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        """
+        Args:
+            base_url: API base URL (e.g. https://market.example.com).
+            api_key: Optional API key (Bearer). Use for API key–authenticated endpoints.
+            client: Optional httpx.AsyncClient to share; it is not closed by aclose().
+            timeout: Request timeout in seconds.
+            max_concurrency: Requests in flight at once (also the connection pool size).
+            rate_limiter: Optional RateLimiter pacing API-key requests and retrying 429'd GETs.
+        """
+        if client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("pip install marketplace-sdk[async] (httpx) for AsyncMarketplaceClient")
+            client = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency,
+                ),
+            )
+            self._owns_client = True
+        else:
+            self._owns_client = False
+        self._base = base_url.rstrip("/")
+        self._api_key = api_key
+        self._client = client
+        self._timeout = timeout
+        self._max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter
+        # Created on first use so it belongs to the running event loop (Python 3.8/3.9)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncMarketplaceClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections (unless the httpx client was passed in)."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    def _headers(self, auth: bool = True) -> Dict[str, str]:
+        h: Dict[str, str] = {}
+        if auth and self._api_key:
+            h["Authorization"] = f"Bearer {self._api_key}"
+            h["X-API-Key"] = self._api_key
+        return h
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        auth: bool = True,
+    ) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        limit_key = key_fingerprint(self._api_key) if auth and self._api_key else None
+        attempt = 0
+        while True:
+            # Wait for a rate slot before taking a concurrency slot, so waiting holds no connection
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(limit_key)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            async with self._semaphore:
+                # API expects form-encoded for POST
+                resp = await self._client.request(
+                    method,
+                    f"{self._base}{path}",
+                    params=params,
+                    data=data,
+                    headers=self._headers(auth=auth),
+                    timeout=self._timeout,
+                )
+            if self.rate_limiter is None:
+                break
+            retry_in = self.rate_limiter.observe(limit_key, method, resp.status_code, resp.headers, attempt)
+            if retry_in is None:
+                break
+            await asyncio.sleep(retry_in)
+            attempt += 1
+        return parse_response(resp)
+
+    # --- Concurrent fan-out ---
+
+    async def list_items_for_stores(
+        self,
+        store_uuids: Iterable[str],
+        return_exceptions: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        list_items(store_uuid) for every store, concurrently: {store_uuid: response}.
+        With return_exceptions=True a failed store maps to its exception instead of
+        cancelling the rest.
+        """
+        uuids = list(dict.fromkeys(store_uuids))
+        results = await asyncio.gather(
+            *(self.list_items(store_uuid=u) for u in uuids),
+            return_exceptions=return_exceptions,
+        )
+        return dict(zip(uuids, results))
+
+    async def catalog(self, return_exceptions: bool = False) -> Dict[str, Any]:
+        """
+        list_stores() then the items of every store, concurrently:
+        {"stores": [...], "items": {store_uuid: [...]}}. With return_exceptions=True a
+        failed store maps to its exception.
+        """
+        stores = (await self.list_stores()).get("stores", [])
+        responses = await self.list_items_for_stores(
+            (s["uuid"] for s in stores),
+            return_exceptions=return_exceptions,
+        )
+        items = {
+            u: r if isinstance(r, BaseException) else r.get("items", [])
+            for u, r in responses.items()
+        }
+        return {"stores": stores, "items": items}
+
+    # --- Health & Auth (no API key required for login/register) ---
+
+    async def health(self) -> str:
+        """GET / — Health check. Returns 'OK'."""
+        return await self._request("GET", "/", auth=False)  # type: ignore
+
+    async def register(self, username: str, password: str) -> str:
+        """POST /register.php — Register a new user. Returns plain text message."""
+        return await self._request(  # type: ignore
+            "POST",
+            "/register.php",
+            data={"username": username, "password": password},
+            auth=False,
+        )
+
+    async def login(self, username: str, password: str) -> str:
+        """
+        POST /login.php — Log in; session cookie is stored on the pooled client.
+        Returns plain text message (e.g. 'Logged in as alice').
+        """
+        return await self._request(  # type: ignore
+            "POST",
+            "/login.php",
+            data={"username": username, "password": password},
+            auth=False,
+        )
+
+    async def logout(self) -> str:
+        """GET /logout.php — Log out. Returns 'Logged out'."""
+        return await self._request("GET", "/logout.php", auth=False)  # type: ignore
+
+    # --- Public API (no auth) ---
+
+    async def list_stores(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/stores.php — List all stores."""
+        return await self._request("GET", "/api/stores.php", auth=False)  # type: ignore
+
+    async def list_items(self, store_uuid: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/items.php — List items, optionally filtered by store_uuid."""
+        params = {}
+        if store_uuid is not None:
+            params["store_uuid"] = store_uuid
+        return await self._request("GET", "/api/items.php", params=params or None, auth=False)  # type: ignore
+
+    # --- Session or API key authenticated ---
+
+    async def create_store(
+        self,
+        storename: str,
+        description: str = "",
+        vendorship_agree: bool = True,
+    ) -> Dict[str, Any]:
+        """POST /api/stores.php — Create a store (requires session)."""
+        return await self._request(  # type: ignore
+            "POST",
+            "/api/stores.php",
+            data={
+                "storename": storename,
+                "description": description,
+                "vendorship_agree": "1" if vendorship_agree else "0",
+            },
+        )
+
+    async def create_item(
+        self,
+        name: str,
+        store_uuid: str,
+        description: str = "",
+    ) -> Dict[str, Any]:
+        """POST /api/items.php — Create an item (requires session)."""
+        return await self._request(  # type: ignore
+            "POST",
+            "/api/items.php",
+            data={
+                "name": name,
+                "store_uuid": store_uuid,
+                "description": description,
+            },
+        )
+
+    async def list_transactions(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/transactions.php — List transactions (API key or session)."""
+        return await self._request("GET", "/api/transactions.php")  # type: ignore
+
+    async def create_transaction(
+        self,
+        package_uuid: str,
+        required_amount: float,
+        chain_id: int = 1,
+        currency: str = "ETH",
+        refund_address: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """POST /api/transactions.php — Create a transaction (requires session)."""
+        data: Dict[str, Any] = {
+            "package_uuid": package_uuid,
+            "required_amount": required_amount,
+            "chain_id": chain_id,
+            "currency": currency,
+        }
+        if refund_address:
+            data["refund_address"] = refund_address
+        return await self._request("POST", "/api/transactions.php", data=data)  # type: ignore
+
+    async def list_keys(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/keys.php — List API keys for current user (requires session)."""
+        return await self._request("GET", "/api/keys.php")  # type: ignore
+
+    async def create_key(self, name: str = "") -> Dict[str, Any]:
+        """
+        POST /api/keys.php — Create an API key (requires session).
+        Returns dict with 'api_key' — save it; it cannot be retrieved later.
+        """
+        return await self._request(  # type: ignore
+            "POST",
+            "/api/keys.php",
+            data={"name": name} if name else {},
+        )
+
+    async def revoke_key(self, key_id: int) -> Dict[str, Any]:
+        """POST /api/keys-revoke.php — Revoke an API key (requires session)."""
+        return await self._request("POST", "/api/keys-revoke.php", data={"id": key_id})  # type: ignore
+
+    async def get_auth_user(self) -> Dict[str, Any]:
+        """GET /api/auth-user.php — Current user for API key (requires API key)."""
+        return await self._request("GET", "/api/auth-user.php")  # type: ignore
+
+    async def list_deposits(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/deposits.php — List deposits for current user's stores (requires session)."""
+        return await self._request("GET", "/api/deposits.php")  # type: ignore
+
+    async def list_disputes(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /api/disputes.php — List disputes (requires session)."""
+        return await self._request("GET", "/api/disputes.php")  # type: ignore
+
+    # --- Admin (session, admin role) ---
+
+    async def get_config(self) -> Dict[str, Any]:
+        """GET /admin/config.php — Get system config (admin)."""
+        return await self._request("GET", "/admin/config.php")  # type: ignore
+
+    async def update_config(self, **kwargs: str) -> Dict[str, Any]:
+        """POST /admin/config.php — Update config (admin). Pass keys as keyword args."""
+        return await self._request("POST", "/admin/config.php", data=kwargs)  # type: ignore
+
+    async def list_tokens(self) -> Dict[str, List[Dict[str, Any]]]:
+        """GET /admin/tokens.php — List accepted tokens (admin)."""
+        return await self._request("GET", "/admin/tokens.php")  # type: ignore
+
+    async def add_token(
+        self,
+        chain_id: int,
+        symbol: str,
+        contract_address: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """POST /admin/tokens.php — Add accepted token (admin)."""
+        data: Dict[str, Any] = {"chain_id": chain_id, "symbol": symbol}
+        if contract_address:
+            data["contract_address"] = contract_address
+        return await self._request("POST", "/admin/tokens.php", data=data)  # type: ignore
+
+    async def remove_token(self, token_id: int) -> Dict[str, Any]:
+        """POST /admin/tokens-remove.php — Remove accepted token (admin)."""
+        return await self._request("POST", "/admin/tokens-remove.php", data={"id": token_id})  # type: ignore
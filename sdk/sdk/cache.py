@@ -0,0 +1,269 @@
+"""
+Opt-in response cache for MarketplaceClient.
+
+Successful GET responses are kept per (method, path, params, API key, session cookies) for a
+per-endpoint TTL; only paths listed in `ttls` are cached. When the server sent an ETag or Last-Modified,
+an expired entry is revalidated with If-None-Match / If-Modified-Since and a 304 renews it
+without a body. Entries live in an in-process LRU (MemoryBackend) or, to share them between
+processes, in a SQLite file (SQLiteBackend).
+
+    cache = ResponseCache(ttls={"/api/stores.php": 300, "/api/items.php": 60})
+    client = MarketplaceClient(base_url, cache=cache)
+    client.list_stores(); client.list_stores()
+    cache.stats()  # {"hits": 1, "misses": 1, "revalidated": 0, ...}
+
+Cached bodies are returned as-is (the same objects on repeat hits): treat them as read-only.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+# Public catalog endpoints; anything else is fetched every time unless listed in ttls
+DEFAULT_TTLS: Dict[str, float] = {
+    "/api/stores.php": 60.0,
+    "/api/items.php": 60.0,
+}
+DEFAULT_MAX_ENTRIES = 256
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Short stable id of an API key, safe to store or log."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def session_identity(cookies: Any) -> Optional[str]:
+    """The cookies of a requests cookie jar as one stable string; None when the jar is empty."""
+    return "\n".join(sorted(f"{c.domain}\t{c.path}\t{c.name}={c.value}" for c in cookies)) or None
+
+
+class CacheEntry:
+    """A cached body with its validators; expires_at is a time.time() timestamp."""
+
+    __slots__ = ("body", "etag", "last_modified", "expires_at")
+
+    def __init__(
+        self,
+        body: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires_at: float = 0.0,
+    ) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        h: Dict[str, str] = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+
+class MemoryBackend:
+    """In-process LRU of at most max_entries entries."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Entries in a SQLite file, shared by every process that opens the same path. LRU by
+    last access time, trimmed to max_entries on write. Bodies are stored as JSON, so a hit
+    costs a lookup and a json.loads.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        body = json.dumps(entry.body, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses (key, body, etag, last_modified, expires_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (key, body, entry.etag, entry.last_modified, entry.expires_at, time.time()),
+            )
+            removed = self._conn.execute(
+                """DELETE FROM responses WHERE key NOT IN
+                   (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)""",
+                (self.max_entries,),
+            ).rowcount
+            self.evictions += max(0, removed)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Decides what MarketplaceClient caches and counts the outcomes:
+    hits (fresh entry, no request), misses (nothing usable cached), revalidated (304 on
+    a conditional request) and stores (entries written).
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        backend: Any = None,
+    ) -> None:
+        """
+        Args:
+            ttls: {path: seconds} of cacheable GET endpoints (default DEFAULT_TTLS).
+            max_entries: LRU size of the default MemoryBackend.
+            backend: MemoryBackend or SQLiteBackend (or anything with get/set/delete_prefix/clear).
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.backend = backend if backend is not None else MemoryBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+
+    def key(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, Any]] = None,
+        api_key: Optional[str] = None,
+        session: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Cache key of a request, or None when the request is not cacheable. session is the
+        session_identity() of the cookies the request carries: a logged-in user may see other
+        rows than an anonymous one, so each session gets its own entries.
+        """
+        if method.upper() != "GET" or path not in self.ttls:
+            return None
+        query = "&".join(f"{k}={params[k]}" for k in sorted(params or {}))
+        # Responses may depend on who asks; keep keys and cookies out of the (possibly shared) store
+        who = [key_fingerprint(api_key)] if api_key else []
+        if session:
+            who.append(f"s:{key_fingerprint(session)}")
+        return f"GET {path}?{query} {' '.join(who)}"
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """The stored entry, fresh or not (a stale one may still be revalidated)."""
+        return self.backend.get(key)
+
+    def store(
+        self,
+        key: str,
+        path: str,
+        body: Any,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        headers = headers or {}
+        entry = CacheEntry(
+            body,
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+            time.time() + self.ttls[path],
+        )
+        self.backend.set(key, entry)
+        self.stores += 1
+
+    def renew(self, key: str, path: str, entry: CacheEntry) -> None:
+        """Extend an entry the server confirmed unchanged (304)."""
+        entry.expires_at = time.time() + self.ttls[path]
+        self.backend.set(key, entry)
+        self.revalidated += 1
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop every entry (path=None) or every entry for path."""
+        if path is None:
+            self.backend.clear()
+        else:
+            self.backend.delete_prefix(f"GET {path}?")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.revalidated
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stores": self.stores,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "entries": len(self.backend),
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+        }
@@ -5,9 +5,10 @@ Supports API key authentication (recommended for server/script use) and
 session authentication (login + cookies for endpoints that require session).
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import requests
 
+from .cache import ResponseCache, key_fingerprint, session_identity
 from .exceptions import (
     ConflictError,
     ForbiddenError,
@@ -18,10 +19,59 @@ from .exceptions import (
     UnauthorizedError,
     ValidationError,
 )
+from .ratelimit import RateLimiter
+from .stream import DEFAULT_CHUNK_SIZE, iter_json_array
 
 # Default base URL; override with base_url in constructor
 DEFAULT_BASE_URL = "http://localhost"
 
+# HTTP status -> exception raised for it (5xx is ServerError, anything else MarketplaceAPIError)
+STATUS_ERRORS = {
+    400: ValidationError,
+    401: UnauthorizedError,
+    403: ForbiddenError,
+    404: NotFoundError,
+    409: ConflictError,
+    429: RateLimitError,
+}
+
+
+def error_for_status(status_code: int, message: str, body: Any = None) -> MarketplaceAPIError:
+    """The typed exception for an error response."""
+    if status_code in STATUS_ERRORS:
+        return STATUS_ERRORS[status_code](message, status_code, body)
+    if 500 <= status_code < 600:
+        return ServerError(message, status_code, body)
+    return MarketplaceAPIError(message, status_code, body)
+
+
+def parse_response(resp: Any) -> Any:
+    """
+    Decode a response or raise its typed exception. Works on any response with
+    status_code, headers, text and json() (requests and httpx both qualify).
+    """
+    ok = resp.status_code < 400
+    # Plain text responses (health, login, register, logout)
+    if "application/json" not in (resp.headers.get("Content-Type") or ""):
+        if ok:
+            return resp.text.strip()
+        raise MarketplaceAPIError(
+            resp.text or f"HTTP {resp.status_code}",
+            status_code=resp.status_code,
+            response_body=resp.text,
+        )
+
+    try:
+        body = resp.json()
+    except Exception:
+        body = None
+
+    if ok:
+        return body
+
+    msg = (body or {}).get("error", resp.text or f"HTTP {resp.status_code}")
+    raise error_for_status(resp.status_code, msg, body)
+
 
 class MarketplaceClient:
     """
@@ -38,6 +88,8 @@ class MarketplaceClient:
         api_key: Optional[str] = None,
         session: Optional[requests.Session] = None,
         timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ) -> None:
         """
         Args:
@@ -45,11 +97,15 @@ class MarketplaceClient:
             api_key: Optional API key (Bearer). Use for API key–authenticated endpoints.
             session: Optional requests.Session (e.g. with cookies after login).
             timeout: Request timeout in seconds.
+            cache: Optional ResponseCache for GETs of its endpoints (default: catalog only).
+            rate_limiter: Optional RateLimiter pacing API-key requests and retrying 429'd GETs.
         """
         self._base = base_url.rstrip("/")
         self._api_key = api_key
         self._session = session or requests.Session()
         self._timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
 
     def _headers(self, auth: bool = True) -> Dict[str, str]:
         h: Dict[str, str] = {}
@@ -58,70 +114,128 @@ class MarketplaceClient:
             h["X-API-Key"] = self._api_key
         return h
 
-    def _request(
+    def _send(
         self,
         method: str,
-        path: str,
-        *,
-        params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-        auth: bool = True,
-    ) -> Any:
-        url = f"{self._base}{path}"
-        headers = self._headers(auth=auth)
+        url: str,
+        params: Optional[Dict[str, Any]],
+        data: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+        stream: bool = False,
+    ) -> requests.Response:
         if data is not None:
             # API expects form-encoded for POST
-            resp = self._session.request(
+            return self._session.request(
                 method,
                 url,
                 params=params,
                 data=data,
                 headers=headers,
                 timeout=self._timeout,
+                stream=stream,
             )
-        else:
-            resp = self._session.request(
-                method,
-                url,
-                params=params,
-                headers=headers,
-                timeout=self._timeout,
-            )
+        return self._session.request(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            timeout=self._timeout,
+            stream=stream,
+        )
 
-        # Plain text responses (health, login, register, logout)
-        if "application/json" not in (resp.headers.get("Content-Type") or ""):
-            if resp.ok:
-                return resp.text.strip()
-            raise MarketplaceAPIError(
-                resp.text or f"HTTP {resp.status_code}",
-                status_code=resp.status_code,
-                response_body=resp.text,
-            )
+    def _send_paced(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        data: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+        auth: bool,
+        stream: bool = False,
+    ) -> requests.Response:
+        """_send() through the rate limiter (if any), retrying what it allows."""
+        limit_key = key_fingerprint(self._api_key) if auth and self._api_key else None
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(limit_key)
+            resp = self._send(method, url, params, data, headers, stream)
+            if self.rate_limiter is None:
+                return resp
+            delay = self.rate_limiter.observe(limit_key, method, resp.status_code, resp.headers, attempt)
+            if delay is None:
+                return resp
+            resp.close()
+            self.rate_limiter.sleep(delay)
+            attempt += 1
 
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        auth: bool = True,
+    ) -> Any:
+        url = f"{self._base}{path}"
+        headers = self._headers(auth=auth)
+        cache_key = None
+        entry = None
+        if self.cache is not None:
+            # The session sends its cookies on every request, auth or not
+            cache_key = self.cache.key(method, path, params, self._api_key if auth else None,
+                                       session_identity(self._session.cookies))
+            if cache_key is None and path in self.cache.ttls:
+                # A write to a cached endpoint (e.g. create_item) makes its listings stale
+                self.cache.invalidate(path)
+        if cache_key is not None:
+            entry = self.cache.lookup(cache_key)
+            if entry is not None and entry.fresh():
+                self.cache.hits += 1
+                return entry.body
+            if entry is not None:
+                headers.update(entry.validators())
+        resp = self._send_paced(method, url, params, data, headers, auth)
+
+        if cache_key is None:
+            return parse_response(resp)
+        if resp.status_code == 304 and entry is not None:
+            self.cache.renew(cache_key, path, entry)
+            return entry.body
+        self.cache.misses += 1
+        body = parse_response(resp)
+        if isinstance(body, (dict, list)):
+            self.cache.store(cache_key, path, body, resp.headers)
+        return body
+
+    def _iter(
+        self,
+        path: str,
+        key: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        auth: bool = True,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """GET path and yield the rows under key as they arrive (see sdk.stream); bypasses the cache."""
+        resp = self._send_paced("GET", f"{self._base}{path}", params, None, self._headers(auth=auth), auth, stream=True)
         try:
-            body = resp.json()
-        except Exception:
-            body = None
-
-        if resp.ok:
-            return body
-
-        msg = (body or {}).get("error", resp.text or f"HTTP {resp.status_code}")
-        if resp.status_code == 400:
-            raise ValidationError(msg, resp.status_code, body)
-        if resp.status_code == 401:
-            raise UnauthorizedError(msg, resp.status_code, body)
-        if resp.status_code == 403:
-            raise ForbiddenError(msg, resp.status_code, body)
-        if resp.status_code == 404:
-            raise NotFoundError(msg, resp.status_code, body)
-        if resp.status_code == 409:
-            raise ConflictError(msg, resp.status_code, body)
-        if resp.status_code == 429:
-            raise RateLimitError(msg, resp.status_code, body)
-        if 500 <= resp.status_code < 600:
-            raise ServerError(msg, resp.status_code, body)
-        raise MarketplaceAPIError(msg, resp.status_code, body)
+            if resp.status_code >= 400 or "application/json" not in (resp.headers.get("Content-Type") or ""):
+                # Errors and plain-text answers are small: decode them the usual way
+                parse_response(resp)
+                raise MarketplaceAPIError(
+                    f"expected a JSON list from {path}",
+                    status_code=resp.status_code,
+                    response_body=resp.text,
+                )
+            chunks = resp.iter_content(chunk_size=chunk_size)
+            yield from iter_json_array(chunks, key)
+            # Read the closing "}" so the connection goes back to the pool
+            for _ in chunks:
+                pass
+        finally:
+            resp.close()
 
     # --- Health & Auth (no API key required for login/register) ---
 
@@ -167,6 +281,11 @@ class MarketplaceClient:
             params["store_uuid"] = store_uuid
         return self._request("GET", "/api/items.php", params=params or None, auth=False)  # type: ignore
 
+    def iter_items(self, store_uuid: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """GET /api/items.php — Yield items one at a time while the response streams in."""
+        params = {"store_uuid": store_uuid} if store_uuid is not None else None
+        return self._iter("/api/items.php", "items", params=params, auth=False)
+
     # --- Session or API key authenticated ---
 
     def create_store(
@@ -207,6 +326,10 @@ class MarketplaceClient:
         """GET /api/transactions.php — List transactions (API key or session)."""
         return self._request("GET", "/api/transactions.php")  # type: ignore
 
+    def iter_transactions(self) -> Iterator[Dict[str, Any]]:
+        """GET /api/transactions.php — Yield transactions one at a time while the response streams in."""
+        return self._iter("/api/transactions.php", "transactions")
+
     def create_transaction(
         self,
         package_uuid: str,
@@ -253,10 +376,18 @@ class MarketplaceClient:
         """GET /api/deposits.php — List deposits for current user's stores (requires session)."""
         return self._request("GET", "/api/deposits.php")  # type: ignore
 
+    def iter_deposits(self) -> Iterator[Dict[str, Any]]:
+        """GET /api/deposits.php — Yield deposits one at a time while the response streams in."""
+        return self._iter("/api/deposits.php", "deposits")
+
     def list_disputes(self) -> Dict[str, List[Dict[str, Any]]]:
         """GET /api/disputes.php — List disputes (requires session)."""
         return self._request("GET", "/api/disputes.php")  # type: ignore
 
+    def iter_disputes(self) -> Iterator[Dict[str, Any]]:
+        """GET /api/disputes.php — Yield disputes one at a time while the response streams in."""
+        return self._iter("/api/disputes.php", "disputes")
+
     # --- Admin (session, admin role) ---
 
     def get_config(self) -> Dict[str, Any]:
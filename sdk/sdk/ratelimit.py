@@ -0,0 +1,211 @@
+"""
+Client-side rate limiting for the Marketplace clients.
+
+The server allows 60 requests per rolling minute per API key (ApiKey::RATE_LIMIT_PER_MIN)
+and answers 429 beyond that. RateLimiter keeps the same sliding window per API key, so a
+client paces itself instead of finding the limit by hitting it:
+
+    limiter = RateLimiter()                      # share one limiter between clients of a key
+    client = MarketplaceClient(base_url, api_key=key, rate_limiter=limiter)
+
+The window adapts: a 429 halves the allowed rate for that key (other processes may share
+it) and pauses it for Retry-After, or for an exponential backoff when the server sends
+none; successful responses raise it again by one per window's worth, up to the ceiling.
+RateLimit-* / X-RateLimit-* headers, when present, set the ceiling and pause an exhausted
+key until its reset. Idempotent requests (GET, HEAD) that got a 429 are retried up to
+max_retries times; others raise RateLimitError as before.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional
+
+DEFAULT_LIMIT = 60
+DEFAULT_WINDOW = 60.0
+# The server stores request times in whole seconds; leave that much slack at the window edge
+DEFAULT_MARGIN = 1.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After as seconds from now (delta-seconds or HTTP-date), None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value:
+            return value
+    return None
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        # IETF RateLimit headers may carry parameters: "60;w=60"
+        return float(value.split(";")[0].split(",")[0]) if value else None
+    except ValueError:
+        return None
+
+
+class _KeyState:
+    __slots__ = ("sent", "limit", "ceiling", "paused_until")
+
+    def __init__(self, limit: int) -> None:
+        self.sent: "deque[float]" = deque()
+        self.limit = float(limit)
+        self.ceiling = float(limit)
+        self.paused_until = 0.0
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter per API key that adapts to responses (see module docstring).
+    Thread-safe; reserve() never blocks, so the async client can sleep on the event loop.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        window: float = DEFAULT_WINDOW,
+        margin: float = DEFAULT_MARGIN,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ) -> None:
+        """
+        Args:
+            limit: Requests per window per key (the server's limit).
+            window: Window length in seconds.
+            margin: Seconds added to the window before a slot is reused.
+            max_retries: Retries of an idempotent request answered 429.
+            backoff: First retry delay when the server sends no Retry-After; doubles per retry.
+            max_backoff: Cap on any single pause or retry delay.
+            clock, sleep: Monotonic time source and the blocking sleep the sync client waits with.
+        """
+        self.limit = max(1, int(limit))
+        self.window = float(window)
+        self.margin = float(margin)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self._clock = clock
+        self.sleep = sleep
+        self._keys: Dict[str, _KeyState] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.waited = 0.0
+
+    def _state(self, key: str) -> _KeyState:
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _KeyState(self.limit)
+        return state
+
+    def reserve(self, key: Optional[str]) -> float:
+        """
+        Claim the next send slot for key (None: not limited); returns the seconds to wait
+        before sending.
+        """
+        with self._lock:
+            self.requests += 1
+            if key is None:
+                return 0.0
+            state = self._state(key)
+            now = self._clock()
+            span = self.window + self.margin
+            while state.sent and state.sent[0] <= now - span:
+                state.sent.popleft()
+            at = max(now, state.paused_until)
+            allowed = max(1, int(state.limit))
+            if len(state.sent) >= allowed:
+                # The slot frees up when the allowed-th most recent send leaves the window
+                at = max(at, state.sent[-allowed] + span)
+            state.sent.append(at)
+            delay = at - now
+            self.waited += delay
+            return delay
+
+    def acquire(self, key: Optional[str]) -> float:
+        """reserve() and sleep until the slot; returns the seconds waited."""
+        delay = self.reserve(key)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def observe(
+        self,
+        key: Optional[str],
+        method: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        attempt: int = 0,
+    ) -> Optional[float]:
+        """
+        Adapt to a response. Returns the seconds to wait before sending the request again, or
+        None when it must not be retried; attempt is the number of retries already made.
+        """
+        retry_after = retry_after_seconds(_header(headers, "Retry-After"))
+        with self._lock:
+            state = self._state(key) if key is not None else None
+            now = self._clock()
+            if state is not None:
+                ceiling = _number(_header(headers, "RateLimit-Limit", "X-RateLimit-Limit"))
+                if ceiling and ceiling >= 1:
+                    state.ceiling = ceiling
+                    state.limit = min(state.limit, ceiling)
+                remaining = _number(_header(headers, "RateLimit-Remaining", "X-RateLimit-Remaining"))
+                reset = _number(_header(headers, "RateLimit-Reset", "X-RateLimit-Reset"))
+                if remaining is not None and remaining <= 0 and reset is not None:
+                    # Epoch seconds (X-RateLimit-Reset) or seconds from now (RateLimit-Reset)
+                    wait = reset - time.time() if reset > 1e9 else reset
+                    state.paused_until = max(state.paused_until, now + min(max(0.0, wait), self.max_backoff))
+            if status_code != 429:
+                if state is not None:
+                    state.limit = min(state.ceiling, state.limit + 1 / state.limit)
+                return None
+            self.throttled += 1
+            if retry_after is None:
+                delay = self.backoff * (2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+            else:
+                delay = retry_after
+            delay = min(delay, self.max_backoff)
+            if state is not None:
+                state.limit = max(1.0, state.limit / 2)
+                state.paused_until = max(state.paused_until, now + delay)
+            if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                return None
+            self.retries += 1
+            return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "waited_seconds": round(self.waited, 3),
+                "limits": {k: round(s.limit, 2) for k, s in self._keys.items()},
+            }
@@ -0,0 +1,114 @@
+"""
+Incremental parsing of the list endpoints' {"<key>": [ ... ]} responses.
+
+The API returns every row in one JSON document (there is no pagination), so the iter_*
+methods of MarketplaceClient read the body in chunks and decode one array element at a
+time with json.JSONDecoder.raw_decode. Only the element being decoded (plus one chunk) is
+held in memory, and the first row is available as soon as its bytes have arrived.
+"""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Union
+
+from .exceptions import MarketplaceAPIError
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+# What may follow a complete value; anything else means a number was cut ("1." + "5")
+_AFTER_VALUE = _WHITESPACE + ",]}:"
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text decoded so far from the chunk iterator, consumed from the front."""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk; False at the end of the body."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = chunk if isinstance(chunk, str) else self._utf8.decode(chunk)
+            if text:
+                # Drop what has been consumed so the buffer stays about one element long
+                self.text = self.text[self.pos:] + text
+                self.pos = 0
+                return True
+        self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def skip_whitespace(self) -> str:
+        """The next non-whitespace character, '' at the end of the body."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.skip_whitespace()
+        if found != char:
+            raise MarketplaceAPIError(f"unexpected JSON in response: expected {char!r}, got {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the JSON value at the cursor, reading more chunks until it is complete."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise MarketplaceAPIError("truncated JSON in response")
+            # A number ending at (or cut before) the buffer edge may continue in the next chunk
+            if (end == len(self.text) or self.text[end] not in _AFTER_VALUE) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]], key: str) -> Iterator[Any]:
+    """
+    Yield the elements of the array under `key` in a top-level JSON object, decoding the
+    chunks (bytes as UTF-8, or str) incrementally. Other members are decoded and skipped.
+    Raises MarketplaceAPIError when the document is malformed or has no such array.
+    """
+    buf = _Buffer(chunks)
+    buf.expect("{")
+    if buf.skip_whitespace() == "}":
+        raise MarketplaceAPIError(f"response has no {key!r} array")
+    while True:
+        name = buf.value()
+        buf.expect(":")
+        if name != key:
+            buf.value()
+        else:
+            buf.expect("[")
+            if buf.skip_whitespace() == "]":
+                return
+            while True:
+                yield buf.value()
+                nxt = buf.skip_whitespace()
+                buf.pos += 1
+                if nxt == "]":
+                    return
+                if nxt != ",":
+                    raise MarketplaceAPIError(f"unexpected JSON in response: expected ',' or ']', got {nxt!r}")
+        nxt = buf.skip_whitespace()
+        buf.pos += 1
+        if nxt == "}":
+            raise MarketplaceAPIError(f"response has no {key!r} array")
+        if nxt != ",":
+            raise MarketplaceAPIError(f"unexpected JSON in response: expected ',' or '}}', got {nxt!r}")
@@ -0,0 +1,71 @@
+"""A requests.Session stand-in that answers from a queue of canned responses and records each request."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class FakeResponse:
+    """The parts of requests.Response the clients read."""
+
+    def __init__(self, status_code: int = 200, body: Any = None, headers: Optional[Dict[str, str]] = None) -> None:
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        if isinstance(body, str):
+            self.text = body
+            self.headers.setdefault("Content-Type", "text/html")
+        else:
+            self.text = json.dumps(body)
+            self.headers.setdefault("Content-Type", "application/json")
+        self.closed = False
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size: int = 1):
+        data = self.text.encode("utf-8")
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeSession(requests.Session):
+    """
+    Answers request() with the queued responses in order; requests holds (method, url, kwargs)
+    per call. A response's `cookies` option ({name: value}) is set on the jar, like Set-Cookie.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.queue: List[tuple] = []
+        self.requests: List[tuple] = []
+
+    def respond(self, status_code: int = 200, body: Any = None, headers: Optional[Dict[str, str]] = None,
+                cookies: Optional[Dict[str, str]] = None) -> "FakeSession":
+        self.queue.append((FakeResponse(status_code, body, headers), cookies or {}))
+        return self
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        if not self.queue:
+            raise AssertionError(f"unexpected request {method} {url}")
+        resp, cookies = self.queue.pop(0)
+        for name, value in cookies.items():
+            self.cookies.set(name, value, domain="", path="/")
+        return resp
+
+
+@pytest.fixture
+def session() -> FakeSession:
+    return FakeSession()
+
+
+@pytest.fixture
+def new_session():
+    """Factory for more FakeSessions (e.g. a second user) in one test."""
+    return FakeSession
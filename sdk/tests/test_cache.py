@@ -0,0 +1,130 @@
+"""sdk.cache.ResponseCache behind MarketplaceClient: TTL, ETag revalidation, invalidation and per-caller keys."""
+
+import time
+
+import pytest
+
+from sdk import MarketplaceClient, ResponseCache, SQLiteBackend
+from sdk.cache import key_fingerprint
+
+STORES = {"stores": [{"uuid": "s1"}]}
+
+
+class FakeTime:
+    """Stands in for the time module in sdk.cache: time() is set by the test."""
+
+    def __init__(self) -> None:
+        self.now = time.time()
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeTime:
+    fake = FakeTime()
+    monkeypatch.setattr("sdk.cache.time", fake)
+    return fake
+
+
+def _client(session, cache, **kwargs) -> MarketplaceClient:
+    return MarketplaceClient("http://api", session=session, cache=cache, **kwargs)
+
+
+def test_fresh_entry_is_served_without_a_request(session, clock):
+    cache = ResponseCache()
+    session.respond(200, STORES)
+    client = _client(session, cache)
+    assert client.list_stores() == STORES
+    assert client.list_stores() is client.list_stores()
+    assert len(session.requests) == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_expired_entry_is_fetched_again(session, clock):
+    cache = ResponseCache(ttls={"/api/stores.php": 60})
+    session.respond(200, STORES).respond(200, {"stores": []})
+    client = _client(session, cache)
+    client.list_stores()
+    clock.now += 59
+    assert client.list_stores() == STORES
+    clock.now += 2
+    assert client.list_stores() == {"stores": []}
+    assert len(session.requests) == 2
+    # No validators were sent: the first response had none
+    assert "If-None-Match" not in session.requests[1][2]["headers"]
+
+
+def test_etag_304_reuses_the_cached_body(session, clock):
+    cache = ResponseCache(ttls={"/api/stores.php": 60})
+    session.respond(200, STORES, {"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    session.respond(304, "")
+    client = _client(session, cache)
+    first = client.list_stores()
+    clock.now += 61
+    assert client.list_stores() is first
+    headers = session.requests[1][2]["headers"]
+    assert headers["If-None-Match"] == '"v1"' and headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert cache.stats()["revalidated"] == 1
+    # The 304 renewed the entry for another TTL
+    clock.now += 59
+    assert client.list_stores() is first and len(session.requests) == 2
+
+
+def test_post_invalidates_the_path_by_prefix(session, clock):
+    cache = ResponseCache()
+    session.respond(200, {"items": [1]}).respond(200, {"items": [2]}).respond(200, STORES)
+    client = _client(session, cache)
+    client.list_items()
+    client.list_items(store_uuid="s1")
+    client.list_stores()
+    assert len(cache.backend) == 3
+    session.respond(200, {"uuid": "i1"})
+    client.create_item("Tea", "s1")
+    # Every listing of the written path is dropped, with or without params; other paths stay
+    assert len(cache.backend) == 1
+    session.respond(200, {"items": [1, 3]})
+    assert client.list_items() == {"items": [1, 3]}
+    assert client.list_stores() == STORES and len(session.requests) == 5
+
+
+def test_key_holds_fingerprints_not_secrets():
+    cache = ResponseCache(ttls={"/api/transactions.php": 60})
+    key = cache.key("GET", "/api/transactions.php", None, "secret-key", "PHPSESSID=abc")
+    assert "secret-key" not in key and "abc" not in key
+    assert key_fingerprint("secret-key") in key and key_fingerprint("PHPSESSID=abc") in key
+    assert cache.key("GET", "/api/transactions.php", None, "other-key") != cache.key("GET", "/api/transactions.php", None, "secret-key")
+    assert cache.key("POST", "/api/transactions.php") is None and cache.key("GET", "/api/keys.php") is None
+
+
+def test_sessions_never_share_an_entry(session, new_session, clock):
+    cache = ResponseCache()
+    alice, bob = session, new_session()
+    alice.cookies.set("PHPSESSID", "alice")
+    bob.cookies.set("PHPSESSID", "bob")
+    alice.respond(200, {"stores": ["alice's view"]})
+    bob.respond(200, {"stores": ["bob's view"]})
+    anonymous = new_session().respond(200, {"stores": ["public"]})
+    assert _client(alice, cache).list_stores() == {"stores": ["alice's view"]}
+    assert _client(bob, cache).list_stores() == {"stores": ["bob's view"]}
+    assert _client(anonymous, cache).list_stores() == {"stores": ["public"]}
+    assert _client(alice, cache).list_stores() == {"stores": ["alice's view"]}
+    assert len(cache.backend) == 3 and (len(alice.requests), len(bob.requests)) == (1, 1)
+
+
+def test_api_keys_never_share_an_entry(session, clock):
+    cache = ResponseCache(ttls={"/api/transactions.php": 60})
+    session.respond(200, {"transactions": ["a"]}).respond(200, {"transactions": ["b"]})
+    assert _client(session, cache, api_key="key-a").list_transactions() == {"transactions": ["a"]}
+    assert _client(session, cache, api_key="key-b").list_transactions() == {"transactions": ["b"]}
+    assert _client(session, cache, api_key="key-a").list_transactions() == {"transactions": ["a"]}
+    assert len(session.requests) == 2
+
+
+def test_sqlite_backend_is_shared_between_caches(session, clock, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    session.respond(200, STORES, {"ETag": '"v1"'})
+    _client(session, ResponseCache(backend=SQLiteBackend(path))).list_stores()
+    # A second process opening the same file gets the entry without a request
+    assert _client(session, ResponseCache(backend=SQLiteBackend(path))).list_stores() == STORES
+    assert len(session.requests) == 1
@@ -0,0 +1,122 @@
+"""sdk.ratelimit.RateLimiter on a fake clock, and how MarketplaceClient retries through it."""
+
+import time
+from email.utils import formatdate
+
+import pytest
+
+from sdk import MarketplaceClient
+from sdk.exceptions import RateLimitError
+from sdk.ratelimit import RateLimiter, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def _limiter(clock, **kwargs) -> RateLimiter:
+    options = dict(limit=4, window=10.0, margin=1.0, clock=clock, sleep=clock.sleep)
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def test_sliding_window_paces_a_key(clock):
+    limiter = _limiter(clock)
+    assert [limiter.reserve("k") for _ in range(4)] == [0.0] * 4
+    # The fifth send waits until the first leaves window + margin
+    assert limiter.reserve("k") == 11.0
+    assert limiter.reserve(None) == 0.0 and limiter.reserve("other") == 0.0
+
+
+def test_429_halves_the_rate_and_successes_recover_it(clock):
+    limiter = _limiter(clock, limit=8)
+    limiter.observe("k", "GET", 429, {"Retry-After": "0"})
+    assert limiter.stats()["limits"] == {"k": 4.0}
+    limiter.observe("k", "GET", 429, {"Retry-After": "0"})
+    assert limiter.stats()["limits"] == {"k": 2.0}
+    # Additive increase: one step of 1/limit per success, never past the ceiling
+    limiter.observe("k", "GET", 200, {})
+    assert limiter.stats()["limits"] == {"k": 2.5}
+    for _ in range(200):
+        limiter.observe("k", "GET", 200, {})
+    assert limiter.stats()["limits"] == {"k": 8.0}
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_retry_after_seconds(clock):
+    limiter = _limiter(clock)
+    assert limiter.observe("k", "GET", 429, {"Retry-After": "7"}) == 7.0
+    # The key is paused for that long
+    assert limiter.reserve("k") == 7.0
+
+
+def test_retry_after_http_date(clock):
+    now = time.time()
+    assert retry_after_seconds(formatdate(now + 30, usegmt=True), now=now) == pytest.approx(30, abs=1)
+    assert retry_after_seconds(formatdate(now - 30, usegmt=True), now=now) == 0.0
+    assert retry_after_seconds("soon") is None and retry_after_seconds(None) is None
+    delay = _limiter(clock, max_backoff=300).observe("k", "GET", 429, {"Retry-After": formatdate(now + 120, usegmt=True)})
+    assert 115 <= delay <= 121
+
+
+def test_backoff_without_retry_after(clock):
+    limiter = _limiter(clock, backoff=2.0)
+    assert 2.0 <= limiter.observe("k", "GET", 429, {}, attempt=0) <= 3.0
+    assert 8.0 <= limiter.observe("k", "GET", 429, {}, attempt=2) <= 12.0
+
+
+def test_ratelimit_reset_as_delta(clock):
+    limiter = _limiter(clock)
+    assert limiter.observe("k", "GET", 200, {"RateLimit-Remaining": "0", "RateLimit-Reset": "5"}) is None
+    assert limiter.reserve("k") == 5.0
+
+
+def test_ratelimit_reset_as_epoch(clock):
+    limiter = _limiter(clock)
+    reset = str(int(time.time()) + 20)
+    limiter.observe("k", "GET", 200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})
+    assert 18.0 <= limiter.reserve("k") <= 20.0
+
+
+def test_ratelimit_limit_sets_the_ceiling(clock):
+    limiter = _limiter(clock, limit=60)
+    limiter.observe("k", "GET", 200, {"RateLimit-Limit": "10;w=60", "RateLimit-Remaining": "9"})
+    assert limiter.stats()["limits"] == {"k": 10.0}
+
+
+def test_non_idempotent_methods_are_never_retried(clock):
+    limiter = _limiter(clock)
+    for method in ("POST", "PUT", "DELETE", "PATCH"):
+        assert limiter.observe("k", method, 429, {"Retry-After": "1"}) is None
+    assert limiter.observe("k", "HEAD", 429, {"Retry-After": "1"}) == 1.0
+    # GETs stop after max_retries
+    assert limiter.observe("k", "GET", 429, {"Retry-After": "1"}, attempt=limiter.max_retries) is None
+
+
+def test_client_retries_a_throttled_get(clock, session):
+    session.respond(429, {"error": "slow down"}, {"Retry-After": "3"}).respond(200, {"transactions": []})
+    client = MarketplaceClient("http://api", api_key="key", session=session, rate_limiter=_limiter(clock))
+    assert client.list_transactions() == {"transactions": []}
+    assert len(session.requests) == 2 and clock.slept == [3.0]
+
+
+def test_client_does_not_retry_a_throttled_post(clock, session):
+    session.respond(429, {"error": "slow down"}, {"Retry-After": "3"}).respond(200, {"uuid": "t"})
+    client = MarketplaceClient("http://api", api_key="key", session=session, rate_limiter=_limiter(clock))
+    with pytest.raises(RateLimitError):
+        client.create_transaction("pkg", 0.1)
+    assert len(session.requests) == 1 and clock.slept == []
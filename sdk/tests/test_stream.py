@@ -0,0 +1,56 @@
+"""sdk.stream.iter_json_array over bodies cut into chunks at awkward places."""
+
+import json
+
+import pytest
+
+from sdk.exceptions import MarketplaceAPIError
+from sdk.stream import iter_json_array
+
+
+def _chunks(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_number_split_across_chunks():
+    assert list(iter_json_array([b'{"rows": [1.', b'5, 2', b'0]}'], "rows")) == [1.5, 20]
+
+
+def test_multibyte_character_split_across_chunks():
+    body = json.dumps({"rows": [{"name": "café ☕"}]}, ensure_ascii=False).encode("utf-8")
+    cut = body.index("☕".encode("utf-8")) + 1
+    assert list(iter_json_array([body[:cut], body[cut:]], "rows")) == [{"name": "café ☕"}]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_any_chunk_size_gives_the_same_rows(size):
+    rows = [{"id": i, "price": i / 4, "title": "über", "tags": ["a", None, True]} for i in range(5)]
+    body = json.dumps({"rows": rows}, ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_array(_chunks(body, size), "rows")) == rows
+
+
+def test_empty_array():
+    assert list(iter_json_array([b'{"rows": [ ]}'], "rows")) == []
+
+
+def test_other_members_before_and_after_the_key():
+    body = b'{"count": 2, "meta": {"rows": [9], "next": null}, "rows": [{"x": 1}, {"x": 2}], "after": "z"}'
+    assert list(iter_json_array(_chunks(body, 5), "rows")) == [{"x": 1}, {"x": 2}]
+
+
+@pytest.mark.parametrize("body", [b'{"count": 0}', b"{}"])
+def test_missing_key(body):
+    with pytest.raises(MarketplaceAPIError, match="no 'rows' array"):
+        list(iter_json_array([body], "rows"))
+
+
+def test_truncated_body_raises_after_the_complete_rows():
+    rows = iter_json_array(_chunks(b'{"rows": [{"a": 1}, {"b": ', 4), "rows")
+    assert next(rows) == {"a": 1}
+    with pytest.raises(MarketplaceAPIError, match="truncated"):
+        next(rows)
+
+
+def test_not_an_object():
+    with pytest.raises(MarketplaceAPIError, match="expected '{'"):
+        list(iter_json_array([b"[1, 2]"], "rows"))
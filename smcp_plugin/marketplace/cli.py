@@ -14,7 +14,9 @@ import os
 import sys
 import traceback
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
+
+import requests
 
 # Prefer installed marketplace-sdk; fallback to repo sdk
 try:
@@ -38,6 +40,11 @@ except ImportError:
         ValidationError,
     )
 
+try:
+    from .session_cache import SessionCache, dump_cookies, load_cookies
+except ImportError:
+    from session_cache import SessionCache, dump_cookies, load_cookies
+
 
 def get_base_url(args: Dict[str, Any]) -> str:
     """Resolve base URL from args or env."""
@@ -51,15 +58,79 @@ def get_client_api_key(base_url: str, api_key: str) -> MarketplaceClient:
     return MarketplaceClient(base_url=base_url, api_key=api_key)
 
 
-def get_client_session(base_url: str, username: str, password: str) -> MarketplaceClient:
+def get_client_session(
+    base_url: str,
+    username: str,
+    password: str,
+    session: Optional[requests.Session] = None,
+) -> MarketplaceClient:
     """Build client and log in with session."""
     if not username or not password:
         raise ValueError("Username and password are required for this command")
-    client = MarketplaceClient(base_url=base_url)
+    client = MarketplaceClient(base_url=base_url, session=session)
     client.login(username, password)
     return client
 
 
+def run_session(args: Dict[str, Any], call: Callable[[MarketplaceClient], Any]) -> Any:
+    """
+    call(client) with a logged-in client for args' username/password. A session cached by an
+    earlier invocation (see session_cache) is used as-is; only when the server answers 401 is
+    it replaced by a fresh login and call retried. Cached sessions are kept, not logged out.
+    """
+    base_url = get_base_url(args)
+    username = args.get("username") or ""
+    password = args.get("password") or ""
+    if not username or not password:
+        raise ValueError("Username and password are required for this command")
+    cache = SessionCache.from_env()
+    cookies = cache.get(base_url, username, password) if cache is not None else None
+    if cookies is not None:
+        session = requests.Session()
+        load_cookies(session.cookies, cookies)
+        try:
+            out = call(MarketplaceClient(base_url=base_url, session=session))
+        except UnauthorizedError:
+            # Expired or revoked server-side: log in again below (401 means nothing was done)
+            pass
+        else:
+            if dump_cookies(session.cookies) != cookies:
+                _save_session(cache, base_url, username, password, session)
+            return out
+    session = requests.Session()
+    client = get_client_session(base_url, username, password, session)
+    try:
+        out = call(client)
+    except UnauthorizedError:
+        if cookies is not None:
+            _forget_session(cache, base_url, username)
+        raise
+    if cache is not None:
+        _save_session(cache, base_url, username, password, session)
+    else:
+        # Nothing will reuse it: end it server-side as before
+        try:
+            client.logout()
+        except Exception:
+            pass
+    return out
+
+
+def _save_session(cache: SessionCache, base_url: str, username: str, password: str, session: requests.Session) -> None:
+    # The cache only saves time; a read-only or full disk must not fail the command
+    try:
+        cache.put(base_url, username, password, dump_cookies(session.cookies))
+    except OSError:
+        pass
+
+
+def _forget_session(cache: SessionCache, base_url: str, username: str) -> None:
+    try:
+        cache.forget(base_url, username)
+    except OSError:
+        pass
+
+
 def _err(status: str, error: str, error_type: str = "api_error", **extra: Any) -> Dict[str, Any]:
     return {"status": status, "error": error, "error_type": error_type, **extra}
 
@@ -140,18 +211,14 @@ def list_transactions(args: Dict[str, Any]) -> Dict[str, Any]:
 def create_store(args: Dict[str, Any]) -> Dict[str, Any]:
     """Create a store (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.create_store(
-            storename=args.get("storename") or "",
-            description=args.get("description") or "",
-            vendorship_agree=args.get("vendorship_agree") not in (False, "0", 0),
+        out = run_session(
+            args,
+            lambda client: client.create_store(
+                storename=args.get("storename") or "",
+                description=args.get("description") or "",
+                vendorship_agree=args.get("vendorship_agree") not in (False, "0", 0),
+            ),
         )
-        client.logout()
         return _ok(uuid=out.get("uuid"), message=f"Store created: {out.get('uuid')}")
     except ValidationError as e:
         return _err("error", str(e.message), "validation_error")
@@ -164,18 +231,14 @@ def create_store(args: Dict[str, Any]) -> Dict[str, Any]:
 def create_item(args: Dict[str, Any]) -> Dict[str, Any]:
     """Create an item (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.create_item(
-            name=args.get("name") or "",
-            store_uuid=args.get("store_uuid") or "",
-            description=args.get("description") or "",
+        out = run_session(
+            args,
+            lambda client: client.create_item(
+                name=args.get("name") or "",
+                store_uuid=args.get("store_uuid") or "",
+                description=args.get("description") or "",
+            ),
         )
-        client.logout()
         return _ok(uuid=out.get("uuid"), message=f"Item created: {out.get('uuid')}")
     except ValidationError as e:
         return _err("error", str(e.message), "validation_error")
@@ -188,20 +251,16 @@ def create_item(args: Dict[str, Any]) -> Dict[str, Any]:
 def create_transaction(args: Dict[str, Any]) -> Dict[str, Any]:
     """Create a transaction (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.create_transaction(
-            package_uuid=args.get("package_uuid") or "",
-            required_amount=float(args.get("required_amount", 0)),
-            chain_id=int(args.get("chain_id", 1)),
-            currency=(args.get("currency") or "ETH").strip(),
-            refund_address=args.get("refund_address") or None,
+        out = run_session(
+            args,
+            lambda client: client.create_transaction(
+                package_uuid=args.get("package_uuid") or "",
+                required_amount=float(args.get("required_amount", 0)),
+                chain_id=int(args.get("chain_id", 1)),
+                currency=(args.get("currency") or "ETH").strip(),
+                refund_address=args.get("refund_address") or None,
+            ),
         )
-        client.logout()
         return _ok(
             uuid=out.get("uuid"),
             escrow_address_pending=out.get("escrow_address_pending"),
@@ -220,14 +279,7 @@ def create_transaction(args: Dict[str, Any]) -> Dict[str, Any]:
 def list_keys(args: Dict[str, Any]) -> Dict[str, Any]:
     """List API keys (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.list_keys()
-        client.logout()
+        out = run_session(args, lambda client: client.list_keys())
         return _ok(keys=out.get("keys", []))
     except UnauthorizedError as e:
         return _err("error", str(e.message), "unauthorized")
@@ -238,14 +290,7 @@ def list_keys(args: Dict[str, Any]) -> Dict[str, Any]:
 def create_key(args: Dict[str, Any]) -> Dict[str, Any]:
     """Create API key (session). Returns api_key — save it; it cannot be retrieved later."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.create_key(name=args.get("name") or "")
-        client.logout()
+        out = run_session(args, lambda client: client.create_key(name=args.get("name") or ""))
         return _ok(
             id=out.get("id"),
             name=out.get("name"),
@@ -263,14 +308,7 @@ def create_key(args: Dict[str, Any]) -> Dict[str, Any]:
 def revoke_key(args: Dict[str, Any]) -> Dict[str, Any]:
     """Revoke an API key (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        client.revoke_key(key_id=int(args.get("key_id", 0)))
-        client.logout()
+        run_session(args, lambda client: client.revoke_key(key_id=int(args.get("key_id", 0))))
         return _ok(message="API key revoked")
     except UnauthorizedError as e:
         return _err("error", str(e.message), "unauthorized")
@@ -281,14 +319,7 @@ def revoke_key(args: Dict[str, Any]) -> Dict[str, Any]:
 def list_deposits(args: Dict[str, Any]) -> Dict[str, Any]:
     """List deposits for current user's stores (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.list_deposits()
-        client.logout()
+        out = run_session(args, lambda client: client.list_deposits())
         return _ok(deposits=out.get("deposits", []))
     except UnauthorizedError as e:
         return _err("error", str(e.message), "unauthorized")
@@ -299,14 +330,7 @@ def list_deposits(args: Dict[str, Any]) -> Dict[str, Any]:
 def list_disputes(args: Dict[str, Any]) -> Dict[str, Any]:
     """List disputes (session)."""
     try:
-        base_url = get_base_url(args)
-        client = get_client_session(
-            base_url,
-            args.get("username") or "",
-            args.get("password") or "",
-        )
-        out = client.list_disputes()
-        client.logout()
+        out = run_session(args, lambda client: client.list_disputes())
         return _ok(disputes=out.get("disputes", []))
     except UnauthorizedError as e:
         return _err("error", str(e.message), "unauthorized")
@@ -474,6 +498,7 @@ Available commands:
   list-disputes      List disputes (session)
 
 Auth: Use --api-key for key-authed commands; use --username and --password for session commands.
+Sessions are cached between calls (encrypted; MARKETPLACE_SESSION_CACHE=0 disables).
 Base URL: --base-url or env MARKETPLACE_BASE_URL (default http://localhost)
         """,
     )
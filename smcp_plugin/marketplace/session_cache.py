@@ -0,0 +1,152 @@
+"""
+Session cookie cache for the Marketplace SMCP plugin.
+
+Session commands used to log in (server-side password hash) and log out on every call.
+Instead, the session cookies are kept between invocations, per base URL and username,
+in one JSON file encrypted at rest: each entry is a Fernet token whose key is derived
+with PBKDF2-HMAC-SHA256 from the user's password and a random per-entry salt, so the
+file alone gives access to nothing. Cached sessions are not checked up front: the
+command runs with them and only a 401 from the server triggers a fresh login.
+
+Settings (environment):
+    MARKETPLACE_SESSION_CACHE                path of the cache file, or 0 to disable
+                                             (default ~/.cache/marketplace-smcp/sessions.json)
+    MARKETPLACE_SESSION_KDF_ITERATIONS       PBKDF2 iterations for new entries (default 100000)
+
+Encryption needs the optional `cryptography` package; without it nothing is cached and
+every command logs in as before.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_KDF_ITERATIONS = 100_000
+SALT_BYTES = 16
+
+
+def default_path() -> Optional[Path]:
+    """Cache file from MARKETPLACE_SESSION_CACHE, the default under XDG_CACHE_HOME, or None if disabled."""
+    configured = os.getenv("MARKETPLACE_SESSION_CACHE", "")
+    if configured == "0":
+        return None
+    if configured:
+        return Path(configured).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "marketplace-smcp" / "sessions.json"
+
+
+def _fernet(password: str, salt: bytes, iterations: int):
+    from cryptography.fernet import Fernet
+
+    key = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def dump_cookies(jar: Any) -> List[Dict[str, Any]]:
+    """requests cookie jar -> JSON-able list."""
+    return [
+        {
+            "name": c.name,
+            "value": c.value,
+            "domain": c.domain,
+            "path": c.path,
+            "secure": c.secure,
+            "expires": c.expires,
+        }
+        for c in jar
+    ]
+
+
+def load_cookies(jar: Any, cookies: List[Dict[str, Any]]) -> None:
+    for c in cookies:
+        jar.set(
+            c["name"],
+            c["value"],
+            domain=c.get("domain") or "",
+            path=c.get("path") or "/",
+            secure=bool(c.get("secure")),
+            expires=c.get("expires"),
+        )
+
+
+class SessionCache:
+    """
+    cache = SessionCache.from_env()           # None when disabled or cryptography is missing
+    cookies = cache.get(base_url, username, password)
+    cache.put(base_url, username, password, cookies)
+    cache.forget(base_url, username)
+    """
+
+    def __init__(self, path: Path, iterations: int = DEFAULT_KDF_ITERATIONS) -> None:
+        self.path = Path(path)
+        self.iterations = max(1, int(iterations))
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionCache"]:
+        path = default_path()
+        if path is None:
+            return None
+        try:
+            import cryptography.fernet  # noqa: F401
+        except ImportError:
+            return None
+        iterations = int(os.getenv("MARKETPLACE_SESSION_KDF_ITERATIONS") or DEFAULT_KDF_ITERATIONS)
+        return cls(path, iterations)
+
+    @staticmethod
+    def entry_id(base_url: str, username: str) -> str:
+        # Entry names don't reveal which accounts or hosts are cached
+        return hashlib.sha256(f"{base_url.rstrip('/')}\n{username}".encode()).hexdigest()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def get(self, base_url: str, username: str, password: str) -> Optional[List[Dict[str, Any]]]:
+        """The cached cookies, or None (no entry, other password, or unreadable entry)."""
+        entry = self._read().get(self.entry_id(base_url, username))
+        if not isinstance(entry, dict):
+            return None
+        from cryptography.fernet import InvalidToken
+
+        try:
+            salt = base64.b64decode(entry["salt"])
+            fernet = _fernet(password, salt, int(entry.get("iterations") or DEFAULT_KDF_ITERATIONS))
+            cookies = json.loads(fernet.decrypt(entry["token"].encode()))
+        except (InvalidToken, KeyError, TypeError, ValueError):
+            return None
+        return cookies if isinstance(cookies, list) else None
+
+    def put(self, base_url: str, username: str, password: str, cookies: List[Dict[str, Any]]) -> None:
+        salt = os.urandom(SALT_BYTES)
+        token = _fernet(password, salt, self.iterations).encrypt(json.dumps(cookies).encode())
+        data = self._read()
+        data[self.entry_id(base_url, username)] = {
+            "salt": base64.b64encode(salt).decode(),
+            "iterations": self.iterations,
+            "token": token.decode(),
+            "saved_at": int(time.time()),
+        }
+        self._write(data)
+
+    def forget(self, base_url: str, username: str) -> None:
+        data = self._read()
+        if data.pop(self.entry_id(base_url, username), None) is not None:
+            self._write(data)
@@ -0,0 +1,68 @@
+"""Plugin tests import the plugin as the `marketplace` package; servers are canned-response sessions."""
+
+import json
+import os
+import sys
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict({"Content-Type": "text/html" if isinstance(body, str) else "application/json"})
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        pass
+
+
+class FakeSession(requests.Session):
+    """
+    Answers from routes {(method, path): [(status, body, set_cookies), ...]} (each answer used once)
+    and records (method, path, cookies sent) per request.
+    """
+
+    def __init__(self, routes):
+        super().__init__()
+        self.routes = {k: list(v) for k, v in routes.items()}
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        self.requests.append((method, path, dict(self.cookies)))
+        answers = self.routes.get((method, path))
+        if not answers:
+            raise AssertionError(f"unexpected request {method} {path}")
+        status, body, cookies = answers.pop(0)
+        for name, value in cookies.items():
+            self.cookies.set(name, value, domain="", path="/")
+        return FakeResponse(status, body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    server(routes) queues a FakeSession for the next requests.Session() the plugin creates;
+    server.sessions lists them in creation order.
+    """
+    queued, created = [], []
+
+    def make():
+        session = queued.pop(0)
+        created.append(session)
+        return session
+
+    def add(routes):
+        queued.append(FakeSession(routes))
+
+    add.sessions = created
+    monkeypatch.setattr(requests, "Session", make)
+    return add
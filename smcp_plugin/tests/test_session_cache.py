@@ -0,0 +1,88 @@
+"""marketplace.cli.run_session with the encrypted session cache (marketplace.session_cache)."""
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from marketplace import cli  # noqa: E402
+from marketplace.session_cache import SessionCache  # noqa: E402
+from sdk.exceptions import UnauthorizedError  # noqa: E402
+
+BASE = "http://market.test"
+ARGS = {"base_url": BASE, "username": "alice", "password": "secret"}
+COOKIE = [{"name": "PHPSESSID", "value": "cached", "domain": "", "path": "/", "secure": False, "expires": None}]
+LOGIN = ("POST", "/login.php")
+KEYS = ("GET", "/api/keys.php")
+LOGOUT = ("GET", "/logout.php")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("MARKETPLACE_SESSION_CACHE", str(tmp_path / "sessions.json"))
+    monkeypatch.setenv("MARKETPLACE_SESSION_KDF_ITERATIONS", "1000")
+    return SessionCache.from_env()
+
+
+def _list_keys(client):
+    return client.list_keys()
+
+
+def test_cached_session_is_used_without_login(cache, server):
+    cache.put(BASE, "alice", "secret", COOKIE)
+    server({KEYS: [(200, {"keys": [1]}, {})]})
+    assert cli.run_session(ARGS, _list_keys) == {"keys": [1]}
+    (session,) = server.sessions
+    assert session.requests == [("GET", "/api/keys.php", {"PHPSESSID": "cached"})]
+
+
+def test_401_logs_in_again_and_retries_once(cache, server):
+    cache.put(BASE, "alice", "secret", COOKIE)
+    server({KEYS: [(401, {"error": "Unauthorized"}, {})]})
+    server({LOGIN: [(200, "Logged in as alice", {"PHPSESSID": "fresh"})], KEYS: [(200, {"keys": []}, {})]})
+    assert cli.run_session(ARGS, _list_keys) == {"keys": []}
+    stale, fresh = server.sessions
+    assert [r[:2] for r in stale.requests] == [KEYS]
+    assert fresh.requests == [("POST", "/login.php", {}), ("GET", "/api/keys.php", {"PHPSESSID": "fresh"})]
+    # The new session replaces the stale one, and is not logged out
+    assert cache.get(BASE, "alice", "secret")[0]["value"] == "fresh"
+
+
+def test_401_after_a_fresh_login_is_not_retried_again(cache, server):
+    cache.put(BASE, "alice", "secret", COOKIE)
+    server({KEYS: [(401, {"error": "Unauthorized"}, {})]})
+    server({LOGIN: [(200, "Logged in as alice", {"PHPSESSID": "fresh"})], KEYS: [(401, {"error": "Unauthorized"}, {})]})
+    with pytest.raises(UnauthorizedError):
+        cli.run_session(ARGS, _list_keys)
+    assert sum(len(s.requests) for s in server.sessions) == 3
+    assert cache.get(BASE, "alice", "secret") is None
+
+
+def test_wrong_password_cannot_read_or_overwrite_an_entry(cache, server):
+    cache.put(BASE, "alice", "secret", COOKIE)
+    stored = cache.path.read_bytes()
+    assert cache.get(BASE, "alice", "wrong") is None
+    server({LOGIN: [(401, {"error": "Invalid credentials"}, {})]})
+    with pytest.raises(UnauthorizedError):
+        cli.run_session(dict(ARGS, password="wrong"), _list_keys)
+    # The cached session was never sent, and the entry is untouched
+    assert server.sessions[0].requests == [("POST", "/login.php", {})]
+    assert cache.path.read_bytes() == stored
+    assert cache.get(BASE, "alice", "secret") == COOKIE
+
+
+def test_entries_are_per_base_url_and_user(cache):
+    cache.put(BASE, "alice", "secret", COOKIE)
+    assert cache.get(BASE + "/", "alice", "secret") == COOKIE
+    assert cache.get("http://other.test", "alice", "secret") is None
+    assert cache.get(BASE, "bob", "secret") is None
+    assert "alice" not in cache.path.read_text() and "cached" not in cache.path.read_text()
+
+
+def test_disabled_cache_logs_in_and_out(tmp_path, monkeypatch, server):
+    monkeypatch.setenv("MARKETPLACE_SESSION_CACHE", "0")
+    assert SessionCache.from_env() is None
+    server({LOGIN: [(200, "Logged in as alice", {"PHPSESSID": "one-off"})], KEYS: [(200, {"keys": []}, {})],
+            LOGOUT: [(200, "Logged out", {})]})
+    assert cli.run_session(ARGS, _list_keys) == {"keys": []}
+    assert [r[:2] for r in server.sessions[0].requests] == [LOGIN, KEYS, LOGOUT]
+    assert not list(tmp_path.iterdir())